@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: legacy CRUD write path vs single-statement RETURNING writes.
+
+The legacy path is what web/crud.py used to do for an update:
+SELECT row -> SELECT parent -> mutate -> COMMIT -> refresh (SELECT).
+The new path is one UPDATE ... RETURNING with the parent checked by the
+foreign key constraint.
+
+Runs against a throw-away SQLite database:
+    python benchmarks/bench_crud_writes.py --iterations 2000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# The measured writes go to a scratch database, created before db.session is imported
+TMP_DIR = tempfile.mkdtemp(prefix="bench_crud_")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{TMP_DIR}/bench.sqlite3"
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select, update, insert
+
+from db.models import City, Excursion, Point
+from db.schema import init_db
+from db.session import AsyncSessionLocal
+
+
+async def legacy_update(point_id: int, excursion_id: int, title: str):
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(select(Point).where(Point.id == point_id))
+        db_point = result.scalar_one_or_none()
+        exc_result = await session.execute(select(Excursion).where(Excursion.id == excursion_id))
+        assert exc_result.scalar_one_or_none() is not None
+        db_point.excursion_id = excursion_id
+        db_point.title = title
+        await session.commit()
+        await session.refresh(db_point)
+        return db_point
+
+
+async def returning_update(point_id: int, excursion_id: int, title: str):
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            update(Point)
+            .where(Point.id == point_id)
+            .values(excursion_id=excursion_id, title=title)
+            .returning(Point)
+        )
+        db_point = result.scalar_one_or_none()
+        await session.commit()
+        return db_point
+
+
+async def seed(points: int) -> int:
+    async with AsyncSessionLocal() as session:
+        city_id = (await session.execute(insert(City).values(name="Bench").returning(City.id))).scalar_one()
+        excursion_id = (await session.execute(
+            insert(Excursion)
+            .values(city_id=city_id, title="Bench tour", description="Benchmark excursion")
+            .returning(Excursion.id)
+        )).scalar_one()
+        await session.execute(insert(Point), [
+            {
+                "excursion_id": excursion_id, "order": i % 100 + 1, "title": f"Point {i}",
+                "text": "Benchmark point text", "lat": 38.5, "lng": 68.7,
+            }
+            for i in range(points)
+        ])
+        await session.commit()
+    return excursion_id
+
+
+async def measure(name, func, iterations, points, excursion_id):
+    timings = []
+    for i in range(iterations):
+        started = time.perf_counter()
+        await func(i % points + 1, excursion_id, f"{name} {i}")
+        timings.append((time.perf_counter() - started) * 1e6)
+    timings.sort()
+    return {
+        "name": name,
+        "mean_us": statistics.fmean(timings),
+        "p50_us": timings[len(timings) // 2],
+        "p99_us": timings[int(len(timings) * 0.99) - 1],
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--points", type=int, default=1000)
+    args = parser.parse_args()
+
+    await init_db()
+    excursion_id = await seed(args.points)
+
+    # Warm up connections and statement caches
+    await measure("warmup", returning_update, 50, args.points, excursion_id)
+    await measure("warmup", legacy_update, 50, args.points, excursion_id)
+
+    results = [
+        await measure("legacy select/refresh", legacy_update, args.iterations, args.points, excursion_id),
+        await measure("update ... returning", returning_update, args.iterations, args.points, excursion_id),
+    ]
+    print(f"{'path':<24}{'mean us':>10}{'p50 us':>10}{'p99 us':>10}")
+    for r in results:
+        print(f"{r['name']:<24}{r['mean_us']:>10.0f}{r['p50_us']:>10.0f}{r['p99_us']:>10.0f}")
+    print(f"speedup (mean): {results[0]['mean_us'] / results[1]['mean_us']:.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
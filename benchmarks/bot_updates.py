@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Updates/s of the bot against an offline fake Telegram Bot API.
+
+Seeds a throw-away database with web/generate_data.py and starts a fake Bot
+API server (aiohttp, in its own process) holding --updates prepared updates.
+For each profile the bot process polls them with the real dispatcher and
+handlers; the fake API answers every call after --latency ms, standing in
+for the round trip to Telegram. The update mix:
+
+    commands   /start, /instruction, /get_trips
+    callbacks  city:<id>, exc:<id>, home
+    inline     inline search queries
+
+    development  Bot(BOT_TOKEN) with aiogram's defaults, the previous bot/main.py
+    production   the default profile (see bot/runtime.py)
+
+Reports updates/s and p50/p99 handling time per profile, and
+writes them as JSON with -o.
+
+    python benchmarks/bot_updates.py
+    python benchmarks/bot_updates.py --updates 20000 --latency 40 -o bot.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from argparse import Namespace
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.append(str(ROOT_DIR))
+
+TOKEN = "42:BENCHMARK"
+MIX = {"/start": 15, "/instruction": 10, "/get_trips": 20, "city": 20, "exc": 20, "home": 5, "inline": 10}
+USERS = 1000
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def seed_database() -> None:
+    from web.generate_data import generate
+
+    generate(Namespace(
+        cities=10, excursions=200, points=2000,
+        seed=42, media_files=0, batch_size=10000, keep_triggers=False,
+    ))
+
+
+def make_updates(db_path: str, count: int) -> list:
+    with sqlite3.connect(db_path) as db:
+        city_ids = [row[0] for row in db.execute("SELECT id FROM cities")]
+        excursions = list(db.execute("SELECT id, title FROM excursions"))
+    rng = random.Random(42)
+    now = int(time.time())
+    updates = []
+    for update_id in range(1, count + 1):
+        user_id = rng.randrange(1, USERS + 1)
+        user = {"id": user_id, "is_bot": False, "first_name": f"User {user_id}"}
+        chat = {"id": user_id, "type": "private"}
+        kind = rng.choices(list(MIX), list(MIX.values()))[0]
+        update = {"update_id": update_id}
+        if kind.startswith("/"):
+            update["message"] = {
+                "message_id": update_id, "date": now, "chat": chat, "from": user, "text": kind,
+                "entities": [{"type": "bot_command", "offset": 0, "length": len(kind)}],
+            }
+        elif kind == "inline":
+            title = rng.choice(excursions)[1]
+            update["inline_query"] = {"id": str(update_id), "from": user, "query": title.split()[0], "offset": ""}
+        else:
+            data = {"city": f"city:{rng.choice(city_ids)}", "exc": f"exc:{rng.choice(excursions)[0]}"}.get(kind, kind)
+            update["callback_query"] = {
+                "id": str(update_id), "from": user, "chat_instance": str(user_id), "data": data,
+                "message": {"message_id": update_id, "date": now, "chat": chat, "text": "menu"},
+            }
+        updates.append(update)
+    return updates
+
+
+# Fake Bot API
+
+class FakeBotAPI:
+    """
+    Offline stand-in for the Telegram Bot API
+
+    getUpdates hands out the prepared updates in batches, long-polling when
+    none are left; send* methods answer with a Message in the requested
+    chat, everything else with True.
+    """
+
+    def __init__(self, updates: list, latency: float):
+        self.updates = updates
+        self.latency = latency
+        self.next_message_id = 1
+
+    def message(self, chat_id) -> dict:
+        self.next_message_id += 1
+        return {"message_id": self.next_message_id, "date": int(time.time()),
+                "chat": {"id": int(chat_id or 0), "type": "private"}, "text": ""}
+
+    async def handle(self, request):
+        from aiohttp import web
+
+        method = request.match_info["method"]
+        form = await request.json() if request.content_type == "application/json" else await request.post()
+        if method == "getUpdates":
+            offset = int(form.get("offset", 0))
+            limit = int(form.get("limit", 100))
+            batch = [u for u in self.updates[max(0, offset - 1):max(0, offset - 1) + limit] if u["update_id"] >= offset]
+            if not batch:
+                await asyncio.sleep(float(form.get("timeout", 0)))
+            return web.json_response({"ok": True, "result": batch})
+
+        await asyncio.sleep(self.latency)
+        if method == "getMe":
+            result = {"id": 42, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}
+        elif method == "sendMediaGroup":
+            result = [self.message(form.get("chat_id"))]
+        elif method.startswith("send"):
+            result = self.message(form.get("chat_id"))
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+
+def serve_api(updates_file: str, port: int, latency: float) -> None:
+    from aiohttp import web
+
+    api = FakeBotAPI(json.loads(Path(updates_file).read_text()), latency)
+    app = web.Application()
+    app.router.add_post("/bot{token}/{method}", api.handle)
+    web.run_app(app, host="127.0.0.1", port=port, print=None, access_log=None, shutdown_timeout=1)
+
+
+# Bot process
+
+async def run_bot(args) -> dict:
+    from aiogram import BaseMiddleware, Dispatcher
+
+    from bot import cache as bot_cache
+    from bot.handlers import router
+    from bot.profiling import router as profiling_router
+    from bot.runtime import create_bot, polling_options
+    from db.schema import init_db
+
+    await init_db()
+    bot = create_bot(TOKEN, args.bot, api_url=args.api_url)
+    dp = Dispatcher()
+    dp.include_router(profiling_router)
+    dp.include_router(router)
+
+    done = asyncio.Event()
+    durations = []
+    errors = 0
+    first = None
+
+    class Counter(BaseMiddleware):
+        async def __call__(self, handler, event, data):
+            nonlocal errors, first
+            started = time.perf_counter()
+            first = first or started
+            try:
+                return await handler(event, data)
+            except Exception:
+                errors += 1
+            finally:
+                durations.append(time.perf_counter() - started)
+                if len(durations) >= args.updates:
+                    done.set()
+
+    dp.update.outer_middleware(Counter())
+
+    await bot_cache.start()
+    polling = asyncio.create_task(dp.start_polling(bot, handle_signals=False, **polling_options(args.bot)))
+    try:
+        await asyncio.wait_for(done.wait(), timeout=args.timeout)
+        elapsed = time.perf_counter() - first
+    finally:
+        await dp.stop_polling()
+        await polling
+        await bot_cache.stop()
+
+    durations.sort()
+    return {
+        "updates": len(durations),
+        "errors": errors,
+        "updates_per_s": round(len(durations) / elapsed, 1),
+        "p50_ms": round(percentile(durations, 0.50) * 1000, 2),
+        "p99_ms": round(percentile(durations, 0.99) * 1000, 2),
+    }
+
+
+def run(profile: str, updates_file: str, args) -> dict:
+    port = free_port()
+    server = subprocess.Popen([
+        sys.executable, __file__, "--serve-api", updates_file, "--port", str(port), "--latency", str(args.latency),
+    ], cwd=ROOT_DIR)
+    try:
+        for _ in range(100):
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                break
+            except OSError:
+                time.sleep(0.1)
+        else:
+            raise SystemExit("Fake Bot API did not start")
+        output = subprocess.run([
+            sys.executable, __file__, "--bot", profile, "--api-url", f"http://127.0.0.1:{port}",
+            "--updates", str(args.updates),
+        ], cwd=ROOT_DIR, env=os.environ.copy(), capture_output=True, text=True, check=True).stdout
+        return json.loads(output.strip().splitlines()[-1])
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", default="development,production")
+    parser.add_argument("--updates", type=int, default=5000)
+    parser.add_argument("--latency", type=float, default=20, help="Fake Bot API response time, ms")
+    parser.add_argument("--timeout", type=float, default=600, help=argparse.SUPPRESS)
+    parser.add_argument("-o", "--output", help="Write the JSON report here")
+    parser.add_argument("--serve-api", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--bot", help=argparse.SUPPRESS)
+    parser.add_argument("--api-url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_api:
+        return serve_api(args.serve_api, args.port, args.latency / 1000)
+    if args.bot:
+        from bot.runtime import run as run_runtime
+        print(json.dumps(run_runtime(run_bot(args), args.bot)))
+        return
+
+    # Point db.session (here and in the bot processes) at the database before anything imports it
+    tmp_dir = tempfile.mkdtemp(prefix="bench_bot_")
+    db_path = f"{tmp_dir}/bench.sqlite3"
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{db_path}"
+    seed_database()
+    updates_file = f"{tmp_dir}/updates.json"
+    Path(updates_file).write_text(json.dumps(make_updates(db_path, args.updates)))
+
+    results = {}
+    print(f"\n{'profile':<14}{'updates':>9}{'err':>6}{'updates/s':>11}{'p50 ms':>9}{'p99 ms':>9}")
+    for profile in args.profiles.split(","):
+        stats = run(profile, updates_file, args)
+        results[profile] = stats
+        print(f"{profile:<14}{stats['updates']:>9}{stats['errors']:>6}{stats['updates_per_s']:>11.1f}"
+              f"{stats['p50_ms']:>9.2f}{stats['p99_ms']:>9.2f}")
+
+    from bot.runtime import describe, event_loop, json_codec
+    print(f"\n{describe('production')} (uvloop/orjson are used when installed)")
+    if args.output:
+        report = {
+            "config": {key: getattr(args, key) for key in ("updates", "latency")},
+            "environment": {
+                "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+                "loop": event_loop(), "json": json_codec(),
+            },
+            "results": results,
+        }
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"📄 Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+HTTP load test for the admin/API server.
+
+Boots web.main:app in-process (httpx ASGI transport, no sockets) or under a
+real uvicorn process, seeds a throw-away database with
+web/generate_data.py and drives a weighted mix of requests at a fixed
+concurrency:
+
+    reads    CRUD GETs: lists, details, /full trees, search
+    writes   create / update / delete points
+    uploads  /api/media/upload with payloads of several sizes
+    media    static /media downloads
+    admin    sqladmin list pages (logged in)
+
+Per-route throughput and p50/p95/p99 latency are printed and written as
+JSON. With --baseline the run is compared against an earlier report and
+the exit status is 1 if a route regressed beyond --tolerance.
+
+    python benchmarks/load_test.py --duration 20 --concurrency 32
+    python benchmarks/load_test.py --server uvicorn -o after.json --baseline before.json
+    python benchmarks/load_test.py --mix reads=1,media=1 --db /path/to/big.sqlite3
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from argparse import Namespace
+from collections import defaultdict
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.append(str(ROOT_DIR))
+
+DEFAULT_MIX = "reads=60,writes=10,uploads=5,media=15,admin=10"
+UPLOAD_SIZES = (1024, 64 * 1024, 1024 * 1024, 8 * 1024 * 1024)
+UPLOAD_PREFIX = "loadtest_"
+SEARCH_TERMS = ("museum", "old town", "парк", "рудаки", "bazaar", "душ")
+ADMIN_PAGES = ("/admin/city/list", "/admin/excursion/list", "/admin/point/list")
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class Recorder:
+    """Latencies and outcomes per route label"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.bytes = defaultdict(int)
+
+    def add(self, route, seconds, ok, size=0):
+        self.latencies[route].append(seconds)
+        self.bytes[route] += size
+        if not ok:
+            self.errors[route] += 1
+
+    def report(self, elapsed):
+        routes = {}
+        for route, values in sorted(self.latencies.items()):
+            values.sort()
+            routes[route] = {
+                "requests": len(values),
+                "errors": self.errors[route],
+                "throughput_rps": round(len(values) / elapsed, 2),
+                "bytes": self.bytes[route],
+                "p50_ms": round(percentile(values, 0.50) * 1000, 3),
+                "p95_ms": round(percentile(values, 0.95) * 1000, 3),
+                "p99_ms": round(percentile(values, 0.99) * 1000, 3),
+                "max_ms": round(values[-1] * 1000, 3),
+            }
+        everything = sorted(v for values in self.latencies.values() for v in values)
+        total = {
+            "requests": len(everything),
+            "errors": sum(self.errors.values()),
+            "throughput_rps": round(len(everything) / elapsed, 2),
+            "p50_ms": round(percentile(everything, 0.50) * 1000, 3),
+            "p95_ms": round(percentile(everything, 0.95) * 1000, 3),
+            "p99_ms": round(percentile(everything, 0.99) * 1000, 3),
+        }
+        return routes, total
+
+
+class Workload:
+    """Builds and issues the individual requests of the mix"""
+
+    def __init__(self, client, recorder, rng, catalog, media_paths):
+        self.client = client
+        self.recorder = recorder
+        self.rng = rng
+        self.catalog = catalog
+        self.media_paths = media_paths
+        self.created_points = []
+        self.uploaded = []
+        self.payloads = {size: os.urandom(size) for size in UPLOAD_SIZES}
+
+    async def request(self, route, method, url, ok_status=(200,), **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except Exception:
+            self.recorder.add(route, time.perf_counter() - started, False)
+            return None
+        self.recorder.add(route, time.perf_counter() - started, response.status_code in ok_status, len(response.content))
+        return response
+
+    async def reads(self):
+        city_id = self.rng.choice(self.catalog["cities"])
+        excursion_id = self.rng.choice(self.catalog["excursions"])
+        point_id = self.rng.choice(self.catalog["points"])
+        choice = self.rng.randrange(7)
+        if choice == 0:
+            await self.request("GET /api/cities", "GET", "/api/cities")
+        elif choice == 1:
+            await self.request("GET /api/cities/{id}", "GET", f"/api/cities/{city_id}")
+        elif choice == 2:
+            await self.request("GET /api/excursions?city_id", "GET", "/api/excursions", params={"city_id": city_id})
+        elif choice == 3:
+            await self.request("GET /api/excursions/{id}/full", "GET", f"/api/excursions/{excursion_id}/full")
+        elif choice == 4:
+            await self.request("GET /api/points?excursion_id", "GET", "/api/points", params={"excursion_id": excursion_id})
+        elif choice == 5:
+            await self.request("GET /api/points/{id}", "GET", f"/api/points/{point_id}")
+        else:
+            await self.request("GET /api/search", "GET", "/api/search", params={"q": self.rng.choice(SEARCH_TERMS)})
+
+    async def writes(self):
+        if self.created_points and self.rng.random() < 0.3:
+            point_id = self.created_points.pop(self.rng.randrange(len(self.created_points)))
+            await self.request("DELETE /api/points/{id}", "DELETE", f"/api/points/{point_id}")
+        elif self.created_points and self.rng.random() < 0.5:
+            point_id = self.rng.choice(self.created_points)
+            await self.request(
+                "PUT /api/points/{id}", "PUT", f"/api/points/{point_id}",
+                json={"title": f"Load test {self.rng.randrange(10 ** 6)}"},
+            )
+        else:
+            response = await self.request("POST /api/points", "POST", "/api/points", json={
+                "excursion_id": self.rng.choice(self.catalog["excursions"]),
+                "order": self.rng.randint(1, 100),
+                "title": "Load test point",
+                "text": "Created by the HTTP load test",
+                "lat": self.rng.uniform(-90, 90),
+                "lng": self.rng.uniform(-180, 180),
+            })
+            if response is not None and response.status_code == 200:
+                self.created_points.append(response.json()["id"])
+
+    async def uploads(self):
+        size = self.rng.choice(UPLOAD_SIZES)
+        label = f"POST /api/media/upload [{size // 1024}KB]"
+        files = {"file": (f"{UPLOAD_PREFIX}{size}.jpg", self.payloads[size], "image/jpeg")}
+        response = await self.request(label, "POST", "/api/media/upload", params={"media_type": "images"}, files=files)
+        if response is not None and response.status_code == 200:
+            path = response.json()["path"]
+            self.uploaded.append(path)
+            self.media_paths.append(path)
+
+    async def media(self):
+        path = self.rng.choice(self.media_paths)
+        size = (ROOT_DIR / path).stat().st_size if (ROOT_DIR / path).exists() else 0
+        bucket = "small" if size < 64 * 1024 else "large"
+        await self.request(f"GET /media [{bucket}]", "GET", f"/{path}")
+
+    async def admin(self):
+        page = self.rng.choice(ADMIN_PAGES)
+        await self.request(f"GET {page}", "GET", page)
+
+
+async def load_catalog(client):
+    """Ids the workload picks from; limited to what the API lists"""
+    cities = [c["id"] for c in (await client.get("/api/cities")).json()]
+    excursions = [e["id"] for e in (await client.get("/api/excursions")).json()]
+    points = [p["id"] for p in (await client.get("/api/points")).json()]
+    if not (cities and excursions and points):
+        raise SystemExit("The database has no data to load test; drop --db or seed it first")
+    return {"cities": cities, "excursions": excursions, "points": points}
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ("reads", "writes", "uploads", "media", "admin"):
+            raise SystemExit(f"Unknown workload: {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+async def drive(client, args):
+    login = await client.post("/admin/login", data={
+        "username": os.getenv("ADMIN_USERNAME", "admin"),
+        "password": os.getenv("ADMIN_PASSWORD", "admin123"),
+    })
+    if login.status_code not in (200, 302):
+        raise SystemExit(f"Admin login failed: {login.status_code}")
+
+    catalog = await load_catalog(client)
+    media_paths = [
+        str(path.relative_to(ROOT_DIR))
+        for path in (ROOT_DIR / "media").glob("*/synthetic/*")
+    ]
+    if not media_paths:
+        raise SystemExit("No media files to download; run web/generate_data.py with --media-files")
+
+    recorder = Recorder()
+    workload = Workload(client, recorder, random.Random(args.seed), catalog, media_paths)
+    mix = parse_mix(args.mix)
+    names, weights = list(mix), list(mix.values())
+    deadline = time.perf_counter() + args.warmup + args.duration
+
+    async def worker(worker_rng):
+        while time.perf_counter() < deadline:
+            name = worker_rng.choices(names, weights)[0]
+            await getattr(workload, name)()
+
+    # Warm up (caches, connection pools) and discard those samples
+    warmup = asyncio.ensure_future(asyncio.sleep(args.warmup))
+    tasks = [asyncio.create_task(worker(random.Random(args.seed + i))) for i in range(args.concurrency)]
+    await warmup
+    recorder.latencies.clear()
+    recorder.errors.clear()
+    recorder.bytes.clear()
+    started = time.perf_counter()
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+
+    for point_id in workload.created_points:
+        await client.delete(f"/api/points/{point_id}")
+    for path in workload.uploaded:
+        (ROOT_DIR / path).unlink(missing_ok=True)
+    return recorder.report(elapsed)
+
+
+async def run_in_process(args):
+    import httpx
+    from web.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+            return await drive(client, args)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run_uvicorn(args):
+    import httpx
+
+    port = free_port()
+    command = [
+        sys.executable, "-m", "uvicorn", "web.main:app",
+        "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning", "--no-access-log",
+    ]
+    server = subprocess.Popen(command, cwd=ROOT_DIR, env=os.environ.copy())
+    base_url = f"http://127.0.0.1:{port}"
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+            for _ in range(100):
+                try:
+                    await client.get("/api/cities")
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+            else:
+                raise SystemExit("uvicorn did not start")
+            return await drive(client, args)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def compare(routes, baseline, tolerance):
+    """Return the routes whose p95 or throughput regressed beyond tolerance"""
+    regressions = []
+    for route, current in routes.items():
+        before = baseline.get("routes", {}).get(route)
+        if not before:
+            continue
+        if current["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{route}: p95 {before['p95_ms']}ms -> {current['p95_ms']}ms")
+        if current["throughput_rps"] < before["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{route}: {before['throughput_rps']} -> {current['throughput_rps']} req/s")
+    return regressions
+
+
+def print_report(routes, total):
+    print(f"\n{'route':<44}{'req':>8}{'err':>6}{'req/s':>10}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for route, stats in list(routes.items()) + [("TOTAL", total)]:
+        print(
+            f"{route:<44}{stats['requests']:>8}{stats['errors']:>6}{stats['throughput_rps']:>10.1f}"
+            f"{stats['p50_ms']:>9.2f}{stats['p95_ms']:>9.2f}{stats['p99_ms']:>9.2f}"
+        )
+
+
+def seed_database(args):
+    from web.generate_data import generate
+
+    generate(Namespace(
+        cities=args.cities, excursions=args.excursions, points=args.points,
+        seed=args.seed, media_files=20, batch_size=10000, keep_triggers=False,
+    ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--server", choices=("inprocess", "uvicorn"), default="inprocess")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=15, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=2, help="Seconds discarded before measuring")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Workload weights (default: {DEFAULT_MIX})")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", help="Existing SQLite database to use instead of a generated one")
+    parser.add_argument("--cities", type=int, default=20)
+    parser.add_argument("--excursions", type=int, default=200)
+    parser.add_argument("--points", type=int, default=4000)
+    parser.add_argument("-o", "--output", help="Write the JSON report here")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression (default 0.2)")
+    args = parser.parse_args()
+
+    # Point db.session at the database before anything imports it
+    if args.db:
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{Path(args.db).resolve()}"
+    else:
+        tmp_dir = tempfile.mkdtemp(prefix="loadtest_")
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tmp_dir}/loadtest.sqlite3"
+        seed_database(args)
+
+    runner = run_uvicorn if args.server == "uvicorn" else run_in_process
+    routes, total = asyncio.run(runner(args))
+    print_report(routes, total)
+
+    report = {
+        "config": {
+            key: getattr(args, key)
+            for key in ("server", "concurrency", "duration", "warmup", "mix", "seed", "cities", "excursions", "points")
+        },
+        "environment": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "routes": routes,
+        "total": total,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"\n📄 Report written to {args.output}")
+
+    if args.baseline:
+        regressions = compare(routes, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for line in regressions:
+                print(f"   {line}")
+            sys.exit(1)
+        print(f"\n✅ No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Throughput of /media serving the sample videos concurrently.
+
+Starts a uvicorn process serving media/ with the chosen implementation and
+has --concurrency clients download media/videos/*.mp4 for --duration
+seconds, in one of two patterns:
+
+    full    whole-file downloads
+    ranges  1 MB range requests at random offsets (video seeking)
+
+    mediafiles   web.media.MediaFiles, the /media app of web/main.py
+    staticfiles  starlette StaticFiles, what /media used before
+
+Reports requests/s, MB/s and p50/p99 latency per implementation and
+pattern, and writes them as JSON with -o.
+
+    python benchmarks/media_serving.py
+    python benchmarks/media_serving.py --impl mediafiles --pattern ranges --concurrency 64
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# web.media pulls in db.session; keep it off the real database
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{tempfile.mkdtemp(prefix='bench_media_')}/bench.sqlite3")
+
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.append(str(ROOT_DIR))
+
+RANGE_SIZE = 1024 * 1024
+
+
+def build_app(impl: str):
+    from starlette.applications import Starlette
+    from starlette.routing import Mount
+    from starlette.staticfiles import StaticFiles
+
+    from utils.storage import LocalStorage
+    from web.media import MediaFiles
+
+    if impl == "staticfiles":
+        media = StaticFiles(directory=str(ROOT_DIR / "media"))
+    else:
+        media = MediaFiles(LocalStorage(ROOT_DIR))
+    return Starlette(routes=[Mount("/media", media)])
+
+
+def serve(impl: str, port: int) -> None:
+    import uvicorn
+    uvicorn.run(build_app(impl), host="127.0.0.1", port=port, log_level="warning", access_log=False)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))]
+
+
+async def drive(base_url: str, videos, pattern: str, concurrency: int, duration: float) -> dict:
+    import aiohttp
+
+    latencies = []
+    received = 0
+    errors = 0
+    rng = random.Random(42)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        # Warm up the connections and the page cache
+        for path, _ in videos:
+            async with session.get(f"{base_url}/{path}") as response:
+                await response.read()
+
+        deadline = time.perf_counter() + duration
+
+        async def client():
+            nonlocal received, errors
+            while time.perf_counter() < deadline:
+                path, size = rng.choice(videos)
+                headers = {}
+                expected = size
+                if pattern == "ranges":
+                    start = rng.randrange(0, max(1, size - RANGE_SIZE))
+                    end = min(size, start + RANGE_SIZE) - 1
+                    headers["Range"] = f"bytes={start}-{end}"
+                    expected = end - start + 1
+                started = time.perf_counter()
+                async with session.get(f"{base_url}/{path}", headers=headers) as response:
+                    body = await response.read()
+                latencies.append(time.perf_counter() - started)
+                if response.status not in (200, 206) or len(body) != expected:
+                    errors += 1
+                received += len(body)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "requests_per_s": round(len(latencies) / elapsed, 1),
+        "mb_per_s": round(received / elapsed / 1e6, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+def run(impl: str, pattern: str, args) -> dict:
+    videos = [
+        (str(path.relative_to(ROOT_DIR)), path.stat().st_size)
+        for path in sorted((ROOT_DIR / "media" / "videos").glob("*.mp4"))
+    ]
+    if not videos:
+        raise SystemExit("No sample videos in media/videos")
+    port = free_port()
+    server = subprocess.Popen([sys.executable, __file__, "--serve", impl, "--port", str(port)], cwd=ROOT_DIR)
+    try:
+        for _ in range(100):
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                break
+            except OSError:
+                time.sleep(0.1)
+        else:
+            raise SystemExit("uvicorn did not start")
+        return asyncio.run(drive(f"http://127.0.0.1:{port}", videos, pattern, args.concurrency, args.duration))
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--impl", choices=("mediafiles", "staticfiles", "both"), default="both")
+    parser.add_argument("--pattern", choices=("full", "ranges", "both"), default="both")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10, help="Measured seconds per run")
+    parser.add_argument("-o", "--output", help="Write the JSON report here")
+    parser.add_argument("--serve", choices=("mediafiles", "staticfiles"), help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        return serve(args.serve, args.port)
+
+    impls = ("staticfiles", "mediafiles") if args.impl == "both" else (args.impl,)
+    patterns = ("full", "ranges") if args.pattern == "both" else (args.pattern,)
+    results = {}
+    print(f"{'implementation':<16}{'pattern':<9}{'req':>8}{'err':>6}{'req/s':>10}{'MB/s':>9}{'p50 ms':>9}{'p99 ms':>9}")
+    for impl in impls:
+        for pattern in patterns:
+            stats = run(impl, pattern, args)
+            results[f"{impl} {pattern}"] = stats
+            print(
+                f"{impl:<16}{pattern:<9}{stats['requests']:>8}{stats['errors']:>6}{stats['requests_per_s']:>10.1f}"
+                f"{stats['mb_per_s']:>9.1f}{stats['p50_ms']:>9.2f}{stats['p99_ms']:>9.2f}"
+            )
+
+    if args.output:
+        report = {
+            "config": {"concurrency": args.concurrency, "duration": args.duration},
+            "environment": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+            "results": results,
+        }
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"\n📄 Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
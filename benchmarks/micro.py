@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the functions on the hot paths.
+
+    web/media.py        get_file_extension, validate_file, save_upload_file
+    web/media_admin.py  get_media_preview, MediaWidget.__call__
+    web/main.py         InjectMediaAssetsMiddleware.dispatch (vs. the bare app)
+    web/crud.py         GET /api/points with and without ?fields= (response cache off)
+    bot/keyboards.py    keyboard construction
+    bot/handlers.py     get_excursion_points, the lookup behind send_point/at_place
+
+Each case reports time per call (best of --repeat rounds) and, in a
+separate tracemalloc pass, peak and retained bytes per call. Everything
+runs offline against a temporary database and media directory.
+
+    python benchmarks/micro.py
+    python benchmarks/micro.py -k media -o micro.json
+    python benchmarks/micro.py --baseline micro.json
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+# Uploads and rows from the cases go to a throw-away root (db.session reads DATABASE_URL on import)
+TMP_DIR = Path(tempfile.mkdtemp(prefix="bench_micro_"))
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{TMP_DIR}/bench.sqlite3"
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import UploadFile
+from sqlalchemy import insert
+from starlette.applications import Starlette
+from starlette.datastructures import Headers
+from starlette.responses import HTMLResponse
+from starlette.routing import Route
+from wtforms import Form
+
+import web.media
+from bot.handlers import get_excursion_points
+from bot.keyboards import im_here_kb, simple_kb, start_excursion_kb
+from aiogram.types import InlineKeyboardButton
+from db.models import City, Excursion, Point
+from db.schema import init_db
+from db.session import AsyncSessionLocal, async_engine
+from web.cache import response_cache
+from web.main import InjectMediaAssetsMiddleware, app
+from web.media import get_file_extension, save_upload_file, validate_file
+from web.media_admin import MediaField, get_media_preview
+from utils.storage import LocalStorage, configure_storage
+
+# Keep uploads out of the real media directory
+MEDIA_DIR = TMP_DIR / "media"
+for media_type in web.media.ALLOWED_EXTENSIONS:
+    (MEDIA_DIR / media_type).mkdir(parents=True, exist_ok=True)
+configure_storage(LocalStorage(TMP_DIR))
+
+PREVIEW_FILE = MEDIA_DIR / "images" / "preview.jpg"
+PREVIEW_FILE.write_bytes(b"\xff\xd8\xff\xd9")
+ADMIN_PAGE = "<html><head><title>List</title></head><body>" + "<tr><td>row</td></tr>" * 2000 + "</body></html>"
+
+
+class Case:
+    """A named callable, sync or async, with optional per-call cleanup"""
+
+    def __init__(self, name, func, is_async=False, iterations=2000, after=None):
+        self.name = name
+        self.func = func
+        self.is_async = is_async
+        self.iterations = iterations
+        self.after = after
+
+    async def call(self):
+        result = self.func()
+        if self.is_async:
+            result = await result
+        if self.after:
+            self.after(result)
+
+    async def time_per_call(self, iterations, repeat):
+        best = float("inf")
+        for _ in range(repeat):
+            started = time.perf_counter_ns()
+            for _ in range(iterations):
+                await self.call()
+            best = min(best, (time.perf_counter_ns() - started) / iterations)
+        return best
+
+    async def memory_per_call(self, iterations):
+        tracemalloc.start()
+        peak_total = 0
+        baseline, _ = tracemalloc.get_traced_memory()
+        for _ in range(iterations):
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            await self.call()
+            peak_total += tracemalloc.get_traced_memory()[1] - before
+        retained = tracemalloc.get_traced_memory()[0] - baseline
+        tracemalloc.stop()
+        return peak_total / iterations, retained / iterations
+
+
+def upload(name, size):
+    payload = os.urandom(size)
+
+    def make():
+        return save_upload_file(UploadFile(io.BytesIO(payload), filename=name), "images")
+
+    return make
+
+
+def remove_saved(result):
+    path, error = result
+    assert error is None, error
+    (MEDIA_DIR / Path(path).relative_to("media")).unlink()
+
+
+class MediaForm(Form):
+    image = MediaField(media_type="images")
+
+
+def clear_cache(_):
+    # Measure rendering, not cache hits
+    response_cache.clear()
+
+
+def asgi_caller(app, path, query=""):
+    scope = {
+        "type": "http", "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "root_path": "", "query_string": query.encode(),
+        "headers": Headers({"host": "bench"}).raw, "server": ("bench", 80), "client": ("bench", 1),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    return lambda: app(dict(scope), receive, send)
+
+
+async def seed_points():
+    """One excursion per size; returns {size: excursion_id}"""
+    await init_db()
+    excursions = {}
+    async with AsyncSessionLocal() as session:
+        city_id = (await session.execute(insert(City).values(name="Bench").returning(City.id))).scalar_one()
+        for size in (10, 100):
+            excursion_id = (await session.execute(
+                insert(Excursion).values(city_id=city_id, title=f"Bench {size}", description="x" * 500).returning(Excursion.id)
+            )).scalar_one()
+            await session.execute(insert(Point), [
+                {"excursion_id": excursion_id, "order": i + 1, "title": f"Point {i}", "text": "t" * 1000, "lat": 38.5, "lng": 68.7}
+                for i in range(size)
+            ])
+            excursions[size] = excursion_id
+        await session.commit()
+    return excursions
+
+
+async def build_cases():
+    excursions = await seed_points()
+    field = MediaForm(data={"image": str(PREVIEW_FILE)}).image
+    empty_field = MediaForm().image
+    inner = Starlette(routes=[Route("/admin/city/list", lambda request: HTMLResponse(ADMIN_PAGE))])
+    wrapped = InjectMediaAssetsMiddleware(inner)
+    points_query = f"excursion_id={excursions[100]}"
+    city_buttons = [[InlineKeyboardButton(text=f"City {i}", callback_data=f"city:{i}")] for i in range(20)]
+
+    # Occupy name.jpg and name_1..name_99.jpg so save_upload_file walks the collision loop
+    for i in range(100):
+        (MEDIA_DIR / "images" / (f"taken_{i}.jpg" if i else "taken.jpg")).write_bytes(b"")
+
+    return [
+        Case("media.get_file_extension", lambda: get_file_extension("Registan Square.JPG"), iterations=200000),
+        Case("media.validate_file", lambda: validate_file("Registan Square.JPG", "images"), iterations=200000),
+        Case("media.save_upload_file 1KB", upload("photo.jpg", 1024), True, 500, remove_saved),
+        Case("media.save_upload_file 1MB", upload("photo.jpg", 1024 * 1024), True, 200, remove_saved),
+        Case("media.save_upload_file 100 name collisions", upload("taken.jpg", 1024), True, 500, remove_saved),
+        Case("media_admin.get_media_preview existing", lambda: get_media_preview(str(PREVIEW_FILE), "images"), iterations=20000),
+        Case("media_admin.get_media_preview missing", lambda: get_media_preview("media/images/missing.jpg", "images"), iterations=20000),
+        Case("media_admin.MediaWidget.__call__ with file", lambda: field.widget(field), iterations=20000),
+        Case("media_admin.MediaWidget.__call__ empty", lambda: empty_field.widget(empty_field), iterations=20000),
+        Case("main.admin page without middleware", asgi_caller(inner, "/admin/city/list"), True, 2000),
+        Case("main.InjectMediaAssetsMiddleware admin page", asgi_caller(wrapped, "/admin/city/list"), True, 2000),
+        Case("keyboards.start_excursion_kb", start_excursion_kb, iterations=50000),
+        Case("keyboards.im_here_kb", im_here_kb, iterations=50000),
+        Case("keyboards.simple_kb 20 cities", lambda: simple_kb(city_buttons), iterations=20000),
+        Case("handlers.get_excursion_points 10 points", lambda: get_excursion_points(excursions[10]), True, 1000),
+        Case("handlers.get_excursion_points 100 points", lambda: get_excursion_points(excursions[100]), True, 500),
+        Case("crud.get_points 100 points", asgi_caller(app, "/api/points", points_query), True, 300, clear_cache),
+        Case("crud.get_points 100 points ?fields=id,title,lat,lng",
+             asgi_caller(app, "/api/points", f"{points_query}&fields=id,title,lat,lng"), True, 300, clear_cache),
+    ]
+
+
+def format_ns(ns):
+    if ns >= 1e6:
+        return f"{ns / 1e6:.2f} ms"
+    if ns >= 1e3:
+        return f"{ns / 1e3:.2f} µs"
+    return f"{ns:.0f} ns"
+
+
+async def run(args):
+    results = {}
+    for case in await build_cases():
+        if args.k and args.k not in case.name:
+            continue
+        iterations = max(1, int(case.iterations * args.scale))
+        for _ in range(min(iterations, 50)):
+            await case.call()
+        ns = await case.time_per_call(iterations, args.repeat)
+        peak, retained = await case.memory_per_call(max(1, iterations // 10))
+        results[case.name] = {
+            "ns_per_call": round(ns, 1),
+            "peak_bytes_per_call": round(peak),
+            "retained_bytes_per_call": round(retained, 1),
+            "iterations": iterations,
+        }
+        print(f"{case.name:<50}{format_ns(ns):>12}{round(peak):>12} B{retained:>10.1f} B")
+    await async_engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", help="Only run cases whose name contains this string")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing rounds; the best is reported")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every case's iteration count")
+    parser.add_argument("-o", "--output", help="Write the JSON report here")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown (default 0.2)")
+    args = parser.parse_args()
+
+    print(f"{'case':<50}{'time/call':>12}{'peak alloc':>14}{'retained':>12}")
+    results = asyncio.run(run(args))
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+        print(f"\n📄 Report written to {args.output}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        slower = [
+            f"{name}: {format_ns(baseline[name]['ns_per_call'])} -> {format_ns(stats['ns_per_call'])}"
+            for name, stats in results.items()
+            if name in baseline and stats["ns_per_call"] > baseline[name]["ns_per_call"] * (1 + args.tolerance)
+        ]
+        if slower:
+            print(f"\n❌ {len(slower)} case(s) slower by more than {args.tolerance:.0%}:")
+            for line in slower:
+                print(f"   {line}")
+            sys.exit(1)
+        print(f"\n✅ No case slower by more than {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
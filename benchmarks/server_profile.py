@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Requests/s and latency of web/run_admin.py under its launch profiles.
+
+Seeds a throw-away database with web/generate_data.py, then for each
+profile starts run_admin.py on it and has --concurrency keep-alive clients
+send a fixed request mix for --duration seconds:
+
+    lists    GET /api/points?excursion_id=...&fields=id,title,lat,lng
+    details  GET /api/points/{id}, GET /api/excursions/{id}
+    writes   PUT /api/points/{id} (JSON from the CRUD router's response class)
+    health   GET /healthz
+
+    development  the previous run_admin.py settings (uvicorn defaults, full access log)
+    production   the default profile (see web/server.py)
+
+    python benchmarks/server_profile.py
+    python benchmarks/server_profile.py --workers 4 --concurrency 128 -o profiles.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from argparse import Namespace
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.append(str(ROOT_DIR))
+
+MIX = {"lists": 30, "details": 40, "writes": 10, "health": 20}
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def seed_database(args) -> None:
+    from web.generate_data import excursions_for, generate
+
+    generate(Namespace(
+        cities=5, excursions=max(50, excursions_for(args.points)), points=args.points,
+        seed=42, media_files=0, batch_size=10000, keep_triggers=False,
+    ))
+
+
+async def wait_ready(base_url: str) -> None:
+    import aiohttp
+
+    async with aiohttp.ClientSession() as session:
+        for _ in range(300):
+            try:
+                async with session.get(f"{base_url}/healthz") as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.1)
+    raise SystemExit("Server did not start")
+
+
+async def drive(base_url: str, args) -> dict:
+    import aiohttp
+
+    rng = random.Random(42)
+    latencies = []
+    errors = 0
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    async with aiohttp.ClientSession(base_url, connector=connector) as session:
+        async with session.get("/api/points", params={"fields": "id,excursion_id"}) as response:
+            points = await response.json()
+        excursions = sorted({point["excursion_id"] for point in points})
+        point_ids = [point["id"] for point in points]
+
+        def request():
+            kind = rng.choices(list(MIX), list(MIX.values()))[0]
+            if kind == "lists":
+                query = {"excursion_id": rng.choice(excursions), "fields": "id,title,lat,lng"}
+                return session.get("/api/points", params=query)
+            if kind == "details":
+                if rng.random() < 0.5:
+                    return session.get(f"/api/points/{rng.choice(point_ids)}")
+                return session.get(f"/api/excursions/{rng.choice(excursions)}")
+            if kind == "writes":
+                return session.put(f"/api/points/{rng.choice(point_ids)}", json={"lat": rng.uniform(-60, 60)})
+            return session.get("/healthz")
+
+        async def client(deadline, record):
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                async with request() as response:
+                    await response.read()
+                if record:
+                    latencies.append(time.perf_counter() - started)
+                    errors += response.status != 200
+
+        # Warm up caches and connections, then measure
+        await asyncio.gather(*(client(time.perf_counter() + args.warmup, False) for _ in range(args.concurrency)))
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*(client(deadline, True) for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "requests_per_s": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+def run(profile: str, args) -> dict:
+    port = free_port()
+    command = [sys.executable, "web/run_admin.py", "--profile", profile,
+               "--port", str(port), "--host", "127.0.0.1", "--workers", str(args.workers)]
+    # The access log goes to stdout; a file is a fair stand-in for a real log sink
+    with tempfile.TemporaryFile() as log:
+        server = subprocess.Popen(command, cwd=ROOT_DIR, env=os.environ.copy(), stdout=log, stderr=log)
+        try:
+            base_url = f"http://127.0.0.1:{port}"
+            asyncio.run(wait_ready(base_url))
+            return asyncio.run(drive(base_url, args))
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", default="development,production")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10, help="Measured seconds per profile")
+    parser.add_argument("--warmup", type=float, default=2, help="Seconds discarded before measuring")
+    parser.add_argument("--points", type=int, default=2000)
+    parser.add_argument("-o", "--output", help="Write the JSON report here")
+    args = parser.parse_args()
+
+    # Point db.session (here and in the servers) at the database before anything imports it
+    tmp_dir = tempfile.mkdtemp(prefix="bench_profile_")
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tmp_dir}/bench.sqlite3"
+    seed_database(args)
+
+    results = {}
+    print(f"\n{'profile':<14}{'req':>8}{'err':>6}{'req/s':>10}{'p50 ms':>9}{'p99 ms':>9}")
+    for profile in args.profiles.split(","):
+        stats = run(profile, args)
+        results[profile] = stats
+        print(f"{profile:<14}{stats['requests']:>8}{stats['errors']:>6}{stats['requests_per_s']:>10.1f}"
+              f"{stats['p50_ms']:>9.2f}{stats['p99_ms']:>9.2f}")
+
+    from web.server import event_loop, http_protocol
+    print(f"\nloop={event_loop()} http={http_protocol()} (uvloop/httptools are used when installed)")
+    if args.output:
+        report = {
+            "config": {key: getattr(args, key) for key in ("workers", "concurrency", "duration", "warmup", "points")},
+            "environment": {
+                "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+                "loop": event_loop(), "http": http_protocol(),
+            },
+            "results": results,
+        }
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"📄 Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
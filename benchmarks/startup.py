@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Cold-start and import-time report for the web and bot processes.
+
+Each measurement runs in a fresh interpreter:
+
+    web  interpreter start -> import web.main -> startup event -> first
+         handled GET /healthz (ASGI, no sockets)
+    bot  interpreter start -> import bot/main.py -> init_db -> dispatcher ready
+
+Also prints a `-X importtime` breakdown of our own modules (db, web, bot,
+utils) and the heaviest third-party packages they pull in.
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 10 -o startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent.parent
+OWN_PACKAGES = ("db", "web", "bot", "utils", "handlers", "middlewares", "profiling")
+
+WEB_COLD_START = """
+import time, asyncio
+started = time.perf_counter()
+import httpx
+from web.main import app
+async def main():
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://startup") as client:
+            assert (await client.get("/healthz")).status_code == 200
+            print(time.perf_counter() - started)
+asyncio.run(main())
+"""
+
+BOT_COLD_START = """
+import time, asyncio, sys
+started = time.perf_counter()
+sys.path.insert(0, "bot")
+import main as bot_main
+from aiogram import Dispatcher
+async def main():
+    await bot_main.init_db()
+    dp = Dispatcher()
+    dp.include_router(bot_main.profiling_router)
+    dp.include_router(bot_main.router)
+    print(time.perf_counter() - started)
+asyncio.run(main())
+"""
+
+
+def run_python(code, env, *flags):
+    result = subprocess.run(
+        [sys.executable, *flags, "-c", code], cwd=ROOT_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    return result
+
+
+def cold_start(code, env, runs):
+    # Interpreter start-up happens before the script's clock starts; time the process instead
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        run_python(code, env)
+        samples.append(time.perf_counter() - started)
+    return {"median_s": round(statistics.median(samples), 4), "min_s": round(min(samples), 4), "runs": runs}
+
+
+def import_times(module, env):
+    """Cumulative and self import time (µs) per module from -X importtime"""
+    stderr = run_python(f"import {module}", env, "-X", "importtime").stderr
+    rows = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows[name.strip()] = (int(self_us), int(cumulative_us))
+    return rows
+
+
+def report_imports(title, rows, top):
+    own = {name: times for name, times in rows.items() if name.split(".")[0] in OWN_PACKAGES}
+    third_party = {
+        name: times for name, times in rows.items()
+        if "." not in name and name not in own
+    }
+    print(f"\n{title}: own modules (cumulative / self ms)")
+    for name, (self_us, cumulative_us) in sorted(own.items(), key=lambda item: -item[1][1]):
+        print(f"   {name:<28}{cumulative_us / 1000:>9.1f}{self_us / 1000:>9.1f}")
+    print(f"{title}: top {top} third-party packages (cumulative ms)")
+    for name, (_, cumulative_us) in sorted(third_party.items(), key=lambda item: -item[1][1])[:top]:
+        print(f"   {name:<28}{cumulative_us / 1000:>9.1f}")
+    return {
+        "own_ms": {name: round(times[1] / 1000, 1) for name, times in own.items()},
+        "third_party_ms": {name: round(times[1] / 1000, 1) for name, times in third_party.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("-o", "--output", help="Write the JSON report here")
+    args = parser.parse_args()
+
+    env = os.environ.copy()
+    env["DATABASE_URL"] = f"sqlite+aiosqlite:///{tempfile.mkdtemp(prefix='bench_startup_')}/startup.sqlite3"
+    # First start creates the schema; the measured runs see an up-to-date database
+    run_python(WEB_COLD_START, env)
+
+    report = {
+        "web_cold_start": cold_start(WEB_COLD_START, env, args.runs),
+        "bot_cold_start": cold_start(BOT_COLD_START, env, args.runs),
+        "web_imports": report_imports("web.main", import_times("web.main", env), args.top),
+    }
+    print(f"\n🚀 web: {report['web_cold_start']['median_s'] * 1000:.0f} ms to first request (median of {args.runs})")
+    print(f"🤖 bot: {report['bot_cold_start']['median_s'] * 1000:.0f} ms to dispatcher ready (median of {args.runs})")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"\n📄 Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
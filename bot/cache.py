@@ -0,0 +1,212 @@
+"""
+Catalog cache for the bot, invalidated by changes from any process.
+
+Entries are tagged with the content scopes they were built from
+("excursions:3", "points:17") plus parent tags ("excursions:3:children",
+"cities:1:children") for lists that gain or lose members. A ChangeWatcher
+reports changed scopes; changed points and excursions are looked up to
+find their current parents, and exactly the entries carrying those tags
+are evicted. A point's previous excursion (it was deleted or moved) comes
+from the cached route that lists it; when no route does, every city's
+excursion list is evicted. Without a running watcher nothing is cached.
+"""
+import os
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+
+from db.changes import ChangeWatcher
+from db.models import City, Excursion, Point
+from db.session import AsyncSessionLocal
+from utils.logger import setup_logger
+
+logger = setup_logger('bot_cache')
+
+CACHE_MAX_ENTRIES = int(os.getenv("BOT_CACHE_MAX_ENTRIES", 10000))
+POLL_INTERVAL = float(os.getenv("BOT_CACHE_POLL_INTERVAL", 0.25))
+# Carried by every city's excursion list, evicted when a point's previous excursion is unknown
+CITY_EXCURSIONS_TAG = "city_excursions"
+
+
+class TaggedCache:
+    """LRU cache whose entries can be evicted by tag"""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, Tuple[Any, Set[str]]]" = OrderedDict()
+        self._keys_by_tag: Dict[str, Set[tuple]] = {}
+        # Bumped on every eviction batch; a load that overlaps one is not stored
+        self.generation = 0
+        self.enabled = False
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def set(self, key: tuple, value, tags: Iterable[str]) -> None:
+        self._remove(key)
+        tags = set(tags)
+        self._entries[key] = (value, tags)
+        for tag in tags:
+            self._keys_by_tag.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: tuple) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[1]:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+    def keys(self, tag: str) -> Set[tuple]:
+        return set(self._keys_by_tag.get(tag, ()))
+
+    def evict(self, tags: Iterable[str]) -> int:
+        self.generation += 1
+        keys = set()
+        for tag in tags:
+            keys |= self._keys_by_tag.get(tag, set())
+        for key in keys:
+            self._remove(key)
+        return len(keys)
+
+    def clear(self) -> None:
+        self.generation += 1
+        self._entries.clear()
+        self._keys_by_tag.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+cache = TaggedCache()
+
+
+async def cached(key: tuple, load: Callable[[], Awaitable[Tuple[Any, Iterable[str]]]]):
+    """Return the cached value for key, or load (value, tags) and cache it"""
+    if not cache.enabled:
+        return (await load())[0]
+    value = cache.get(key)
+    if value is not None:
+        return value
+    generation = cache.generation
+    value, tags = await load()
+    if generation == cache.generation:
+        cache.set(key, value, tags)
+    return value
+
+
+def _ids(scopes: Set[str], table: str) -> List[int]:
+    prefix = f"{table}:"
+    return [int(scope[len(prefix):]) for scope in scopes if scope.startswith(prefix)]
+
+
+async def affected_tags(scopes: Set[str]) -> Set[str]:
+    """Changed scopes plus the parent tags of the changed points and excursions"""
+    tags = set(scopes)
+    point_ids = _ids(scopes, "points")
+    excursion_ids = _ids(scopes, "excursions")
+    if not point_ids and not excursion_ids:
+        return tags
+    async with AsyncSessionLocal() as session:
+        if point_ids:
+            rows = await session.execute(
+                select(Excursion.id, Excursion.city_id)
+                .join(Point, Point.excursion_id == Excursion.id)
+                .where(Point.id.in_(point_ids))
+            )
+            for excursion_id, city_id in rows:
+                tags.add(f"excursions:{excursion_id}:children")
+                tags.add(f"cities:{city_id}:children")
+            # The row of a deleted point is gone and a moved one names only its new excursion
+            for point_id in point_ids:
+                routes = [key[1] for key in cache.keys(f"points:{point_id}") if key[0] == "excursion_points"]
+                if not routes:
+                    tags.add(CITY_EXCURSIONS_TAG)
+                tags.update(f"excursions:{excursion_id}:children" for excursion_id in routes)
+        if excursion_ids:
+            rows = await session.execute(select(Excursion.city_id).where(Excursion.id.in_(excursion_ids)))
+            tags.update(f"cities:{city_id}:children" for city_id in rows.scalars())
+    return tags
+
+
+async def on_changes(scopes: Set[str]) -> None:
+    evicted = cache.evict(await affected_tags(scopes))
+    logger.info(f"{len(scopes)} changed scopes, evicted {evicted} entries")
+
+
+watcher = ChangeWatcher(on_changes, interval=POLL_INTERVAL)
+
+
+async def start() -> None:
+    """Start following changes; caching is enabled only while the watcher runs"""
+    await watcher.start()
+    cache.enabled = True
+
+
+async def stop() -> None:
+    cache.enabled = False
+    cache.clear()
+    await watcher.stop()
+
+
+# Cached catalog queries used by the handlers
+
+async def get_trip_cities() -> List[City]:
+    """Cities that have at least one excursion"""
+    async def load():
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(select(City).where(City.excursions.any()))
+            return result.scalars().all(), ["cities", "excursions"]
+    return await cached(("trip_cities",), load)
+
+
+async def get_city_excursions(city_id: int) -> Tuple[Optional[City], List[Excursion]]:
+    """A city and its excursions that have points"""
+    async def load():
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(Excursion).where(Excursion.city_id == city_id).where(Excursion.points.any())
+            )
+            excursions = result.scalars().all()
+            city = await session.get(City, city_id)
+        # An excursion whose last point goes leaves the list: its points are its children
+        tags = [f"cities:{city_id}", f"cities:{city_id}:children", CITY_EXCURSIONS_TAG]
+        tags += [tag for e in excursions for tag in (f"excursions:{e.id}", f"excursions:{e.id}:children")]
+        return (city, excursions), tags
+    return await cached(("city_excursions", city_id), load)
+
+
+async def get_excursion(exc_id: int) -> Optional[Excursion]:
+    async def load():
+        async with AsyncSessionLocal() as session:
+            excursion = await session.get(Excursion, exc_id)
+        return excursion, [f"excursions:{exc_id}"]
+    return await cached(("excursion", exc_id), load)
+
+
+async def get_excursion_points(exc_id: int) -> List[Point]:
+    """Points of an excursion in route order"""
+    async def load():
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(Point)
+                .where(Point.excursion_id == exc_id)
+                .order_by(Point.order)
+            )
+            points = result.scalars().all()
+        return points, [f"excursions:{exc_id}:children"] + [f"points:{p.id}" for p in points]
+    return await cached(("excursion_points", exc_id), load)
@@ -1,14 +1,24 @@
 from aiogram import Router, F
-from aiogram.types import Message, CallbackQuery, FSInputFile, InlineKeyboardButton
-from aiogram.filters import Command
+from aiogram.types import (
+    Message,
+    CallbackQuery,
+    InlineKeyboardButton,
+    InlineQuery,
+    InlineQueryResultArticle,
+    InputTextMessageContent,
+)
+from aiogram.filters import Command, CommandObject
 from aiogram.fsm.context import FSMContext
 from aiogram.enums import ParseMode
 from aiogram.utils.media_group import MediaGroupBuilder
 from sqlalchemy import select
 
 from db.session import AsyncSessionLocal
-from db.models import City, Excursion, Point
+from db.models import Excursion
+from db.search import search
+from bot.cache import get_city_excursions, get_excursion, get_excursion_points, get_trip_cities
 from bot.states import TripState
+from bot.media import media_file
 from bot.keyboards import simple_kb, start_excursion_kb, im_here_kb, next_kb, home_kb
 from utils.logger import setup_logger
 
@@ -17,8 +27,12 @@ router = Router()
 
 
 @router.message(Command("start"))
-async def start(msg: Message):
+async def start(msg: Message, command: CommandObject, state: FSMContext):
     logger.info(f"User {msg.from_user.id} started bot")
+    # Deep link from an inline search result: /start exc_<id>
+    if command.args and command.args.startswith("exc_") and command.args[4:].isdigit():
+        await show_excursion(msg, state, int(command.args[4:]))
+        return
     await msg.answer(
         "👋 Привет! Это телеграм бот: <b>ГИД В КАРМАНЕ</b>\n\n"
         "🎧 Аудиогид по локациям\n"
@@ -53,9 +67,7 @@ async def instruction(msg: Message):
 async def get_trips(msg: Message, state: FSMContext):
     try:
         logger.info(f"User {msg.from_user.id} requested trips")
-        async with AsyncSessionLocal() as session:
-            result = await session.execute(select(City).where(City.excursions.any()))
-            cities = result.scalars().all()
+        cities = await get_trip_cities()
         
         logger.info(f"Found {len(cities)} cities")
         
@@ -83,13 +95,9 @@ async def choose_city(call: CallbackQuery, state: FSMContext):
     await call.message.edit_reply_markup(reply_markup=None)
     await state.update_data(city_id=city_id)
     
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(select(Excursion).where(Excursion.city_id == city_id).where(Excursion.points.any()))
-        excursions = result.scalars().all()
-        city = await session.execute(select(City).where(City.id == city_id))
-        city = city.scalars().first()
-        if city.image:
-            await call.message.answer_photo(FSInputFile(city.image))
+    city, excursions = await get_city_excursions(city_id)
+    if city.image:
+        await call.message.answer_photo(media_file(city.image))
     
     await call.message.answer(f"✅ Выбрано: *{city.name}*", parse_mode="Markdown")
 
@@ -105,22 +113,61 @@ async def excursion_info(call: CallbackQuery, state: FSMContext):
     logger.info(f"User {call.from_user.id} selected excursion {exc_id}")
     await call.answer()
     await call.message.edit_reply_markup(reply_markup=None)
-    await state.update_data(excursion_id=exc_id, point_index=0)
+    await show_excursion(call.message, state, exc_id)
 
-    async with AsyncSessionLocal() as session:
-        exc = await session.get(Excursion, exc_id)
-        result = await session.execute(select(Point).where(Point.excursion_id == exc_id))
-        points = result.scalars().all()
-        
-    await call.message.answer(f"✅ Выбрано: *{exc.title}*", parse_mode="Markdown")
 
-    await call.message.answer(
-        f"*{exc.title}*\n\n{exc.description}\n\n📍 Точек: {len(points)}",
+async def show_excursion(message: Message, state: FSMContext, exc_id: int):
+    exc = await get_excursion(exc_id)
+    if exc is None:
+        await message.answer("❌ Экскурсия не найдена.")
+        return
+
+    await state.update_data(excursion_id=exc_id, point_index=0)
+    await message.answer(f"✅ Выбрано: *{exc.title}*", parse_mode="Markdown")
+
+    await message.answer(
+        f"*{exc.title}*\n\n{exc.description}\n\n📍 Точек: {len(await get_excursion_points(exc_id))}",
         reply_markup=start_excursion_kb(),
         parse_mode="Markdown",
     )
 
 
+@router.inline_query()
+async def inline_search(query: InlineQuery):
+    """Inline mode: `@bot рудаки` lists matching excursions"""
+    async with AsyncSessionLocal() as session:
+        hits = await search(session, query.query, entity="excursion", limit=20)
+        excursions = {}
+        if hits:
+            result = await session.execute(
+                select(Excursion).where(Excursion.id.in_([hit.id for hit in hits]))
+            )
+            excursions = {e.id: e for e in result.scalars()}
+
+    bot_username = (await query.bot.me()).username
+    results = []
+    for hit in hits:
+        exc = excursions.get(hit.id)
+        if exc is None:
+            continue
+        results.append(
+            InlineQueryResultArticle(
+                id=str(exc.id),
+                title=exc.title,
+                description=hit.snippet,
+                input_message_content=InputTextMessageContent(
+                    message_text=f"🎒 {exc.title}\n\n{exc.description}"
+                ),
+                reply_markup=simple_kb([[InlineKeyboardButton(
+                    text="▶️ Открыть экскурсию",
+                    url=f"https://t.me/{bot_username}?start=exc_{exc.id}",
+                )]]),
+            )
+        )
+    logger.info(f"Inline query {query.query!r} from {query.from_user.id}: {len(results)} results")
+    await query.answer(results, cache_time=60)
+
+
 @router.callback_query(F.data == "start_trip")
 async def start_trip(call: CallbackQuery, state: FSMContext):
     data = await state.get_data()
@@ -131,14 +178,8 @@ async def start_trip(call: CallbackQuery, state: FSMContext):
 
 
 async def send_point(call, exc_id, index):
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(
-            select(Point)
-            .where(Point.excursion_id == exc_id)
-            .order_by(Point.order)
-        )
-        points = result.scalars().all()
-        point = points[index]
+    points = await get_excursion_points(exc_id)
+    point = points[index]
 
     await call.message.answer_location(point.lat, point.lng)
     await call.message.answer(
@@ -154,26 +195,19 @@ async def at_place(call: CallbackQuery, state: FSMContext):
     idx = data["point_index"]
     await call.answer()
     await call.message.edit_reply_markup(reply_markup=None)
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(
-            select(Point)
-            .where(Point.excursion_id == data["excursion_id"])
-            .order_by(Point.order)
-        )
-        points = result.scalars().all()
-
+    points = await get_excursion_points(data["excursion_id"])
     point = points[idx]
 
     media_group = MediaGroupBuilder()
     
     if point.image:
-        media_group.add_photo(media=FSInputFile(point.image))
+        media_group.add_photo(media=media_file(point.image))
     if point.video:
-        media_group.add_video(media=FSInputFile(point.video))
+        media_group.add_video(media=media_file(point.video))
     await call.message.answer_media_group(media_group.build())
     
     if point.audio:
-        await call.message.answer_audio(FSInputFile(point.audio))
+        await call.message.answer_audio(media_file(point.audio))
         
     await call.message.answer(point.text, reply_markup=next_kb())
 
@@ -185,12 +219,7 @@ async def next_point(call: CallbackQuery, state: FSMContext):
     await call.message.edit_reply_markup(reply_markup=None)
 
 
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(
-            select(Point).where(Point.excursion_id == data["excursion_id"])
-        )
-        points = result.scalars().all()
-
+    points = await get_excursion_points(data["excursion_id"])
     if idx >= len(points):
         await call.message.answer("🎉 Экскурсия завершена!", reply_markup=home_kb())
         await state.clear()
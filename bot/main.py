@@ -1,16 +1,20 @@
-import asyncio
 import sys
 import os
 from pathlib import Path
-from aiogram import Bot, Dispatcher
+from aiogram import Dispatcher
 
 # Add project root to Python path
 sys.path.append(str(Path(__file__).parent.parent))
 
 from handlers import router
-from db.base import Base
-from db.session import async_engine
+from middlewares import SQLProfilerMiddleware
+from bot import cache as bot_cache
+from bot.runtime import create_bot, describe, polling_options, run
+from profiling import install_signal_handlers, router as profiling_router
+from db import profiler
+from db.schema import init_db
 from utils.logger import setup_logger
+from utils.storage import get_storage
 
 from dotenv import load_dotenv
 
@@ -21,18 +25,29 @@ logger = setup_logger('bot_main')
 
 
 async def main():
-    logger.info("Starting bot...")
-    # Create all tables
-    async with async_engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    logger.info(f"Starting bot... ({describe()})")
+    # Create all tables and triggers
+    await init_db()
 
-    bot = Bot(BOT_TOKEN)
+    bot = create_bot(BOT_TOKEN)
     dp = Dispatcher()
+    dp.include_router(profiling_router)
     dp.include_router(router)
+    if profiler.enabled():
+        dp.update.outer_middleware(SQLProfilerMiddleware())
+
+    install_signal_handlers()
+
+    # Catalog cache, kept in sync with admin edits by polling the change feed
+    await bot_cache.start()
 
     logger.info("Bot started polling")
-    await dp.start_polling(bot)
+    try:
+        await dp.start_polling(bot, **polling_options())
+    finally:
+        await bot_cache.stop()
+        await get_storage().close()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    run(main())
@@ -0,0 +1,31 @@
+"""
+Media files for Telegram messages, read through the storage backend
+"""
+from typing import AsyncGenerator
+
+from aiogram import Bot
+from aiogram.types import FSInputFile, InputFile
+
+from utils.storage import Storage, get_storage
+
+
+class StorageInputFile(InputFile):
+    """Uploads an object from (remote) storage, streaming it to Telegram"""
+
+    def __init__(self, storage: Storage, key: str):
+        super().__init__(filename=key.rsplit("/", 1)[-1])
+        self.storage = storage
+        self.key = key
+
+    async def read(self, bot: Bot) -> AsyncGenerator[bytes, None]:
+        async for chunk in self.storage.stream(self.key, chunk_size=self.chunk_size):
+            yield chunk
+
+
+def media_file(path: str) -> InputFile:
+    """InputFile for a stored media path ("media/images/x.jpg")"""
+    storage = get_storage()
+    local_path = storage.local_path(path)
+    if local_path is not None:
+        return FSInputFile(local_path)
+    return StorageInputFile(storage, path)
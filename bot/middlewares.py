@@ -0,0 +1,32 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+from db import profiler
+
+
+def update_label(update: Update) -> str:
+    """Short label for an update: command name, callback prefix or update type"""
+    event = update.event
+    if update.message and event.text and event.text.startswith("/"):
+        return f"message {event.text.split()[0]}"
+    if update.callback_query and event.data:
+        return f"callback {event.data.split(':')[0]}"
+    return update.event_type
+
+
+class SQLProfilerMiddleware(BaseMiddleware):
+    """Attribute SQL statements to the Telegram update that issued them"""
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        token = profiler.start_unit(update_label(event))
+        try:
+            return await handler(event, data)
+        finally:
+            profiler.end_unit(token)
@@ -0,0 +1,74 @@
+import asyncio
+import os
+import signal
+
+from aiogram import Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import BufferedInputFile, Message
+
+from utils.logger import LOGS_DIR, setup_logger
+from utils.profiling import ProfilerBusy, cpu_profile, dump_tasks, memory_profile
+
+logger = setup_logger('bot_profiling')
+router = Router()
+
+# Telegram user ids allowed to run /profile, comma separated
+ADMIN_IDS = {int(i) for i in os.getenv("BOT_ADMIN_IDS", "").split(",") if i.strip()}
+SIGNAL_CPU_SECONDS = 30
+
+USAGE = (
+    "/profile cpu [seconds] [collapsed|pstats]\n"
+    "/profile memory [seconds]\n"
+    "/profile tasks"
+)
+
+
+@router.message(Command("profile"))
+async def profile(msg: Message, command: CommandObject):
+    if msg.from_user.id not in ADMIN_IDS:
+        return
+    args = (command.args or "").split()
+    kind = args[0] if args else ""
+    try:
+        seconds = float(args[1]) if len(args) > 1 else 10
+        if kind == "cpu":
+            await msg.answer(f"⏱ Профилирование CPU {seconds:g} с...")
+            filename, body = await cpu_profile(seconds, args[2] if len(args) > 2 else "collapsed")
+        elif kind == "memory":
+            await msg.answer(f"⏱ Снимок памяти через {seconds:g} с...")
+            filename, body = await memory_profile(seconds)
+        elif kind == "tasks":
+            filename, body = dump_tasks()
+        else:
+            await msg.answer(USAGE)
+            return
+    except (ValueError, ProfilerBusy) as e:
+        await msg.answer(f"❌ {e}")
+        return
+    logger.info(f"User {msg.from_user.id} captured {filename}")
+    await msg.answer_document(BufferedInputFile(body, filename=filename))
+
+
+def _write(filename: str, body: bytes) -> None:
+    path = LOGS_DIR / filename
+    path.write_bytes(body)
+    logger.info(f"Profile written to {path}")
+
+
+async def _signal_cpu_profile() -> None:
+    try:
+        _write(*await cpu_profile(SIGNAL_CPU_SECONDS))
+    except ProfilerBusy as e:
+        logger.warning(str(e))
+
+
+def install_signal_handlers() -> None:
+    """
+    SIGUSR1 dumps task stacks, SIGUSR2 records a CPU profile; results go to logs/
+    (for when the bot is too busy to answer /profile)
+    """
+    if not hasattr(signal, "SIGUSR1"):
+        return
+    loop = asyncio.get_running_loop()
+    loop.add_signal_handler(signal.SIGUSR1, lambda: _write(*dump_tasks()))
+    loop.add_signal_handler(signal.SIGUSR2, lambda: loop.create_task(_signal_cpu_profile()))
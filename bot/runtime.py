@@ -0,0 +1,211 @@
+"""
+Runtime profiles for the bot process
+
+    production   uvloop when installed, a pooled keep-alive connector to the
+                 Bot API, orjson for decoding updates and encoding requests,
+                 request timeouts and retries of transient network errors
+    development  aiogram's defaults under the default asyncio loop
+
+Settings come from the environment: BOT_PROFILE, BOT_API_URL (a local Bot API
+server), BOT_CONNECTION_LIMIT, BOT_KEEP_ALIVE and BOT_DNS_TTL (seconds),
+BOT_REQUEST_TIMEOUT and BOT_UPLOAD_TIMEOUT (seconds), BOT_RETRY_ATTEMPTS,
+BOT_RETRY_BACKOFF (seconds), BOT_POLLING_TIMEOUT (seconds) and
+BOT_MAX_CONCURRENT_UPDATES.
+"""
+import asyncio
+import os
+import random
+from typing import Any, Coroutine, Dict, Optional
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import PRODUCTION, TelegramAPIServer
+from aiogram.exceptions import TelegramNetworkError, TelegramServerError
+from aiogram.methods import GetUpdates, Response, TelegramMethod
+from aiogram.types import InputFile
+from aiohttp import BytesPayload, ClientConnectorError
+
+from utils.logger import setup_logger
+
+try:
+    import orjson
+except ImportError:  # optional: the standard json module
+    orjson = None
+
+try:
+    import uvloop
+except ImportError:  # optional: the default asyncio loop
+    uvloop = None
+
+logger = setup_logger('bot_runtime')
+
+PROFILES = ("production", "development")
+DEFAULT_PROFILE = os.getenv("BOT_PROFILE", "production")
+API_URL = os.getenv("BOT_API_URL", "")
+
+CONNECTION_LIMIT = int(os.getenv("BOT_CONNECTION_LIMIT", 100))
+# Idle connections stay open between bursts instead of aiohttp's 15 s
+KEEP_ALIVE = float(os.getenv("BOT_KEEP_ALIVE", 60))
+DNS_TTL = int(os.getenv("BOT_DNS_TTL", 3600))
+REQUEST_TIMEOUT = float(os.getenv("BOT_REQUEST_TIMEOUT", 30))
+UPLOAD_TIMEOUT = float(os.getenv("BOT_UPLOAD_TIMEOUT", 300))
+RETRY_ATTEMPTS = int(os.getenv("BOT_RETRY_ATTEMPTS", 3))
+RETRY_BACKOFF = float(os.getenv("BOT_RETRY_BACKOFF", 0.5))
+MAX_RETRY_BACKOFF = 10.0
+POLLING_TIMEOUT = int(os.getenv("BOT_POLLING_TIMEOUT", 30))
+MAX_CONCURRENT_UPDATES = int(os.getenv("BOT_MAX_CONCURRENT_UPDATES", 200))
+
+
+def event_loop() -> str:
+    return "uvloop" if uvloop is not None else "asyncio"
+
+
+def json_codec() -> str:
+    return "orjson" if orjson is not None else "json"
+
+
+def _orjson_dumps(obj: Any) -> str:
+    return orjson.dumps(obj).decode()
+
+
+def api_server(url: str = API_URL) -> TelegramAPIServer:
+    """The Bot API at ``url`` (https://api.telegram.org when empty)"""
+    if not url:
+        return PRODUCTION
+    return TelegramAPIServer.from_base(url)
+
+
+# pydantic caches parametrized generics weakly, so aiogram's Response[<result type>]
+# is rebuilt (milliseconds of schema work) each time it has been garbage collected
+_response_types: Dict[Any, type] = {}
+
+
+def keep_response_type(method: TelegramMethod) -> None:
+    returning = method.__returning__
+    if returning not in _response_types:
+        _response_types[returning] = Response[returning]
+
+
+def uploads_file(method: TelegramMethod) -> bool:
+    """Whether the request carries a file to upload (a photo, or one inside a media group)"""
+    for name in type(method).model_fields:
+        value = getattr(method, name, None)
+        for item in value if isinstance(value, list) else (value,):
+            if isinstance(item, InputFile) or isinstance(getattr(item, "media", None), InputFile):
+                return True
+    return False
+
+
+class TunedSession(AiohttpSession):
+    """
+    AiohttpSession with a tunable connector, orjson and retries
+
+    Requests without files are sent as JSON bodies (the Bot API accepts
+    both) rather than urlencoded forms, whose quoting of long non-ASCII
+    texts costs more than encoding the whole request with orjson.
+
+    A request whose connection was never made (connection refused, DNS
+    failure) is retried with jittered exponential backoff. Resets,
+    disconnects, timeouts and 5xx responses are retried only for get*
+    methods: a send that failed after reaching the Bot API may have been
+    delivered. getUpdates is never retried here, the dispatcher's polling
+    loop has its own backoff.
+    """
+
+    def __init__(
+        self,
+        api: TelegramAPIServer = PRODUCTION,
+        limit: int = CONNECTION_LIMIT,
+        keep_alive: float = KEEP_ALIVE,
+        dns_ttl: int = DNS_TTL,
+        timeout: float = REQUEST_TIMEOUT,
+        upload_timeout: float = UPLOAD_TIMEOUT,
+        retry_attempts: int = RETRY_ATTEMPTS,
+        retry_backoff: float = RETRY_BACKOFF,
+        **kwargs: Any,
+    ):
+        if orjson is not None:
+            kwargs.setdefault("json_loads", orjson.loads)
+            kwargs.setdefault("json_dumps", _orjson_dumps)
+        super().__init__(api=api, limit=limit, timeout=timeout, **kwargs)
+        self._connector_init.update(keepalive_timeout=keep_alive, ttl_dns_cache=dns_ttl)
+        self.upload_timeout = upload_timeout
+        self.retry_attempts = retry_attempts
+        self.retry_backoff = retry_backoff
+
+    def build_form_data(self, bot: Bot, method: TelegramMethod):
+        if orjson is None:
+            return super().build_form_data(bot, method)
+        files: Dict[str, InputFile] = {}
+        params = {}
+        for key, value in method.model_dump(warnings=False).items():
+            value = self.prepare_value(value, bot=bot, files=files, _dumps_json=False)
+            # As in the form: unset and false values are left out
+            if value:
+                params[key] = value
+        if files:
+            return super().build_form_data(bot, method)
+        return BytesPayload(orjson.dumps(params), content_type="application/json")
+
+    def retry_delay(self, attempt: int) -> float:
+        delay = min(MAX_RETRY_BACKOFF, self.retry_backoff * 2 ** (attempt - 1))
+        # Jitter keeps the requests that failed together from retrying together
+        return random.uniform(delay / 2, delay)
+
+    @staticmethod
+    def is_transient(method: TelegramMethod, error: Exception) -> bool:
+        if isinstance(method, GetUpdates):
+            return False
+        if isinstance(error, TelegramNetworkError) and isinstance(error.__context__, ClientConnectorError):
+            return True
+        return method.__api_method__.startswith("get") and isinstance(error, (TelegramNetworkError, TelegramServerError))
+
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: Optional[int] = None) -> Any:
+        keep_response_type(method)
+        if timeout is None and uploads_file(method):
+            timeout = self.upload_timeout
+        attempt = 0
+        while True:
+            try:
+                return await super().make_request(bot, method, timeout)
+            except (TelegramNetworkError, TelegramServerError) as e:
+                attempt += 1
+                if attempt > self.retry_attempts or not self.is_transient(method, e):
+                    raise
+                delay = self.retry_delay(attempt)
+                logger.warning(f"{method.__api_method__} failed ({e}), retry {attempt} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+
+def create_bot(token: str, profile: str = DEFAULT_PROFILE, api_url: str = API_URL) -> Bot:
+    if profile not in PROFILES:
+        raise ValueError(f"profile must be one of {', '.join(PROFILES)}")
+    if profile == "production":
+        session = TunedSession(api=api_server(api_url))
+    else:
+        session = AiohttpSession(api=api_server(api_url))
+    return Bot(token, session=session)
+
+
+def polling_options(profile: str = DEFAULT_PROFILE) -> Dict[str, Any]:
+    """Keyword arguments for Dispatcher.start_polling()"""
+    if profile != "production":
+        return {}
+    # Long polls return as soon as updates arrive; a bound on handler tasks keeps a burst from piling up
+    return {"polling_timeout": POLLING_TIMEOUT, "tasks_concurrency_limit": MAX_CONCURRENT_UPDATES}
+
+
+def describe(profile: str = DEFAULT_PROFILE) -> str:
+    if profile != "production":
+        return "profile=development loop=asyncio json=json"
+    return (
+        f"profile=production loop={event_loop()} json={json_codec()} connections={CONNECTION_LIMIT} "
+        f"keep-alive={KEEP_ALIVE:g}s timeout={REQUEST_TIMEOUT:g}s retries={RETRY_ATTEMPTS}"
+    )
+
+
+def run(main: Coroutine, profile: str = DEFAULT_PROFILE) -> Any:
+    """asyncio.run(), on uvloop in the production profile when it is installed"""
+    if profile == "production" and uvloop is not None:
+        return uvloop.run(main)
+    return asyncio.run(main)
@@ -0,0 +1,20 @@
+"""
+Shared setup for the root test_*.py scripts.
+
+db.session reads DATABASE_URL once, when it is first imported, so every test
+in a run shares one throw-away database. pytest loads this module before
+collecting any test; a script run directly (python test_x.py) imports it
+first thing for the same effect.
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent
+
+TMP_DIR = Path(tempfile.mkdtemp(prefix="tourismbot_tests_"))
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{TMP_DIR}/test.sqlite3"
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
@@ -0,0 +1,85 @@
+"""
+Set-based cascading deletes.
+
+Deleting a city or an excursion removes the whole subtree with one DELETE
+per level instead of loading child rows into the session. Each DELETE
+returns the media paths of the removed rows so the files can be cleaned
+up afterwards. The explicit child deletes also keep databases created
+before ON DELETE CASCADE was declared consistent.
+"""
+from typing import Iterable, List, Optional, Set
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from db.models import City, Excursion, Point
+
+
+def _delete(model, *criteria, media=()):
+    return (
+        delete(model)
+        .where(*criteria)
+        .returning(model.id, *media)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def delete_point_statements(point_id: int) -> list:
+    return [_delete(Point, Point.id == point_id, media=(Point.image, Point.audio, Point.video))]
+
+
+def delete_excursion_statements(excursion_id: int) -> list:
+    return [
+        _delete(Point, Point.excursion_id == excursion_id, media=(Point.image, Point.audio, Point.video)),
+        _delete(Excursion, Excursion.id == excursion_id, media=(Excursion.image, Excursion.video)),
+    ]
+
+
+def delete_city_statements(city_id: int) -> list:
+    excursion_ids = select(Excursion.id).where(Excursion.city_id == city_id).scalar_subquery()
+    return [
+        _delete(Point, Point.excursion_id.in_(excursion_ids), media=(Point.image, Point.audio, Point.video)),
+        _delete(Excursion, Excursion.city_id == city_id, media=(Excursion.image, Excursion.video)),
+        _delete(City, City.id == city_id, media=(City.image,)),
+    ]
+
+
+def _collect(rows: Iterable, paths: Set[str]) -> bool:
+    """Add the media paths of deleted rows to ``paths``; return whether any row was deleted"""
+    found = False
+    for _, *media in rows:
+        found = True
+        paths.update(path for path in media if path)
+    return found
+
+
+async def delete_tree(session: AsyncSession, statements: List) -> Optional[Set[str]]:
+    """
+    Run delete statements (children first, root last) in one transaction
+
+    Returns the freed media paths, or None if the root row did not exist.
+    """
+    paths: Set[str] = set()
+    found = False
+    for statement in statements:
+        result = await session.execute(statement)
+        found = _collect(result, paths)
+    if not found:
+        await session.rollback()
+        return None
+    await session.commit()
+    return paths
+
+
+def delete_tree_sync(session: Session, statements: List) -> Optional[Set[str]]:
+    """Sync variant of delete_tree for SQLAdmin"""
+    paths: Set[str] = set()
+    found = False
+    for statement in statements:
+        found = _collect(session.execute(statement), paths)
+    if not found:
+        session.rollback()
+        return None
+    session.commit()
+    return paths
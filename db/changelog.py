@@ -0,0 +1,145 @@
+"""
+Change log of the catalog for incremental sync.
+
+Every insert, update and delete of a city, excursion or point appends a
+change_log row (db/schema.py triggers), so writes from the CRUD API,
+SQLAdmin and scripts are all covered. Clients read the entries after the
+last version they have seen and fetch only the entities listed there.
+
+Compaction keeps the log proportional to the catalog instead of to its
+history: an entry superseded by a newer one for the same entity is dropped
+(clients treat insert and update alike, as "fetch the current row"), and
+delete entries older than the retention window are purged. A cursor from
+before the newest purged delete could miss that deletion, so reads from it
+are refused and the client must resync from version 0.
+"""
+import asyncio
+import os
+import time
+from typing import List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models import ChangeLogCompaction, ChangeLogEntry
+from db.session import async_engine
+from utils.logger import setup_logger
+
+logger = setup_logger('db_changelog')
+
+COMPACT_INTERVAL = float(os.getenv("CHANGE_LOG_COMPACT_INTERVAL", 3600))  # seconds, 0 disables
+TOMBSTONE_DAYS = float(os.getenv("CHANGE_LOG_TOMBSTONE_DAYS", 30))
+
+
+class ResyncRequired(Exception):
+    """The requested cursor is older than the compacted part of the log"""
+
+    def __init__(self, purged_through: int):
+        super().__init__(f"Changes up to version {purged_through} were compacted; resync from version 0")
+        self.purged_through = purged_through
+
+
+async def purged_through(session: AsyncSession) -> int:
+    result = await session.execute(select(func.coalesce(func.max(ChangeLogCompaction.purged_through), 0)))
+    return result.scalar()
+
+
+async def read_changes(session: AsyncSession, since: int, limit: int) -> Tuple[List[ChangeLogEntry], bool]:
+    """Up to ``limit`` entries after version ``since`` in version order, and whether more follow"""
+    if since > 0:
+        horizon = await purged_through(session)
+        if since < horizon:
+            raise ResyncRequired(horizon)
+    result = await session.execute(
+        select(ChangeLogEntry)
+        .where(ChangeLogEntry.version > since)
+        .order_by(ChangeLogEntry.version)
+        .limit(limit + 1)
+    )
+    entries = result.scalars().all()
+    return entries[:limit], len(entries) > limit
+
+
+def compact(connection: Connection, tombstone_days: float = TOMBSTONE_DAYS) -> dict:
+    """Drop superseded entries and old delete entries (sync connection, caller commits)"""
+    newer = ChangeLogEntry.__table__.alias("newer")
+    superseded = connection.execute(
+        delete(ChangeLogEntry).where(
+            select(newer.c.version)
+            .where(newer.c.entity == ChangeLogEntry.entity)
+            .where(newer.c.entity_id == ChangeLogEntry.entity_id)
+            .where(newer.c.version > ChangeLogEntry.version)
+            .exists()
+        )
+    ).rowcount
+
+    cutoff = time.time() - tombstone_days * 86400
+    old_tombstones = (ChangeLogEntry.op == "delete", ChangeLogEntry.changed_at < cutoff)
+    newest_purged = connection.execute(select(func.max(ChangeLogEntry.version)).where(*old_tombstones)).scalar()
+    purged = 0
+    if newest_purged is not None:
+        purged = connection.execute(
+            delete(ChangeLogEntry).where(*old_tombstones, ChangeLogEntry.version <= newest_purged)
+        ).rowcount
+
+    if superseded or purged:
+        previous = connection.execute(
+            select(func.coalesce(func.max(ChangeLogCompaction.purged_through), 0))
+        ).scalar()
+        connection.execute(insert(ChangeLogCompaction).values(
+            compacted_at=time.time(),
+            purged_through=max(previous, newest_purged or 0),
+            removed=superseded + purged,
+        ))
+    return {"superseded": superseded, "tombstones": purged}
+
+
+async def compact_async(tombstone_days: float = TOMBSTONE_DAYS) -> dict:
+    async with async_engine.begin() as conn:
+        return await conn.run_sync(compact, tombstone_days)
+
+
+class ChangeLogCompactor:
+    """Background task that compacts the change log every ``interval`` seconds"""
+
+    def __init__(self, interval: float = COMPACT_INTERVAL, tombstone_days: float = TOMBSTONE_DAYS):
+        self.interval = interval
+        self.tombstone_days = tombstone_days
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                removed = await compact_async(self.tombstone_days)
+                if any(removed.values()):
+                    logger.info(f"Change log compacted: {removed}")
+            except Exception as e:
+                logger.error(f"Change log compaction failed: {e}")
+
+
+change_log_compactor = ChangeLogCompactor()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compact the catalog change log once")
+    parser.add_argument("--tombstone-days", type=float, default=TOMBSTONE_DAYS,
+                        help="Keep delete entries this many days (default: %(default)s)")
+    args = parser.parse_args()
+    print(asyncio.run(compact_async(args.tombstone_days)))
@@ -0,0 +1,92 @@
+"""
+Change feed between processes sharing the database.
+
+Every write bumps content_versions rows (db/schema.py triggers) with a
+value from one global monotonic sequence, so "what changed since version
+V" is an indexed range query. ChangeWatcher polls for it on a dedicated
+connection: on SQLite, PRAGMA data_version tells in a few microseconds
+whether another connection has committed anything since the last poll, so
+the range query only runs when something actually changed.
+"""
+import asyncio
+from typing import Awaitable, Callable, Optional, Set
+
+from sqlalchemy import func, select
+from sqlalchemy.engine import Connection, Engine
+
+from db.models import ContentVersion
+from db.session import sync_engine
+from utils.logger import setup_logger
+
+logger = setup_logger('db_changes')
+
+ChangeCallback = Callable[[Set[str]], Awaitable[None]]
+
+
+class ChangeWatcher:
+    """Polls content_versions and reports the scopes ("points", "points:7") that changed"""
+
+    def __init__(self, callback: ChangeCallback, interval: float = 0.25, engine: Engine = sync_engine):
+        self.callback = callback
+        self.interval = interval
+        self.engine = engine
+        self.version = 0
+        self._connection: Optional[Connection] = None
+        self._data_version: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _read_data_version(self) -> Optional[int]:
+        if self._connection.dialect.name != "sqlite":
+            return None
+        return self._connection.exec_driver_sql("PRAGMA data_version").scalar()
+
+    def _open(self) -> None:
+        self._connection = self.engine.connect()
+        self._data_version = self._read_data_version()
+        self.version = self._connection.execute(select(func.coalesce(func.max(ContentVersion.version), 0))).scalar()
+        self._connection.rollback()
+
+    def _poll(self) -> Set[str]:
+        """Scopes changed since the last poll (blocking; runs in a worker thread)"""
+        data_version = self._read_data_version()
+        if data_version is not None and data_version == self._data_version:
+            return set()
+        self._data_version = data_version
+        rows = self._connection.execute(
+            select(ContentVersion.scope, ContentVersion.version).where(ContentVersion.version > self.version)
+        ).all()
+        # End the read transaction so the next poll sees new commits
+        self._connection.rollback()
+        if rows:
+            self.version = max(version for _, version in rows)
+        return {scope for scope, _ in rows}
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                scopes = await asyncio.to_thread(self._poll)
+                if scopes:
+                    await self.callback(scopes)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Change poll failed: {e}")
+
+    async def start(self) -> None:
+        if self._task is None:
+            await asyncio.to_thread(self._open)
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Watching changes from version {self.version}")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
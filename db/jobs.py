@@ -0,0 +1,375 @@
+"""
+Persistent background jobs.
+
+Jobs are rows in the jobs table, so they survive restarts and can be
+enqueued by any process sharing the database. A JobQueue runs the job
+types registered with it:
+
+    job_queue.register("media.probe", probe_upload, concurrency=2)
+    await job_queue.enqueue("media.probe", {"path": path})
+
+Each job type has its own concurrency limit (per process), attempt limit,
+exponential backoff with jitter and timeout. Handlers are coroutines, or
+plain functions run in a thread pool (executor="thread") or a process pool
+(executor="process", for CPU-bound work; the function must be importable
+by the worker process). A job is claimed with a single UPDATE, so several
+worker processes can share the table; the claim holds a lease, and jobs of
+a process that died are requeued once their lease expires.
+"""
+import asyncio
+import json
+import os
+import random
+import socket
+import time
+import traceback
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import case, delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from db.models import Job
+from db.session import AsyncSessionLocal
+from utils.logger import setup_logger
+from utils.metrics import Counter, Gauge, Histogram
+
+logger = setup_logger('db_jobs')
+
+POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", 1.0))
+THREADS = int(os.getenv("JOB_THREADS", 4))
+PROCESSES = int(os.getenv("JOB_PROCESSES", 2))
+RETENTION_DAYS = float(os.getenv("JOB_RETENTION_DAYS", 7))
+
+STATUSES = ("queued", "running", "succeeded", "failed")
+EXECUTORS = ("async", "thread", "process")
+
+JOBS_FINISHED = Counter("jobs_finished_total", "Job attempts by type and outcome", ["type", "outcome"])
+JOB_SECONDS = Histogram("job_duration_seconds", "Job attempt duration", ["type"])
+JOBS_RUNNING = Gauge("jobs_running", "Jobs currently running in this process", ["type"])
+
+
+@dataclass
+class JobType:
+    name: str
+    handler: Callable
+    concurrency: int = 1
+    max_attempts: int = 5
+    backoff: float = 2.0  # seconds before the first retry, doubled for each further one
+    max_backoff: float = 600.0
+    timeout: float = 600.0
+    executor: str = "async"
+
+    def retry_delay(self, attempts: int) -> float:
+        delay = min(self.max_backoff, self.backoff * 2 ** (attempts - 1))
+        # Full jitter keeps retries of jobs that failed together from colliding again
+        return random.uniform(delay / 2, delay)
+
+
+class JobQueue:
+    """Runs the registered job types from the jobs table"""
+
+    def __init__(self, session_factory: async_sessionmaker = AsyncSessionLocal, poll_interval: float = POLL_INTERVAL):
+        self.session_factory = session_factory
+        self.poll_interval = poll_interval
+        self.types: Dict[str, JobType] = {}
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._running: Dict[int, asyncio.Task] = {}
+        self._running_by_type: Dict[str, int] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._processes: Optional[ProcessPoolExecutor] = None
+        self._last_requeue = float("-inf")
+        self._last_prune = float("-inf")
+
+    # Registration and enqueueing
+
+    def register(self, name: str, handler: Callable, **options) -> JobType:
+        job_type = JobType(name, handler, **options)
+        if job_type.executor not in EXECUTORS:
+            raise ValueError(f"executor must be one of {', '.join(EXECUTORS)}")
+        self.types[name] = job_type
+        return job_type
+
+    async def enqueue(
+        self,
+        name: str,
+        payload: Optional[dict] = None,
+        priority: int = 0,
+        delay: float = 0,
+        max_attempts: Optional[int] = None,
+        session: Optional[AsyncSession] = None,
+    ) -> int:
+        """
+        Add a job and return its id
+
+        With ``session`` the job is added to that session's transaction and
+        the caller commits; otherwise it is committed right away.
+        """
+        job_type = self.types.get(name)
+        now = time.time()
+        statement = insert(Job).values(
+            type=name,
+            payload=json.dumps(payload or {}),
+            status="queued",
+            priority=priority,
+            attempts=0,
+            max_attempts=max_attempts or (job_type.max_attempts if job_type else JobType.max_attempts),
+            run_after=now + delay,
+            created_at=now,
+        ).returning(Job.id)
+        if session is not None:
+            return (await session.execute(statement)).scalar_one()
+        async with self.session_factory() as own_session:
+            job_id = (await own_session.execute(statement)).scalar_one()
+            await own_session.commit()
+        self.wake()
+        return job_id
+
+    def wake(self) -> None:
+        """Look for due jobs now instead of at the next poll"""
+        self._wakeup.set()
+
+    def running(self) -> Dict[str, int]:
+        """Jobs running in this process, by type"""
+        return {name: count for name, count in self._running_by_type.items() if count}
+
+    # Pools for handlers
+
+    def _executor(self, kind: str) -> Executor:
+        if kind == "thread":
+            if self._threads is None:
+                self._threads = ThreadPoolExecutor(THREADS, thread_name_prefix="job")
+            return self._threads
+        if self._processes is None:
+            self._processes = ProcessPoolExecutor(PROCESSES)
+        return self._processes
+
+    async def run_in_pool(self, function: Callable, *args, process: bool = True):
+        """Run a blocking function in the job process (or thread) pool, e.g. from an async handler"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor("process" if process else "thread"), function, *args)
+
+    # Worker loop
+
+    def _free_types(self) -> List[str]:
+        return [
+            name for name, job_type in self.types.items()
+            if self._running_by_type.get(name, 0) < job_type.concurrency
+        ]
+
+    async def _claim(self, names: List[str]) -> Optional[Job]:
+        now = time.time()
+        next_id = (
+            select(Job.id)
+            .where(Job.status == "queued", Job.run_after <= now, Job.type.in_(names))
+            .order_by(Job.priority.desc(), Job.run_after, Job.id)
+            .limit(1)
+            .scalar_subquery()
+        )
+        lease = case({name: self.types[name].timeout for name in names}, value=Job.type, else_=600.0)
+        async with self.session_factory() as session:
+            result = await session.execute(
+                update(Job)
+                .where(Job.id == next_id, Job.status == "queued")
+                .values(
+                    status="running",
+                    attempts=Job.attempts + 1,
+                    started_at=now,
+                    locked_by=self.worker_id,
+                    # A little over the timeout, so a live worker always finishes first
+                    locked_until=now + lease + 60,
+                )
+                .returning(Job)
+                .execution_options(synchronize_session=False)
+            )
+            job = result.scalar_one_or_none()
+            await session.commit()
+        return job
+
+    async def _finish(self, job: Job, values: dict) -> None:
+        async with self.session_factory() as session:
+            await session.execute(
+                update(Job)
+                .where(Job.id == job.id, Job.locked_by == self.worker_id)
+                .values(locked_by=None, locked_until=None, **values)
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+
+    async def _call(self, job_type: JobType, payload: dict):
+        if job_type.executor == "async":
+            return await job_type.handler(payload)
+        return await self.run_in_pool(job_type.handler, payload, process=job_type.executor == "process")
+
+    async def _execute(self, job: Job) -> None:
+        job_type = self.types[job.type]
+        started = time.perf_counter()
+        JOBS_RUNNING.inc((job.type,))
+        try:
+            result = await asyncio.wait_for(self._call(job_type, json.loads(job.payload)), job_type.timeout)
+        except asyncio.CancelledError:
+            # Shutting down: give the attempt back, the job runs again after restart
+            await asyncio.shield(self._finish(job, {"status": "queued", "attempts": job.attempts - 1}))
+            raise
+        except Exception as e:
+            error = "".join(traceback.format_exception_only(type(e), e)).strip()
+            if isinstance(e, asyncio.TimeoutError):
+                error = f"Timed out after {job_type.timeout}s"
+            if job.attempts >= job.max_attempts:
+                logger.error(f"Job {job.id} ({job.type}) failed after {job.attempts} attempts: {error}")
+                await self._finish(job, {"status": "failed", "finished_at": time.time(), "last_error": error})
+                JOBS_FINISHED.inc((job.type, "failed"))
+            else:
+                delay = job_type.retry_delay(job.attempts)
+                logger.warning(f"Job {job.id} ({job.type}) attempt {job.attempts} failed, retrying in {delay:.1f}s: {error}")
+                await self._finish(job, {"status": "queued", "run_after": time.time() + delay, "last_error": error})
+                JOBS_FINISHED.inc((job.type, "retried"))
+        else:
+            await self._finish(job, {
+                "status": "succeeded",
+                "finished_at": time.time(),
+                "result": json.dumps(result) if result is not None else None,
+                "last_error": None,
+            })
+            JOBS_FINISHED.inc((job.type, "succeeded"))
+        finally:
+            JOBS_RUNNING.dec((job.type,))
+            JOB_SECONDS.observe(time.perf_counter() - started, (job.type,))
+
+    def _spawn(self, job: Job) -> None:
+        self._running_by_type[job.type] = self._running_by_type.get(job.type, 0) + 1
+        task = asyncio.create_task(self._execute(job), name=f"job-{job.id}-{job.type}")
+        self._running[job.id] = task
+
+        def done(_):
+            self._running.pop(job.id, None)
+            self._running_by_type[job.type] -= 1
+            self._wakeup.set()
+        task.add_done_callback(done)
+
+    async def _requeue_expired(self) -> None:
+        """Jobs whose worker died: retry them, or fail them if out of attempts"""
+        now = time.time()
+        expired = (Job.status == "running", Job.locked_until < now)
+        async with self.session_factory() as session:
+            failed = await session.execute(
+                update(Job)
+                .where(*expired, Job.attempts >= Job.max_attempts)
+                .values(status="failed", finished_at=now, locked_by=None, locked_until=None,
+                        last_error="Worker stopped responding (lease expired)")
+            )
+            requeued = await session.execute(
+                update(Job)
+                .where(*expired)
+                .values(status="queued", run_after=now, locked_by=None, locked_until=None,
+                        last_error="Worker stopped responding (lease expired)")
+            )
+            await session.commit()
+        if failed.rowcount or requeued.rowcount:
+            logger.warning(f"Expired leases: {requeued.rowcount} jobs requeued, {failed.rowcount} failed")
+
+    async def _prune(self) -> None:
+        cutoff = time.time() - RETENTION_DAYS * 86400
+        async with self.session_factory() as session:
+            result = await session.execute(delete(Job).where(Job.status == "succeeded", Job.finished_at < cutoff))
+            await session.commit()
+        if result.rowcount:
+            logger.info(f"Pruned {result.rowcount} finished jobs")
+
+    async def _housekeeping(self) -> None:
+        now = time.monotonic()
+        if now - self._last_requeue >= 60:
+            self._last_requeue = now
+            await self._requeue_expired()
+        if now - self._last_prune >= 3600:
+            self._last_prune = now
+            await self._prune()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self._housekeeping()
+                while names := self._free_types():
+                    job = await self._claim(names)
+                    if job is None:
+                        break
+                    self._spawn(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job queue poll failed: {e}")
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def start(self) -> None:
+        if self._task is None and self.types:
+            # Bound to the running loop, so the queue can be started again under another one
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run(), name="job-queue")
+            logger.info(f"Job queue {self.worker_id} started for {', '.join(sorted(self.types))}")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        running = list(self._running.values())
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+        for pool in (self._threads, self._processes):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._threads = self._processes = None
+
+
+job_queue = JobQueue()
+
+
+# Status queries for the admin UI
+
+async def job_stats(session: AsyncSession) -> Dict[str, Any]:
+    """Job counts by type and status, and the age of the oldest due job"""
+    rows = await session.execute(select(Job.type, Job.status, func.count()).group_by(Job.type, Job.status))
+    counts: Dict[str, Dict[str, int]] = {}
+    for job_type, status, count in rows:
+        counts.setdefault(job_type, dict.fromkeys(STATUSES, 0))[status] = count
+    oldest = await session.execute(
+        select(func.min(Job.run_after)).where(Job.status == "queued", Job.run_after <= time.time())
+    )
+    oldest_due = oldest.scalar()
+    return {
+        "types": counts,
+        "oldest_due_seconds": round(time.time() - oldest_due, 3) if oldest_due else 0.0,
+    }
+
+
+async def list_jobs(session: AsyncSession, status: Optional[str] = None, type: Optional[str] = None,
+                    limit: int = 50) -> List[Job]:
+    query = select(Job).order_by(Job.id.desc()).limit(limit)
+    if status:
+        query = query.where(Job.status == status)
+    if type:
+        query = query.where(Job.type == type)
+    return (await session.execute(query)).scalars().all()
+
+
+async def retry_job(session: AsyncSession, job_id: int) -> bool:
+    """Queue a failed job again with a fresh set of attempts"""
+    result = await session.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.status == "failed")
+        .values(status="queued", attempts=0, run_after=time.time(), finished_at=None)
+    )
+    await session.commit()
+    return bool(result.rowcount)
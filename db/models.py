@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, Float, Text, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Float, Text, ForeignKey, Index, func, select
+from sqlalchemy.orm import column_property, relationship
 from db.base import Base
 
 class City(Base):
@@ -9,7 +9,7 @@ class City(Base):
     name = Column(String, nullable=False)
     image = Column(String, nullable=True)  # path: media/images/city_xxx.jpg
 
-    excursions = relationship("Excursion", back_populates="city")
+    excursions = relationship("Excursion", back_populates="city", passive_deletes=True)
     
     def __str__(self):
         return f"{self.id} - {self.name}"
@@ -18,14 +18,14 @@ class Excursion(Base):
     __tablename__ = "excursions"
 
     id = Column(Integer, primary_key=True)
-    city_id = Column(Integer, ForeignKey("cities.id"))
+    city_id = Column(Integer, ForeignKey("cities.id", ondelete="CASCADE"), index=True)
     title = Column(String)
     description = Column(Text)
     image = Column(String, nullable=True)  # path: media/images/excursion_xxx.jpg
     video = Column(String, nullable=True)  # path: media/videos/excursion_xxx.mp4
 
     city = relationship("City", back_populates="excursions")
-    points = relationship("Point", back_populates="excursion", order_by="Point.order")
+    points = relationship("Point", back_populates="excursion", order_by="Point.order", passive_deletes=True)
     
     def __str__(self):
         return f"{self.id} - {self.title}"
@@ -34,7 +34,7 @@ class Point(Base):
     __tablename__ = "points"
 
     id = Column(Integer, primary_key=True)
-    excursion_id = Column(Integer, ForeignKey("excursions.id"))
+    excursion_id = Column(Integer, ForeignKey("excursions.id", ondelete="CASCADE"), index=True)
 
     order = Column(Integer)
     title = Column(String)
@@ -48,3 +48,109 @@ class Point(Base):
     video = Column(String, nullable=True)  # path: media/videos/xxx.mp4
 
     excursion = relationship("Excursion", back_populates="points")
+
+
+# Correlated child counts for list views. Deferred, so they are only computed
+# when a query asks for them with undefer().
+Excursion.point_count = column_property(
+    select(func.count(Point.id))
+    .where(Point.excursion_id == Excursion.id)
+    .correlate_except(Point)
+    .scalar_subquery(),
+    deferred=True,
+)
+
+City.excursion_count = column_property(
+    select(func.count(Excursion.id))
+    .where(Excursion.city_id == City.id)
+    .correlate_except(Excursion)
+    .scalar_subquery(),
+    deferred=True,
+)
+
+City.point_count = column_property(
+    select(func.count(Point.id))
+    .join(Excursion, Point.excursion_id == Excursion.id)
+    .where(Excursion.city_id == City.id)
+    .correlate_except(Point, Excursion)
+    .scalar_subquery(),
+    deferred=True,
+)
+
+
+class ContentVersion(Base):
+    """Version counter for a collection ("points") or an entity ("points:7").
+
+    Rows are maintained by triggers (see db/schema.py), so writes from the
+    CRUD API, SQLAdmin and scripts all bump them. Versions come from one
+    global monotonically increasing sequence.
+    """
+    __tablename__ = "content_versions"
+
+    scope = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, index=True)
+    updated_at = Column(Float, nullable=False)  # unix timestamp
+
+
+class RowCount(Base):
+    """Exact row count of a table, maintained by insert/delete triggers"""
+    __tablename__ = "row_counts"
+
+    table_name = Column(String, primary_key=True)
+    row_count = Column(Integer, nullable=False)
+
+
+class ChangeLogEntry(Base):
+    """One insert, update or delete of a city, excursion or point.
+
+    Appended by triggers (see db/schema.py) and served by GET /api/changes.
+    The version is the log's own AUTOINCREMENT key, so it never goes back
+    even after compaction removes rows.
+    """
+    __tablename__ = "change_log"
+    __table_args__ = (
+        Index("ix_change_log_entity", "entity", "entity_id", "version"),
+        {"sqlite_autoincrement": True},
+    )
+
+    version = Column(Integer, primary_key=True)
+    entity = Column(String, nullable=False)  # city, excursion or point
+    entity_id = Column(Integer, nullable=False)
+    op = Column(String, nullable=False)  # insert, update or delete
+    changed_at = Column(Float, nullable=False)  # unix timestamp
+
+
+class ChangeLogCompaction(Base):
+    """A change log compaction run (see db/changelog.py)"""
+    __tablename__ = "change_log_compactions"
+
+    id = Column(Integer, primary_key=True)
+    compacted_at = Column(Float, nullable=False)  # unix timestamp
+    # Delete entries up to this version were purged; older cursors must resync
+    purged_through = Column(Integer, nullable=False)
+    removed = Column(Integer, nullable=False)
+
+
+class Job(Base):
+    """A background job run by db/jobs.py JobQueue"""
+    __tablename__ = "jobs"
+    __table_args__ = (
+        Index("ix_jobs_due", "status", "priority", "run_after"),
+        Index("ix_jobs_type_status", "type", "status"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    type = Column(String, nullable=False)
+    payload = Column(Text, nullable=False, default="{}")  # JSON
+    status = Column(String, nullable=False, default="queued")  # queued, running, succeeded, failed
+    priority = Column(Integer, nullable=False, default=0)  # higher runs first
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    run_after = Column(Float, nullable=False)  # unix timestamp
+    created_at = Column(Float, nullable=False)
+    started_at = Column(Float, nullable=True)
+    finished_at = Column(Float, nullable=True)
+    locked_by = Column(String, nullable=True)  # worker id while running
+    locked_until = Column(Float, nullable=True)  # lease; expired leases are requeued
+    last_error = Column(Text, nullable=True)
+    result = Column(Text, nullable=True)  # JSON
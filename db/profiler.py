@@ -0,0 +1,135 @@
+"""
+SQL profiler: statement timings, slow-query log and N+1 detection
+
+Statements are attributed to the current unit of work - an HTTP request
+or a Telegram update - through a context variable set by the web and bot
+middlewares. The hooks are installed only when SQL_PROFILE_SAMPLE_RATE is
+above 0; with the default of 0 nothing is timed or logged. Once installed,
+every statement is timed (two perf_counter calls), so slow queries are
+logged whatever the sample rate; per-unit statement counting, which is what
+finds N+1 patterns, only runs for the sampled fraction of units.
+
+Configuration (environment):
+    SQL_PROFILE_SAMPLE_RATE   fraction of units to profile, 0 disables the hooks (default 0)
+    SQL_SLOW_QUERY_MS         slow-query threshold in milliseconds (default 100)
+    SQL_N_PLUS_ONE_THRESHOLD  identical statements per unit reported as N+1 (default 5)
+"""
+import os
+import random
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from sqlalchemy import event
+from utils.logger import setup_logger
+
+logger = setup_logger('sql_profiler')
+slow_logger = setup_logger('sql_slow')
+
+SAMPLE_RATE = float(os.getenv("SQL_PROFILE_SAMPLE_RATE", "0"))
+SLOW_QUERY_SECONDS = float(os.getenv("SQL_SLOW_QUERY_MS", "100")) / 1000
+N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "5"))
+MAX_PARAMS_LENGTH = 500
+
+
+@dataclass
+class UnitOfWork:
+    """Statements issued while handling one request or update"""
+    label: str
+    sampled: bool
+    statements: Counter = field(default_factory=Counter)
+    count: int = 0
+    seconds: float = 0.0
+
+
+@dataclass
+class LabelStats:
+    """Aggregates over the sampled units with the same label"""
+    units: int = 0
+    statements: int = 0
+    seconds: float = 0.0
+    n_plus_one: int = 0
+
+
+current_unit: ContextVar[Optional[UnitOfWork]] = ContextVar("sql_unit_of_work", default=None)
+stats: Dict[str, LabelStats] = {}
+
+
+def enabled() -> bool:
+    return SAMPLE_RATE > 0
+
+
+def start_unit(label: str):
+    """Open a unit of work in the current context; returns the token for end_unit"""
+    unit = UnitOfWork(label=label, sampled=random.random() < SAMPLE_RATE)
+    return current_unit.set(unit)
+
+
+def end_unit(token, label: Optional[str] = None) -> None:
+    """
+    Close the unit opened with start_unit
+
+    label replaces the provisional one, e.g. the route template known only
+    after routing. Repeated statements are reported as N+1 suspects.
+    """
+    unit = current_unit.get()
+    current_unit.reset(token)
+    if unit is None or not unit.sampled:
+        return
+    if label:
+        unit.label = label
+
+    label_stats = stats.setdefault(unit.label, LabelStats())
+    label_stats.units += 1
+    label_stats.statements += unit.count
+    label_stats.seconds += unit.seconds
+
+    for statement, count in unit.statements.items():
+        if count >= N_PLUS_ONE_THRESHOLD:
+            label_stats.n_plus_one += 1
+            logger.warning(
+                f"N+1 suspect in {unit.label}: {count}x {' '.join(statement.split())}"
+            )
+
+
+def _format_params(parameters) -> str:
+    text = repr(parameters)
+    if len(text) > MAX_PARAMS_LENGTH:
+        return text[:MAX_PARAMS_LENGTH] + "..."
+    return text
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    unit = current_unit.get()
+
+    if unit is not None and unit.sampled:
+        unit.count += 1
+        unit.seconds += elapsed
+        unit.statements[statement] += 1
+
+    if elapsed >= SLOW_QUERY_SECONDS:
+        slow_logger.warning(
+            f"{elapsed * 1000:.1f} ms [{unit.label if unit else 'background'}] "
+            f"{' '.join(statement.split())} params={_format_params(parameters)}"
+        )
+
+
+def _handle_error(exception_context):
+    # Keep the timing stack balanced when a statement fails
+    started = exception_context.connection.info.get("query_started") if exception_context.connection else None
+    if started:
+        started.pop()
+
+
+def install(engine) -> None:
+    """Attach the profiling hooks to a sync Engine (use async_engine.sync_engine for async)"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
@@ -0,0 +1,210 @@
+"""
+Database schema initialization.
+
+Creates the ORM tables plus the SQLite triggers that SQLAlchemy metadata
+does not describe.
+"""
+import asyncio
+import tempfile
+import zlib
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: rely on SQLite's own locking
+    fcntl = None
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from db.base import Base
+from db import models  # noqa: F401 - registers the tables on Base.metadata
+from db.search import (
+    CREATE_SEARCH_INDEX,
+    SEARCH_TABLE,
+    create_search_index,
+    search_backfill_sql,
+    search_trigger_ddl,
+)
+from db.session import async_engine
+from utils.logger import setup_logger
+
+logger = setup_logger('db_schema')
+
+# Tables whose changes are tracked in content_versions
+VERSIONED_TABLES = ("cities", "excursions", "points")
+
+# Current time as a unix timestamp with sub-second precision
+SQL_NOW = "(julianday('now') - 2440587.5) * 86400.0"
+
+
+def _bump_version_sql(scope_sql: str) -> str:
+    return (
+        "INSERT OR REPLACE INTO content_versions (scope, version, updated_at) "
+        f"VALUES ({scope_sql}, (SELECT COALESCE(MAX(version), 0) + 1 FROM content_versions), {SQL_NOW});"
+    )
+
+
+def _version_triggers(table: str) -> list:
+    triggers = []
+    for op, row in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+        collection_scope = f"'{table}'"
+        entity_scope = f"'{table}:' || {row}.id"
+        triggers.append(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_version_{op.lower()} "
+            f"AFTER {op} ON {table} BEGIN "
+            f"{_bump_version_sql(collection_scope)} "
+            f"{_bump_version_sql(entity_scope)} "
+            "END"
+        )
+    return triggers
+
+
+def _row_count_sql(table: str) -> list:
+    # Backfill runs before the triggers are created, in the same transaction
+    backfill = (
+        "INSERT OR IGNORE INTO row_counts (table_name, row_count) "
+        f"SELECT '{table}', COUNT(*) FROM {table}"
+    )
+    triggers = [
+        f"CREATE TRIGGER IF NOT EXISTS {table}_count_{op.lower()} AFTER {op} ON {table} BEGIN "
+        f"UPDATE row_counts SET row_count = row_count {sign} 1 WHERE table_name = '{table}'; "
+        "END"
+        for op, sign in (("INSERT", "+"), ("DELETE", "-"))
+    ]
+    return [backfill] + triggers
+
+
+# Entity name used in change_log for each versioned table
+CHANGE_LOG_ENTITIES = {"cities": "city", "excursions": "excursion", "points": "point"}
+
+
+def _change_log_sql(table: str) -> list:
+    entity = CHANGE_LOG_ENTITIES[table]
+    # Rows without any entry (a new log on an existing database, or rows bulk
+    # loaded with the triggers dropped) get an "insert" entry
+    backfill = (
+        "INSERT INTO change_log (entity, entity_id, op, changed_at) "
+        f"SELECT '{entity}', id, 'insert', {SQL_NOW} FROM {table} AS t WHERE NOT EXISTS ("
+        f"SELECT 1 FROM change_log WHERE entity = '{entity}' AND entity_id = t.id) ORDER BY id"
+    )
+    triggers = [
+        f"CREATE TRIGGER IF NOT EXISTS {table}_changelog_{op.lower()} AFTER {op} ON {table} BEGIN "
+        "INSERT INTO change_log (entity, entity_id, op, changed_at) "
+        f"VALUES ('{entity}', {row}.id, '{op.lower()}', {SQL_NOW}); "
+        "END"
+        for op, row in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD"))
+    ]
+    return [backfill] + triggers
+
+
+# Foreign key indexes for databases created before they were declared on the models
+INDEX_DDL = [
+    "CREATE INDEX IF NOT EXISTS ix_excursions_city_id ON excursions (city_id)",
+    "CREATE INDEX IF NOT EXISTS ix_points_excursion_id ON points (excursion_id)",
+]
+
+SCHEMA_DDL = (
+    INDEX_DDL
+    + [ddl for table in VERSIONED_TABLES for ddl in _version_triggers(table)]
+    + [ddl for table in VERSIONED_TABLES for ddl in _row_count_sql(table)]
+    + [ddl for table in VERSIONED_TABLES for ddl in _change_log_sql(table)]
+)
+
+
+def schema_version() -> int:
+    """
+    Fingerprint of the tables and DDL above, stored in PRAGMA user_version
+    once the schema has been created so later starts can skip the checks
+    """
+    parts = [repr(table) for table in Base.metadata.sorted_tables]
+    parts += SCHEMA_DDL + [CREATE_SEARCH_INDEX] + search_trigger_ddl()
+    # user_version is a signed 32-bit integer; 0 means "not created by us"
+    return zlib.crc32("\n".join(parts).encode()) & 0x7FFFFFFF or 1
+
+
+def _is_sqlite(connection) -> bool:
+    return connection.dialect.name == "sqlite"
+
+
+def schema_is_current(connection) -> bool:
+    if not _is_sqlite(connection):
+        return False
+    return connection.exec_driver_sql("PRAGMA user_version").scalar() == schema_version()
+
+
+def create_schema(connection) -> None:
+    """Create tables and triggers on a sync connection (idempotent)"""
+    Base.metadata.create_all(connection)
+    for ddl in SCHEMA_DDL:
+        connection.exec_driver_sql(ddl)
+    create_search_index(connection)
+    if _is_sqlite(connection):
+        connection.exec_driver_sql(f"PRAGMA user_version = {schema_version()}")
+
+
+def drop_content_triggers(connection) -> None:
+    """Drop every trigger on the content tables, e.g. before a bulk load"""
+    tables = ", ".join(f"'{table}'" for table in VERSIONED_TABLES)
+    names = connection.exec_driver_sql(
+        f"SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name IN ({tables})"
+    ).scalars().all()
+    for name in names:
+        connection.exec_driver_sql(f"DROP TRIGGER {name}")
+    # The schema is incomplete until create_schema runs again
+    connection.exec_driver_sql("PRAGMA user_version = 0")
+
+
+def rebuild_derived_data(connection) -> None:
+    """
+    Recompute the search index, row counts and collection versions from the
+    content tables. Used after loading data with the triggers dropped; call
+    create_schema afterwards to restore the triggers (it also adds change
+    log entries for the loaded rows).
+    """
+    connection.exec_driver_sql(f"DELETE FROM {SEARCH_TABLE}")
+    for sql in search_backfill_sql():
+        connection.exec_driver_sql(sql)
+    connection.exec_driver_sql("DELETE FROM row_counts")
+    for table in VERSIONED_TABLES:
+        connection.exec_driver_sql(_row_count_sql(table)[0])
+        connection.exec_driver_sql(_bump_version_sql(f"'{table}'"))
+
+
+def _lock_path(engine: AsyncEngine) -> Path:
+    database = engine.url.database
+    if engine.url.get_backend_name() == "sqlite" and database and database != ":memory:":
+        return Path(f"{database}.init-lock")
+    return Path(tempfile.gettempdir()) / "tourismbot-schema.init-lock"
+
+
+@asynccontextmanager
+async def schema_lock(engine: AsyncEngine = async_engine):
+    """Exclusive across processes (e.g. uvicorn workers) sharing the database"""
+    with open(_lock_path(engine), "a+b") as lock_file:
+        if fcntl is not None:
+            await asyncio.to_thread(fcntl.flock, lock_file.fileno(), fcntl.LOCK_EX)
+        # Closing the file releases the lock
+        yield
+
+
+async def init_db(engine: AsyncEngine = async_engine, force: bool = False) -> None:
+    """
+    Create the database schema using the async engine
+
+    Skipped when the stored schema version matches, unless force is set.
+    When several processes start at once, one creates the schema under
+    schema_lock and the others find it current once they get the lock.
+    """
+    if not force:
+        async with engine.connect() as conn:
+            if await conn.run_sync(schema_is_current):
+                logger.info("Database schema is up to date")
+                return
+    async with schema_lock(engine):
+        async with engine.begin() as conn:
+            if not force and await conn.run_sync(schema_is_current):
+                logger.info("Database schema was initialized by another process")
+                return
+            await conn.run_sync(create_schema)
+    logger.info("Database schema initialized")
@@ -0,0 +1,152 @@
+"""
+Full-text search over cities, excursions and points (SQLite FTS5).
+
+The search_index virtual table holds one row per entity with
+rowid = entity id * 4 + entity code, so triggers can update or delete the
+row of an entity by rowid without scanning the index. The unicode61
+tokenizer folds case for Cyrillic as well as Latin text, and the prefix
+indexes make "as you type" queries (``"руд"*``) cheap.
+"""
+import re
+from dataclasses import dataclass
+from typing import List, Optional
+
+from sqlalchemy import Integer, column, select, table, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+SEARCH_TABLE = "search_index"
+
+
+@dataclass(frozen=True)
+class SearchSource:
+    entity: str
+    code: int
+    table: str
+    title: str
+    body: Optional[str]
+
+
+SEARCH_SOURCES = (
+    SearchSource("city", 1, "cities", "name", None),
+    SearchSource("excursion", 2, "excursions", "title", "description"),
+    SearchSource("point", 3, "points", "title", "text"),
+)
+
+ENTITY_TYPES = tuple(source.entity for source in SEARCH_SOURCES)
+
+CREATE_SEARCH_INDEX = (
+    f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+    "entity UNINDEXED, entity_id UNINDEXED, title, body, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+
+
+def _row_values(source: SearchSource, row: str) -> str:
+    body = f"COALESCE({row}.{source.body}, '')" if source.body else "''"
+    return (
+        f"{row}.id * 4 + {source.code}, '{source.entity}', {row}.id, "
+        f"COALESCE({row}.{source.title}, ''), {body}"
+    )
+
+
+def search_trigger_ddl() -> List[str]:
+    """Triggers that keep search_index in sync with the source tables"""
+    ddl = []
+    for source in SEARCH_SOURCES:
+        insert = (
+            f"INSERT INTO {SEARCH_TABLE} (rowid, entity, entity_id, title, body) "
+            f"VALUES ({_row_values(source, 'NEW')});"
+        )
+        delete = f"DELETE FROM {SEARCH_TABLE} WHERE rowid = OLD.id * 4 + {source.code};"
+        prefix = f"CREATE TRIGGER IF NOT EXISTS {source.table}_search"
+        ddl += [
+            f"{prefix}_insert AFTER INSERT ON {source.table} BEGIN {insert} END",
+            f"{prefix}_update AFTER UPDATE ON {source.table} BEGIN {delete} {insert} END",
+            f"{prefix}_delete AFTER DELETE ON {source.table} BEGIN {delete} END",
+        ]
+    return ddl
+
+
+def search_backfill_sql() -> List[str]:
+    """Index rows that existed before search_index was created"""
+    return [
+        f"INSERT INTO {SEARCH_TABLE} (rowid, entity, entity_id, title, body) "
+        f"SELECT {_row_values(source, source.table)} FROM {source.table}"
+        for source in SEARCH_SOURCES
+    ]
+
+
+def create_search_index(connection) -> None:
+    """Create and backfill search_index if missing, then (re)create its triggers"""
+    exists = connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (SEARCH_TABLE,)
+    ).first()
+    if not exists:
+        connection.exec_driver_sql(CREATE_SEARCH_INDEX)
+        for sql in search_backfill_sql():
+            connection.exec_driver_sql(sql)
+    for ddl in search_trigger_ddl():
+        connection.exec_driver_sql(ddl)
+
+
+def build_match_query(term: str) -> Optional[str]:
+    """
+    Turn user input into an FTS5 query: every word must match as a prefix
+
+    Returns None when the input contains no searchable words.
+    """
+    words = re.findall(r"\w+", term.lower())
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
+
+
+search_index = table(
+    SEARCH_TABLE,
+    column("rowid", Integer),
+    column("entity"),
+    column("entity_id", Integer),
+    column("title"),
+    column("body"),
+)
+
+
+def matching_ids(entity: str, match_query: str):
+    """Select the ids of ``entity`` rows matching an FTS5 query"""
+    return select(search_index.c.entity_id).where(
+        column(SEARCH_TABLE).match(match_query),
+        search_index.c.entity == entity,
+    )
+
+
+@dataclass
+class SearchHit:
+    entity: str
+    id: int
+    title: str
+    snippet: str
+    rank: float
+
+
+SEARCH_SQL = text(f"""
+    SELECT entity, entity_id, title,
+           snippet({SEARCH_TABLE}, 3, '[', ']', '…', 12) AS snippet,
+           bm25({SEARCH_TABLE}, 0.0, 0.0, 10.0, 1.0) AS rank
+    FROM {SEARCH_TABLE}
+    WHERE {SEARCH_TABLE} MATCH :query AND (:entity IS NULL OR entity = :entity)
+    ORDER BY rank
+    LIMIT :limit
+""")
+
+
+async def search(
+    session: AsyncSession, term: str, entity: Optional[str] = None, limit: int = 20
+) -> List[SearchHit]:
+    """Ranked full-text search; titles weigh ten times more than body text"""
+    match_query = build_match_query(term)
+    if match_query is None:
+        return []
+    result = await session.execute(
+        SEARCH_SQL, {"query": match_query, "entity": entity, "limit": limit}
+    )
+    return [SearchHit(*row) for row in result]
@@ -1,11 +1,15 @@
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 import os
+import time
 from pathlib import Path
 from dotenv import load_dotenv
+from db import profiler
 from utils.logger import setup_logger
+from utils.metrics import Histogram
 
 load_dotenv()
 
@@ -18,11 +22,42 @@ ROOT_DIR = Path(__file__).parent.parent
 DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite+aiosqlite:///{ROOT_DIR}/db.sqlite3")
 logger.info(f"Database URL: {DATABASE_URL}")
 
+pool_checkout_wait = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled database connection",
+    ["engine"],
+)
+
+
+class _TimedCheckoutMixin:
+    """Record how long each connection checkout waits on the pool"""
+    metrics_label = ""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_checkout_wait.observe(time.perf_counter() - started, (self.metrics_label,))
+
+
+class TimedAsyncQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    metrics_label = "async"
+
+
+class TimedQueuePool(_TimedCheckoutMixin, QueuePool):
+    metrics_label = "sync"
+
+
+# In-memory SQLite needs its single-connection default pool
+IS_MEMORY_DB = ":memory:" in DATABASE_URL
+
 # Async engine for FastAPI/bot
 async_engine = create_async_engine(
     DATABASE_URL,
     echo=False,
     future=True,
+    **({} if IS_MEMORY_DB else {"poolclass": TimedAsyncQueuePool}),
 )
 
 AsyncSessionLocal = async_sessionmaker(
@@ -38,8 +73,26 @@ sync_engine = create_engine(
     SYNC_DATABASE_URL,
     connect_args={"check_same_thread": False},
     echo=False,
+    **({} if IS_MEMORY_DB else {"poolclass": TimedQueuePool}),
 )
 
+
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    """SQLite ignores FOREIGN KEY constraints unless enabled per connection"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+if DATABASE_URL.startswith("sqlite"):
+    event.listen(async_engine.sync_engine, "connect", _enable_sqlite_foreign_keys)
+    event.listen(sync_engine, "connect", _enable_sqlite_foreign_keys)
+
+if profiler.enabled():
+    profiler.install(async_engine.sync_engine)
+    profiler.install(sync_engine)
+    logger.info(f"SQL profiler enabled, sample rate {profiler.SAMPLE_RATE}")
+
 SyncSessionLocal = sessionmaker(
     bind=sync_engine,
     autoflush=False,
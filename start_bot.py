@@ -11,8 +11,8 @@ sys.path.append(str(Path(__file__).parent))
 
 # Import and run bot
 from bot.main import main
-import asyncio
+from bot.runtime import run
 
 if __name__ == "__main__":
     print("🤖 Starting Telegram Bot Worker...")
-    asyncio.run(main())
+    run(main())
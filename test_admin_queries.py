@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Check that admin list pages run a fixed number of SQL statements.
+
+Seeds a temporary database with many cities, excursions and points, then
+renders every admin list page and counts the statements executed on the
+sync engine. The count must not depend on the number of rows on the page.
+Runs under pytest or directly:
+    python test_admin_queries.py
+"""
+import os
+
+import conftest  # noqa: F401 - the shared temporary database
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, insert
+
+from db.models import City, Excursion, Point
+from db.session import sync_engine
+from web.main import app
+
+# Maximum statements per list page: count + page (+ one selectin load of the related city)
+EXPECTED_MAX_STATEMENTS = {
+    "city": 2,
+    "excursion": 3,
+    "point": 2,
+}
+
+
+def seed(cities: int = 30, excursions_per_city: int = 3, points_per_excursion: int = 5):
+    with sync_engine.begin() as conn:
+        conn.execute(insert(City), [{"name": f"City {i}"} for i in range(cities)])
+        conn.execute(insert(Excursion), [
+            {"city_id": c + 1, "title": f"Excursion {c}-{e}", "description": "Seeded excursion"}
+            for c in range(cities) for e in range(excursions_per_city)
+        ])
+        conn.execute(insert(Point), [
+            {"excursion_id": x + 1, "order": p + 1, "title": f"Point {p}", "text": "Seeded point text", "lat": 0, "lng": 0}
+            for x in range(cities * excursions_per_city) for p in range(points_per_excursion)
+        ])
+
+
+def count_list_page_statements(client: TestClient, identity: str) -> int:
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(sync_engine, "before_cursor_execute", record)
+    try:
+        response = client.get(f"/admin/{identity}/list")
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", record)
+    assert response.status_code == 200, response.text
+    return len(statements)
+
+
+def test_admin_list_pages_have_fixed_query_count():
+    with TestClient(app) as client:
+        seed()
+        client.post("/admin/login", data={"username": os.getenv("ADMIN_USERNAME", "admin"),
+                                          "password": os.getenv("ADMIN_PASSWORD", "admin123")})
+        for identity, expected in EXPECTED_MAX_STATEMENTS.items():
+            count = count_list_page_statements(client, identity)
+            print(f"   /admin/{identity}/list: {count} statements (max {expected})")
+            assert count <= expected, f"/admin/{identity}/list ran {count} statements, expected <= {expected}"
+
+
+if __name__ == "__main__":
+    print("🧪 Counting SQL statements per admin list page...")
+    test_admin_list_pages_have_fixed_query_count()
+    print("✅ Admin list pages run a fixed number of queries")
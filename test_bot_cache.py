@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Checks for the bot catalog cache (bot/cache.py) following deletes and moves.
+
+A city's excursion list only shows excursions with points. Deleting an
+excursion's last point, or moving it to another excursion, must take the
+excursion out of the cached list once the change watcher reports it,
+whether or not that excursion's route is cached too (the handlers would
+otherwise open it and index an empty route). Runs under pytest or directly:
+    python test_bot_cache.py
+"""
+import asyncio
+import time
+
+import conftest  # noqa: F401 - the shared temporary database
+
+from sqlalchemy import delete, func, insert, select, update
+
+from bot import cache as bot_cache
+from bot.cache import get_city_excursions, get_excursion_points
+from db.models import City, ContentVersion, Excursion, Point
+from db.schema import init_db
+from db.session import AsyncSessionLocal
+
+
+async def create_city(name: str, points_per_excursion) -> tuple:
+    """A city with one excursion per entry of points_per_excursion; returns (city id, excursion ids, point ids)"""
+    async with AsyncSessionLocal() as session:
+        city_id = (await session.execute(insert(City).returning(City.id), [{"name": name}])).scalar_one()
+        excursion_ids = (await session.execute(insert(Excursion).returning(Excursion.id), [
+            {"city_id": city_id, "title": f"{name} {n}", "description": "Маршрут по городу"}
+            for n in range(len(points_per_excursion))
+        ])).scalars().all()
+        point_ids = []
+        for excursion_id, count in zip(excursion_ids, points_per_excursion):
+            point_ids.append((await session.execute(insert(Point).returning(Point.id), [
+                {"excursion_id": excursion_id, "order": order, "title": f"Точка {order}",
+                 "text": "Описание точки", "lat": 38.5, "lng": 68.7}
+                for order in range(1, count + 1)
+            ])).scalars().all())
+        await session.commit()
+    return city_id, excursion_ids, point_ids
+
+
+async def settle() -> None:
+    """Wait until the watcher has reported every change so far, so the next loads stay cached"""
+    async with AsyncSessionLocal() as session:
+        version = (await session.execute(select(func.max(ContentVersion.version)))).scalar()
+    while bot_cache.watcher.version < version:
+        await asyncio.sleep(bot_cache.POLL_INTERVAL / 2)
+    # The callback of that poll finishes before the watcher sleeps again
+    await asyncio.sleep(bot_cache.POLL_INTERVAL)
+
+
+async def listed(city_id: int) -> set:
+    _, excursions = await get_city_excursions(city_id)
+    return {excursion.id for excursion in excursions}
+
+
+async def wait_listed(city_id: int, expected: set, timeout: float = 5) -> None:
+    deadline = time.monotonic() + timeout
+    while (ids := await listed(city_id)) != expected:
+        if time.monotonic() > deadline:
+            raise AssertionError(f"city {city_id} lists excursions {ids}, expected {expected}")
+        await asyncio.sleep(bot_cache.POLL_INTERVAL / 2)
+
+
+async def write(statement) -> None:
+    async with AsyncSessionLocal() as session:
+        await session.execute(statement)
+        await session.commit()
+
+
+async def check_last_point_deleted(route_cached: bool):
+    city_id, (first, second), (first_points, _) = await create_city(f"Удаление {route_cached}", [1, 2])
+    await settle()
+    assert await listed(city_id) == {first, second}
+    if route_cached:
+        assert [p.id for p in await get_excursion_points(first)] == first_points
+    assert bot_cache.cache.get(("city_excursions", city_id)) is not None
+
+    await write(delete(Point).where(Point.id == first_points[0]))
+    await wait_listed(city_id, {second})
+    assert await get_excursion_points(first) == []
+
+
+async def check_last_point_moved(route_cached: bool):
+    city_id, (first, second), (first_points, _) = await create_city(f"Перенос {route_cached}", [1, 1])
+    other_city, (target,), _ = await create_city(f"Другой {route_cached}", [1])
+    await settle()
+    assert await listed(city_id) == {first, second} and await listed(other_city) == {target}
+    if route_cached:
+        await get_excursion_points(first)
+    assert bot_cache.cache.get(("city_excursions", city_id)) is not None
+
+    await write(update(Point).where(Point.id == first_points[0]).values(excursion_id=target, order=2))
+    await wait_listed(city_id, {second})
+    assert [p.order for p in await get_excursion_points(target)] == [1, 2]
+
+
+async def main():
+    await init_db()
+    await bot_cache.start()
+    try:
+        for route_cached in (True, False):
+            await check_last_point_deleted(route_cached)
+            await check_last_point_moved(route_cached)
+    finally:
+        await bot_cache.stop()
+    print("✅ Excursions leave the cached city lists when their last point is deleted or moved")
+
+
+def test_bot_cache():
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    test_bot_cache()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Checks for catalog import (web/catalog.py) on bad input.
+
+A small catalog is imported through /api/catalog/import, then dumps with
+one bad record each, including values the CRUD API would reject: every
+one must answer 400 naming the bad record's own line (also when it only
+fails once its batch is flushed) and leave the database unchanged. Runs
+under pytest or directly:
+    python test_catalog_import.py
+"""
+import json
+
+import conftest  # noqa: F401 - the shared temporary database
+
+from fastapi.testclient import TestClient
+
+from web.main import app
+
+CATALOG = [
+    {"type": "city", "name": "Душанбе"},
+    {"type": "excursion", "city": "Душанбе", "title": "Рудаки", "description": "Проспект через весь город"},
+    {"type": "point", "city": "Душанбе", "excursion": "Рудаки", "order": 1, "title": "Начало",
+     "text": "Площадь у оперного театра", "lat": 38.5, "lng": 68.7},
+    {"type": "point", "city": "Душанбе", "excursion": "Рудаки", "order": 2, "title": "Конец",
+     "text": "Парк Рудаки у фонтана", "lat": 38.6, "lng": 68.8},
+]
+
+POINT = CATALOG[2]
+
+# Dump, and the line the error must name
+BAD_DUMPS = {
+    "point without order": (CATALOG + [{k: v for k, v in POINT.items() if k != "order"}], 5),
+    "number instead of a record": (CATALOG[:2] + [5] + CATALOG[2:], 3),
+    "list instead of a record": (CATALOG[:3] + [[]], 4),
+    "point without title": (CATALOG + [{k: v for k, v in POINT.items() if k != "title"}], 5),
+    "order that is not a number": (CATALOG + [{**POINT, "order": "x"}], 5),
+    "order out of range": (CATALOG + [{**POINT, "order": 101}], 5),
+    "latitude out of range": (CATALOG[:3] + [{**POINT, "lat": 500}] + CATALOG[3:], 4),
+    "short excursion description": (CATALOG[:2] + [{**CATALOG[1], "description": "Коротко"}] + CATALOG[2:], 3),
+    "unknown type": (CATALOG + [{"type": "museum"}], 5),
+    "excursion without city": (CATALOG[:1] + [{"type": "excursion", "title": "Без города", "description": "Маршрут без города"}] + CATALOG[1:], 2),
+    # Fails only when its batch is flushed by the records after it
+    "dangling point reference": (
+        CATALOG + [{**POINT, "excursion": "Нет такой", "order": 3}] + CATALOG[3:] + [{"type": "city", "name": "Худжанд"}],
+        5,
+    ),
+}
+
+
+def dump(records) -> bytes:
+    return "\n".join(json.dumps(record, ensure_ascii=False) for record in records).encode()
+
+
+def import_dump(client: TestClient, records):
+    return client.post("/api/catalog/import", files={"file": ("catalog.jsonl", dump(records), "application/x-ndjson")})
+
+
+def test_catalog_import_errors():
+    with TestClient(app) as client:
+        response = import_dump(client, CATALOG)
+        assert response.status_code == 200, response.text
+        assert response.json()["point"] == {"inserted": 2, "updated": 0}
+        exported = client.get("/api/catalog/export").content
+
+        for name, (records, line) in BAD_DUMPS.items():
+            response = import_dump(client, records)
+            assert response.status_code == 400, (name, response.status_code, response.text)
+            detail = response.json()["detail"]
+            assert detail.startswith(f"Line {line}:"), (name, detail)
+            print(f"   {name}: {detail}")
+
+        # Nothing from the failed imports was kept
+        assert client.get("/api/catalog/export").content == exported
+        malformed = client.post("/api/catalog/import", files={"file": ("catalog.jsonl", b'{"type": "city"\n', "text/plain")})
+        assert malformed.status_code == 400 and malformed.json()["detail"].startswith("Line 1:")
+
+
+if __name__ == "__main__":
+    print("🧪 Importing bad catalog dumps...")
+    test_catalog_import_errors()
+    print("✅ Bad records answer 400 with their own line number")
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Checks for response compression (web/compression.py).
+
+Accept-Encoding negotiation; CompressionMiddleware on a small Starlette
+app: responses below the minimum size, streamed bodies flushed chunk by
+chunk, weakened ETags and the responses it must leave alone; then
+PrecompressedStaticFiles choosing the .gz variant of a static file only
+while it is fresh. Runs under pytest or directly:
+    python test_compression.py
+"""
+import asyncio
+import gzip
+import os
+import tempfile
+import zlib
+from pathlib import Path
+
+import conftest  # noqa: F401 - the shared temporary database
+
+import httpx
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+
+from web.compression import CompressionMiddleware, PrecompressedStaticFiles, negotiate
+
+MINIMUM_SIZE = 1024
+TEXT = "Маршрут по Душанбе, точка за точкой. " * 200
+CHUNKS = [f"{n}: {TEXT[:300]}\n".encode() for n in range(5)]
+
+
+def check_negotiate():
+    both = ("br", "gzip")
+    assert negotiate("gzip, deflate, br", both) == "br"
+    assert negotiate("br;q=0.5, gzip", both) == "gzip"
+    assert negotiate("gzip", both) == "gzip"
+    assert negotiate("*", both) == "br"
+    assert negotiate("*;q=0.1, gzip;q=0.2", both) == "gzip"
+    assert negotiate("*, br;q=0", both) == "gzip"
+    assert negotiate("GZIP;Q=1", ("gzip",)) == "gzip"
+    assert negotiate("gzip;q=0", both) is None
+    assert negotiate("gzip;q=oops", both) is None
+    assert negotiate("identity", both) is None
+    assert negotiate("", both) is None
+    assert negotiate("br", ("gzip",)) is None
+
+
+def app_under_test() -> CompressionMiddleware:
+    async def text(request):
+        return PlainTextResponse(TEXT, headers={"ETag": '"abc"'})
+
+    async def small(request):
+        return PlainTextResponse("short", headers={"Vary": "Cookie"})
+
+    async def stream(request):
+        async def body():
+            for chunk in CHUNKS:
+                yield chunk
+                await asyncio.sleep(0)
+        return StreamingResponse(body(), media_type="application/x-ndjson")
+
+    async def image(request):
+        return Response(b"\x89PNG" + b"\0" * 4096, media_type="image/png")
+
+    async def encoded(request):
+        return Response(gzip.compress(TEXT.encode()), media_type="text/plain", headers={"Content-Encoding": "gzip"})
+
+    async def partial(request):
+        return Response(TEXT.encode()[:2000], status_code=206, media_type="text/plain",
+                        headers={"Content-Range": f"bytes 0-1999/{len(TEXT.encode())}"})
+
+    async def no_transform(request):
+        return PlainTextResponse(TEXT, headers={"Cache-Control": "no-transform"})
+
+    async def weak(request):
+        return PlainTextResponse(TEXT, headers={"ETag": 'W/"abc"'})
+
+    routes = [Route(f"/{endpoint.__name__}", endpoint, methods=["GET", "HEAD"])
+              for endpoint in (text, small, stream, image, encoded, partial, no_transform, weak)]
+    return CompressionMiddleware(Starlette(routes=routes), minimum_size=MINIMUM_SIZE)
+
+
+async def check_middleware(client):
+    gz = {"Accept-Encoding": "gzip"}
+    response = await client.get("/text", headers=gz)
+    assert response.headers["content-encoding"] == "gzip" and response.text == TEXT
+    assert int(response.headers["content-length"]) < len(TEXT.encode()) // 10
+    assert response.headers["vary"] == "Accept-Encoding"
+    # Same content, different bytes: the validator becomes weak
+    assert response.headers["etag"] == 'W/"abc"'
+    assert (await client.get("/weak", headers=gz)).headers["etag"] == 'W/"abc"'
+
+    identity = await client.get("/text", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in identity.headers and identity.headers["etag"] == '"abc"'
+
+    # Below the minimum size: sent as is, but a cache must still key on Accept-Encoding
+    small = await client.get("/small", headers=gz)
+    assert "content-encoding" not in small.headers and small.text == "short"
+    assert small.headers["vary"] == "Cookie, Accept-Encoding"
+
+    for url in ("/image", "/encoded", "/partial", "/no_transform"):
+        response = await client.get(url, headers=gz)
+        assert response.headers.get("content-encoding") in (None, "gzip"), url
+        assert "vary" not in response.headers, url
+    assert "content-encoding" not in (await client.get("/image", headers=gz)).headers
+    assert (await client.get("/encoded", headers=gz)).text == TEXT
+    partial = await client.get("/partial", headers=gz)
+    assert partial.status_code == 206 and "content-encoding" not in partial.headers
+    assert "content-encoding" not in (await client.get("/no_transform", headers=gz)).headers
+
+    head = await client.head("/text", headers=gz)
+    assert "content-encoding" not in head.headers and head.headers["content-length"] == str(len(TEXT.encode()))
+
+    stream = await client.get("/stream", headers=gz)
+    assert stream.headers["content-encoding"] == "gzip" and "content-length" not in stream.headers
+    assert stream.content == b"".join(CHUNKS)
+
+
+async def check_stream_flushes(app):
+    """Each streamed chunk is decodable as soon as it is sent, not only at the end"""
+    scope = {
+        "type": "http", "method": "GET", "path": "/stream", "raw_path": b"/stream", "root_path": "",
+        "scheme": "http", "query_string": b"", "headers": [(b"accept-encoding", b"gzip")],
+        "server": ("test", 80), "client": ("test", 1234), "http_version": "1.1",
+    }
+    messages = []
+
+    async def receive():
+        await asyncio.sleep(1)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    bodies = [message for message in messages if message["type"] == "http.response.body"]
+    assert len(bodies) >= len(CHUNKS), f"{len(bodies)} body messages for {len(CHUNKS)} chunks"
+    decoder = zlib.decompressobj(31)
+    received = b""
+    for message, chunk in zip(bodies, CHUNKS):
+        assert message.get("more_body"), "the stream ended early"
+        received += decoder.decompress(message["body"])
+        assert received.endswith(chunk), f"chunk {chunk[:2]!r} was held back"
+    received += b"".join(decoder.decompress(message["body"]) for message in bodies[len(CHUNKS):])
+    assert decoder.eof and received == b"".join(CHUNKS)
+
+
+async def check_precompressed(root: Path):
+    source, variants = root / "static", root / "variants"
+    source.mkdir()
+    (source / "app.css").write_text("body { color: #333; }\n" * 200)
+    (source / "tiny.css").write_text("a{}")
+    (source / "logo.png").write_bytes(b"\x89PNG" + os.urandom(4096))
+    static = PrecompressedStaticFiles(directory=source, variants_directory=variants)
+    assert static.precompress() == 1, sorted(variants.rglob("*"))
+    assert (variants / "app.css.gz").exists() and not (variants / "tiny.css.gz").exists()
+    assert static.precompress() == 0, "an up-to-date variant was written again"
+
+    css = (source / "app.css").read_bytes()
+    transport = httpx.ASGITransport(app=Starlette(routes=[Mount("/static", static)]))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        gz = {"Accept-Encoding": "gzip"}
+        response = await client.get("/static/app.css", headers=gz)
+        assert response.headers["content-encoding"] == "gzip" and response.content == css
+        assert int(response.headers["content-length"]) == (variants / "app.css.gz").stat().st_size
+        assert response.headers["content-type"].startswith("text/css")
+        assert response.headers["vary"] == "Accept-Encoding"
+        not_modified = await client.get("/static/app.css", headers={**gz, "If-None-Match": response.headers["etag"]})
+        assert not_modified.status_code == 304
+
+        plain = await client.get("/static/app.css", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in plain.headers and plain.content == css
+        assert plain.headers["vary"] == "Accept-Encoding"
+        tiny = await client.get("/static/tiny.css", headers=gz)
+        assert "content-encoding" not in tiny.headers and tiny.text == "a{}"
+        logo = await client.get("/static/logo.png", headers=gz)
+        assert "content-encoding" not in logo.headers and "vary" not in logo.headers
+        # A range of the gzip variant is a range of its encoded bytes
+        ranged = await client.get("/static/app.css", headers={**gz, "Range": "bytes=0-9"})
+        assert ranged.status_code == 206 and ranged.headers["content-encoding"] == "gzip"
+        assert ranged.headers["content-range"] == f"bytes 0-9/{(variants / 'app.css.gz').stat().st_size}"
+
+        # The source changed after precompressing: the stale variant is not served
+        (source / "app.css").write_text("main { margin: 0; }\n" * 200)
+        os.utime(source / "app.css", ns=(1, 1))
+        changed = await client.get("/static/app.css", headers=gz)
+        assert "content-encoding" not in changed.headers and changed.content == (source / "app.css").read_bytes()
+        assert static.precompress() == 1
+        fresh = await client.get("/static/app.css", headers=gz)
+        assert fresh.headers["content-encoding"] == "gzip" and fresh.content == changed.content
+
+
+async def main():
+    check_negotiate()
+    app = app_under_test()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        await check_middleware(client)
+    await check_stream_flushes(app)
+    await check_precompressed(Path(tempfile.mkdtemp(prefix="compression_")))
+    print("✅ Responses are negotiated, compressed, streamed and served precompressed as expected")
+
+
+def test_compression():
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    test_compression()
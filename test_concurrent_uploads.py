@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Stress test for uploads against a multi-worker server.
+
+Starts web/run_admin.py with several workers on a temporary database, then
+many clients upload files with the same name at the same time. Every
+upload must get its own path and every file on disk must hold exactly the
+bytes that were sent for it. Runs under pytest or directly:
+    python test_concurrent_uploads.py
+    python test_concurrent_uploads.py --workers 8 --uploads 1000
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+import aiohttp
+
+ROOT_DIR = Path(__file__).parent
+# Same name for every upload, so all of them compete for the same target file
+UPLOAD_NAME = f"stress_{uuid.uuid4().hex[:8]}.png"
+PNG_HEADER = b"\x89PNG\r\n\x1a\n"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers: int, port: int) -> subprocess.Popen:
+    env = os.environ.copy()
+    env["DATABASE_URL"] = f"sqlite+aiosqlite:///{tempfile.mkdtemp(prefix='upload_stress_')}/test.sqlite3"
+    env.pop("SESSION_SECRET_KEY", None)
+    return subprocess.Popen(
+        [sys.executable, "web/run_admin.py", "--workers", str(workers), "--port", str(port)],
+        cwd=ROOT_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+async def wait_ready(base_url: str, timeout: float = 60) -> None:
+    # Workers share the listening socket, so requests go to whichever have started
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(f"{base_url}/healthz") as resp:
+                    if resp.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("Server did not become ready")
+
+
+async def upload_all(base_url: str, uploads: int, concurrency: int) -> dict:
+    """Upload distinct payloads under one filename; returns {path: payload}"""
+    payloads = [PNG_HEADER + f"upload {i} {uuid.uuid4()}".encode() * 64 for i in range(uploads)]
+    results = {}
+    failures = []
+    semaphore = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency, force_close=True)
+
+    async def upload(session, payload):
+        data = aiohttp.FormData()
+        data.add_field("file", payload, filename=UPLOAD_NAME)
+        data.add_field("media_type", "images")
+        async with semaphore:
+            async with session.post(f"{base_url}/api/media/upload", data=data) as resp:
+                body = await resp.json()
+        if resp.status != 200:
+            failures.append(body)
+        elif body["path"] in results:
+            failures.append(f"Path handed out twice: {body['path']}")
+        else:
+            results[body["path"]] = payload
+
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await asyncio.gather(*(upload(session, payload) for payload in payloads))
+    assert not failures, f"{len(failures)} failed uploads, first: {failures[0]}"
+    return results
+
+
+def check_files(results: dict, uploads: int) -> None:
+    assert len(results) == uploads, f"{uploads} uploads but {len(results)} distinct paths"
+    for path, payload in results.items():
+        assert (ROOT_DIR / path).read_bytes() == payload, f"{path} does not hold its upload"
+
+
+def cleanup() -> None:
+    # By name rather than by result, so a failed run leaves nothing behind either
+    for path in (ROOT_DIR / "media" / "images").glob(f"{Path(UPLOAD_NAME).stem}*.png"):
+        path.unlink()
+
+
+def run(workers: int = 4, uploads: int = 300, concurrency: int = 64) -> None:
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = start_server(workers, port)
+    try:
+        asyncio.run(wait_ready(base_url))
+        started = time.perf_counter()
+        results = asyncio.run(upload_all(base_url, uploads, concurrency))
+        elapsed = time.perf_counter() - started
+        check_files(results, uploads)
+        print(f"✅ {uploads} concurrent uploads on {workers} workers in {elapsed:.1f}s: all distinct and intact")
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        cleanup()
+
+
+def test_concurrent_uploads():
+    run()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent upload stress test")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--uploads", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+    run(args.workers, args.uploads, args.concurrency)
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Checks for the persistent job queue (db/jobs.py).
+
+Runs JobQueues with test job types on a temporary database: claiming by
+priority within concurrency limits, several queues sharing the table, retries
+with backoff, running out of attempts and retry_job, timeouts, thread
+handlers, expired leases, giving attempts back on stop and pruning.
+Runs under pytest or directly:
+    python test_job_queue.py
+"""
+import asyncio
+import json
+import threading
+import time
+
+import conftest  # noqa: F401 - the shared temporary database
+
+from sqlalchemy import insert, select, update
+
+from db import jobs
+from db.jobs import JobQueue, retry_job
+from db.models import Job
+from db.schema import init_db
+from db.session import AsyncSessionLocal
+
+POLL = 0.05
+
+
+async def get_job(job_id: int) -> Job:
+    async with AsyncSessionLocal() as session:
+        return (await session.execute(select(Job).where(Job.id == job_id))).scalar_one()
+
+
+async def wait_status(job_id: int, *statuses: str, timeout: float = 10) -> Job:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = await get_job(job_id)
+        if job.status in statuses:
+            return job
+        await asyncio.sleep(POLL / 2)
+    raise AssertionError(f"Job {job_id} is {job.status}, expected {' or '.join(statuses)}")
+
+
+async def check_priority_and_concurrency():
+    queue = JobQueue(poll_interval=POLL)
+    order, active, peak = [], 0, 0
+
+    async def record(payload):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        order.append(payload["n"])
+        await asyncio.sleep(0.05)
+        active -= 1
+        return payload["n"] * 2
+
+    queue.register("test.record", record, concurrency=2)
+    ids = [await queue.enqueue("test.record", {"n": n}, priority=n % 3) for n in range(9)]
+    await queue.start()
+    try:
+        finished = [await wait_status(job_id, "succeeded") for job_id in ids]
+    finally:
+        await queue.stop()
+    assert peak == 2, f"{peak} jobs ran at once, limit is 2"
+    # Higher priority first, then enqueue order
+    assert order == sorted(range(9), key=lambda n: (-(n % 3), n)), order
+    assert [json.loads(job.result) for job in finished] == [n * 2 for n in range(9)]
+    assert all(job.locked_by is None and job.attempts == 1 for job in finished)
+
+
+async def check_shared_table():
+    queues = [JobQueue(poll_interval=POLL) for _ in range(3)]
+    runs = []
+
+    def counter(index):
+        async def count(payload):
+            runs.append((payload["n"], index))
+            await asyncio.sleep(0.01)
+        return count
+
+    for index, queue in enumerate(queues):
+        queue.register("test.count", counter(index), concurrency=4)
+    ids = [await queues[0].enqueue("test.count", {"n": n}) for n in range(60)]
+    for queue in queues:
+        await queue.start()
+    try:
+        for job_id in ids:
+            await wait_status(job_id, "succeeded")
+    finally:
+        for queue in queues:
+            await queue.stop()
+    assert sorted(n for n, _ in runs) == list(range(60)), "a job ran twice or not at all"
+    assert len({index for _, index in runs}) > 1, "one queue ran every job"
+
+
+async def check_retries():
+    queue = JobQueue(poll_interval=POLL)
+    calls = {"flaky": 0, "broken": 0}
+
+    async def flaky(payload):
+        calls["flaky"] += 1
+        if calls["flaky"] < 3:
+            raise RuntimeError(f"attempt {calls['flaky']}")
+        return "ok"
+
+    async def broken(payload):
+        calls["broken"] += 1
+        raise ValueError("always")
+
+    queue.register("test.flaky", flaky, backoff=0.05, max_attempts=5)
+    queue.register("test.broken", broken, backoff=0.05, max_attempts=2)
+    flaky_id = await queue.enqueue("test.flaky")
+    broken_id = await queue.enqueue("test.broken")
+    await queue.start()
+    try:
+        job = await wait_status(flaky_id, "succeeded")
+        assert job.attempts == 3 and json.loads(job.result) == "ok"
+        # The error of an earlier attempt does not stick to a job that succeeded
+        assert job.last_error is None, job.last_error
+
+        job = await wait_status(broken_id, "failed")
+        assert job.attempts == 2 and calls["broken"] == 2
+        assert job.last_error == "ValueError: always" and job.finished_at
+
+        async with AsyncSessionLocal() as session:
+            assert await retry_job(session, broken_id)
+            assert not await retry_job(session, flaky_id), "only failed jobs can be retried"
+        queue.wake()
+        job = await wait_status(broken_id, "failed")
+        assert calls["broken"] == 4
+    finally:
+        await queue.stop()
+
+    delays = [jobs.JobType("x", broken, backoff=2, max_backoff=5).retry_delay(n) for n in (1, 2, 3, 4)]
+    assert 1 <= delays[0] <= 2 and 2 <= delays[1] <= 4 and 2.5 <= delays[2] <= 5 and delays[3] <= 5, delays
+
+
+async def check_timeout_and_threads():
+    queue = JobQueue(poll_interval=POLL)
+
+    async def slow(payload):
+        await asyncio.sleep(10)
+
+    def blocking(payload):
+        return threading.current_thread().name
+
+    queue.register("test.slow", slow, timeout=0.2, max_attempts=1)
+    queue.register("test.blocking", blocking, executor="thread")
+    slow_id = await queue.enqueue("test.slow")
+    blocking_id = await queue.enqueue("test.blocking")
+    await queue.start()
+    try:
+        job = await wait_status(slow_id, "failed")
+        assert job.last_error == "Timed out after 0.2s", job.last_error
+        job = await wait_status(blocking_id, "succeeded")
+        assert json.loads(job.result).startswith("job"), job.result
+    finally:
+        await queue.stop()
+
+
+async def check_expired_leases():
+    queue = JobQueue(poll_interval=POLL)
+    ran = []
+
+    async def resume(payload):
+        ran.append(payload["n"])
+
+    queue.register("test.resume", resume)
+    now = time.time()
+    # Claimed by a worker that died: one with attempts left, one without
+    async with AsyncSessionLocal() as session:
+        ids = (await session.execute(insert(Job).returning(Job.id), [
+            {"type": "test.resume", "payload": json.dumps({"n": n}), "status": "running", "attempts": attempts,
+             "max_attempts": 2, "run_after": now - 100, "created_at": now - 100, "started_at": now - 100,
+             "locked_by": "dead:1:abc", "locked_until": now - 1}
+            for n, attempts in ((1, 1), (2, 2))
+        ])).scalars().all()
+        # A live lease is left alone
+        live_id = (await session.execute(insert(Job).returning(Job.id), [{
+            "type": "test.resume", "payload": "{}", "status": "running", "attempts": 1, "max_attempts": 2,
+            "run_after": now, "created_at": now, "locked_by": "alive:1:abc", "locked_until": now + 600,
+        }])).scalar_one()
+        await session.commit()
+    await queue.start()
+    try:
+        job = await wait_status(ids[0], "succeeded")
+        assert job.attempts == 2 and ran == [1]
+        job = await wait_status(ids[1], "failed")
+        assert "lease expired" in job.last_error
+        assert (await get_job(live_id)).status == "running"
+    finally:
+        await queue.stop()
+        async with AsyncSessionLocal() as session:
+            await session.execute(update(Job).where(Job.id == live_id).values(status="failed", locked_by=None))
+            await session.commit()
+
+
+async def check_give_back_on_stop():
+    queue = JobQueue(poll_interval=POLL)
+    started = asyncio.Event()
+
+    async def long(payload):
+        started.set()
+        await asyncio.sleep(60)
+
+    queue.register("test.long", long, max_attempts=1)
+    job_id = await queue.enqueue("test.long")
+    await queue.start()
+    await asyncio.wait_for(started.wait(), 10)
+    assert queue.running() == {"test.long": 1}
+    await queue.stop()
+    job = await get_job(job_id)
+    # The interrupted attempt does not count, so a single-attempt job runs again after restart
+    assert job.status == "queued" and job.attempts == 0 and job.locked_by is None, (job.status, job.attempts)
+
+    restarted = JobQueue(poll_interval=POLL)
+    restarted.register("test.long", lambda payload: None, executor="thread")
+    await restarted.start()
+    try:
+        await wait_status(job_id, "succeeded")
+    finally:
+        await restarted.stop()
+
+
+async def check_prune():
+    queue = JobQueue(poll_interval=POLL)
+    now = time.time()
+    old = now - (jobs.RETENTION_DAYS + 1) * 86400
+    async with AsyncSessionLocal() as session:
+        ids = (await session.execute(insert(Job).returning(Job.id), [
+            {"type": "test.old", "payload": "{}", "status": status, "attempts": 1, "max_attempts": 1,
+             "run_after": old, "created_at": old, "finished_at": finished}
+            for status, finished in (("succeeded", old), ("succeeded", now), ("failed", old))
+        ])).scalars().all()
+        await session.commit()
+    await queue._prune()
+    async with AsyncSessionLocal() as session:
+        left = set((await session.execute(select(Job.id).where(Job.id.in_(ids)))).scalars())
+    # Only old successes go; failures stay for inspection
+    assert left == set(ids[1:]), left
+
+
+async def main():
+    await init_db()
+    await check_priority_and_concurrency()
+    await check_shared_table()
+    await check_retries()
+    await check_timeout_and_threads()
+    await check_expired_leases()
+    await check_give_back_on_stop()
+    await check_prune()
+    print("✅ Jobs are claimed, retried, timed out, requeued, given back and pruned as expected")
+
+
+def test_job_queue():
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    test_job_queue()
@@ -0,0 +1,176 @@
+"""
+On-demand profiling of a running process
+
+Used by the admin debug endpoints (web/profiling.py) and the bot /profile
+command (bot/profiling.py). Every capture returns (filename, bytes) so the
+caller can hand it out as a download. Only one capture runs at a time.
+"""
+import asyncio
+import cProfile
+import io
+import linecache
+import marshal
+import sys
+import threading
+import time
+import tracemalloc
+import traceback
+from collections import Counter
+from datetime import datetime
+from typing import Tuple
+
+MAX_SECONDS = 300
+capture_lock = asyncio.Lock()
+
+
+class ProfilerBusy(Exception):
+    """Another capture is already running"""
+
+
+def _stamp() -> str:
+    return datetime.now().strftime("%Y%m%d-%H%M%S")
+
+
+def _check_seconds(seconds: float) -> float:
+    if not 0 < seconds <= MAX_SECONDS:
+        raise ValueError(f"seconds must be between 0 and {MAX_SECONDS}")
+    return seconds
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}:{frame.f_lineno}"
+
+
+def _sample_stacks(seconds: float, interval: float) -> Counter:
+    """Runs in its own thread: sample every other thread's stack"""
+    stacks = Counter()
+    me = threading.get_ident()
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            frames = []
+            while frame is not None:
+                frames.append(_frame_name(frame))
+                frame = frame.f_back
+            frames.append(names.get(ident, str(ident)))
+            stacks[";".join(reversed(frames))] += 1
+        time.sleep(interval)
+    return stacks
+
+
+async def _exclusive(coro):
+    if capture_lock.locked():
+        coro.close()
+        raise ProfilerBusy("A profile capture is already running")
+    async with capture_lock:
+        return await coro
+
+
+async def _cpu_collapsed(seconds: float, interval: float) -> Tuple[str, bytes]:
+    stacks = await asyncio.to_thread(_sample_stacks, seconds, interval)
+    body = "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+    return f"cpu-{_stamp()}.collapsed", body.encode()
+
+
+async def _cpu_pstats(seconds: float) -> Tuple[str, bytes]:
+    # cProfile traces the event loop thread, where all request/update handling runs
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profile.disable()
+    profile.create_stats()
+    return f"cpu-{_stamp()}.pstats", marshal.dumps(profile.stats)
+
+
+async def cpu_profile(seconds: float, fmt: str = "collapsed", interval: float = 0.005) -> Tuple[str, bytes]:
+    """
+    CPU profile over the next ``seconds``
+
+    collapsed: sampled stacks of all threads, one "frame;frame;... count"
+    line per stack (flamegraph.pl / speedscope input).
+    pstats: deterministic cProfile of the event loop thread, readable with
+    pstats.Stats / snakeviz.
+    """
+    _check_seconds(seconds)
+    if fmt == "collapsed":
+        return await _exclusive(_cpu_collapsed(seconds, interval))
+    if fmt == "pstats":
+        return await _exclusive(_cpu_pstats(seconds))
+    raise ValueError("format must be 'collapsed' or 'pstats'")
+
+
+def _format_stats(stats, limit: int, diff: bool = False) -> str:
+    lines = []
+    for stat in stats[:limit]:
+        frame = stat.traceback[0]
+        size, count = (stat.size_diff, stat.count_diff) if diff else (stat.size, stat.count)
+        lines.append(f"{size / 1024:+10.1f} KiB {count:+8d} blocks  {frame.filename}:{frame.lineno}"
+                     if diff else f"{size / 1024:10.1f} KiB {count:8d} blocks  {frame.filename}:{frame.lineno}")
+        source = linecache.getline(frame.filename, frame.lineno).strip()
+        if source:
+            lines.append(f"{'':31}{source}")
+    return "\n".join(lines)
+
+
+async def _memory(seconds: float, limit: int) -> Tuple[str, bytes]:
+    started_here = not tracemalloc.is_tracing()
+    if started_here:
+        tracemalloc.start(25)
+    try:
+        before = tracemalloc.take_snapshot()
+        await asyncio.sleep(seconds)
+        after = tracemalloc.take_snapshot()
+    finally:
+        if started_here:
+            tracemalloc.stop()
+
+    current, peak = tracemalloc.get_traced_memory() if not started_here else (0, 0)
+    report = [
+        f"tracemalloc snapshot {_stamp()}, window {seconds}s"
+        + ("" if started_here else f", traced {current / 1048576:.1f} MiB (peak {peak / 1048576:.1f} MiB)"),
+        "",
+        f"Top {limit} growth over the window:",
+        _format_stats([s for s in after.compare_to(before, "lineno") if s.size_diff > 0], limit, diff=True),
+        "",
+        f"Top {limit} allocations at the end of the window"
+        + (" (only those made during the window; set PYTHONTRACEMALLOC to trace from startup)" if started_here else "")
+        + ":",
+        _format_stats(after.statistics("lineno"), limit),
+    ]
+    return f"memory-{_stamp()}.txt", "\n".join(report).encode()
+
+
+async def memory_profile(seconds: float, limit: int = 50) -> Tuple[str, bytes]:
+    """
+    tracemalloc top allocations and growth over the next ``seconds``
+
+    If tracing was not already on (PYTHONTRACEMALLOC), it is enabled for the
+    window only, so the report covers allocations made during it.
+    """
+    _check_seconds(seconds)
+    return await _exclusive(_memory(seconds, limit))
+
+
+def dump_tasks() -> Tuple[str, bytes]:
+    """Stacks of every asyncio task of the running loop and of every thread"""
+    out = io.StringIO()
+    tasks = asyncio.all_tasks()
+    out.write(f"{len(tasks)} asyncio tasks at {_stamp()}\n\n")
+    for task in sorted(tasks, key=lambda t: t.get_name()):
+        out.write(f"--- {task.get_name()}: {task.get_coro()!r}\n")
+        task.print_stack(file=out)
+        out.write("\n")
+
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    out.write(f"\n{len(names)} threads\n\n")
+    for ident, frame in sys._current_frames().items():
+        out.write(f"--- thread {names.get(ident, ident)}\n")
+        out.write("".join(traceback.format_stack(frame)))
+        out.write("\n")
+    return f"tasks-{_stamp()}.txt", out.getvalue().encode()
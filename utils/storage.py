@@ -0,0 +1,475 @@
+"""
+Media storage backends
+
+Media paths stored in the database ("media/images/x.jpg") are storage keys.
+LocalStorage keeps them under the project directory, as before; S3Storage
+keeps them in an S3-compatible bucket (AWS S3, MinIO, Ceph...), so the web
+and bot processes can run on different machines. The backend is chosen
+with MEDIA_STORAGE=local|s3 and used through get_storage().
+
+S3 requests are signed with AWS Signature Version 4 and sent with aiohttp,
+so no SDK is needed.
+"""
+import asyncio
+import hashlib
+import hmac
+import mimetypes
+import os
+import posixpath
+import tempfile
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional
+from urllib.parse import parse_qsl, quote, urlsplit
+
+from utils.logger import setup_logger
+
+logger = setup_logger('storage')
+
+ROOT_DIR = Path(__file__).parent.parent
+CHUNK_SIZE = 256 * 1024
+
+
+class StorageError(Exception):
+    """The storage backend failed or rejected a request"""
+
+
+@dataclass(frozen=True)
+class StoredObject:
+    key: str
+    size: int
+    modified: float  # unix timestamp
+    etag: str
+    content_type: str
+
+
+def guess_content_type(key: str) -> str:
+    return mimetypes.guess_type(key)[0] or "application/octet-stream"
+
+
+def file_etag(st: os.stat_result) -> str:
+    """Strong ETag of a local file; files are replaced atomically, so mtime and size identify the bytes"""
+    return f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+
+
+def normalize_key(key: str) -> str:
+    """Reject keys that would escape the media area ("media/../db.sqlite3", "/etc/passwd")"""
+    normalized = posixpath.normpath(key)
+    if normalized != key or not normalized.startswith("media/"):
+        raise ValueError(f"Invalid media key: {key}")
+    return normalized
+
+
+class Storage(ABC):
+    """
+    Interface shared by the backends
+
+    Missing keys raise FileNotFoundError from get, stream, stat and delete.
+    put with exclusive=True raises FileExistsError instead of replacing an
+    existing object, which lets concurrent writers claim distinct names.
+    """
+
+    @abstractmethod
+    async def put(self, key: str, data: bytes, content_type: Optional[str] = None, exclusive: bool = False) -> None:
+        ...
+
+    @abstractmethod
+    async def get(self, key: str) -> bytes:
+        ...
+
+    @abstractmethod
+    def stream(self, key: str, offset: int = 0, length: Optional[int] = None,
+               chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """Bytes [offset, offset + length) of the object, in chunks"""
+
+    @abstractmethod
+    async def stat(self, key: str) -> StoredObject:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def url(self, key: str, expires: Optional[int] = None) -> str:
+        """URL a client (browser, Telegram) can download the object from"""
+
+    def local_path(self, key: str) -> Optional[Path]:
+        """Filesystem path of the object, if the backend has one"""
+        return None
+
+    async def exists(self, key: str) -> bool:
+        try:
+            await self.stat(key)
+        except FileNotFoundError:
+            return False
+        return True
+
+    async def check(self) -> None:
+        """Readiness probe: write and remove a small object"""
+        key = f"media/.readyz_{uuid.uuid4().hex}"
+        await self.put(key, b"ok", exclusive=True)
+        await self.delete(key)
+
+    async def close(self) -> None:
+        pass
+
+
+class LocalStorage(Storage):
+    """Objects are files under ``root`` (the key is the relative path)"""
+
+    def __init__(self, root: Path = ROOT_DIR):
+        self.root = Path(root)
+
+    def local_path(self, key: str) -> Path:
+        return self.root / normalize_key(key)
+
+    @staticmethod
+    def _write_durably(fd: int, data: bytes) -> None:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    @staticmethod
+    def _sync_dir(directory: Path) -> None:
+        """Persist the directory entry of a new file (not possible on Windows)"""
+        try:
+            fd = os.open(directory, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    def _write(self, path: Path, data: bytes, exclusive: bool) -> None:
+        # put() returns once the bytes are on disk, so jobs queued for the
+        # file after that can rely on it surviving a crash
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if exclusive:
+            # O_EXCL makes claiming the name atomic, also across processes
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o644)
+            try:
+                self._write_durably(fd, data)
+            except BaseException:
+                path.unlink(missing_ok=True)
+                raise
+        else:
+            # Readers see either the old or the new file, never a partial one
+            fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".tmp_")
+            try:
+                self._write_durably(fd, data)
+                os.replace(tmp_name, path)
+            except BaseException:
+                os.unlink(tmp_name)
+                raise
+        self._sync_dir(path.parent)
+
+    async def put(self, key: str, data: bytes, content_type: Optional[str] = None, exclusive: bool = False) -> None:
+        await asyncio.to_thread(self._write, self.local_path(key), data, exclusive)
+
+    async def get(self, key: str) -> bytes:
+        return await asyncio.to_thread(self.local_path(key).read_bytes)
+
+    async def stream(self, key: str, offset: int = 0, length: Optional[int] = None,
+                     chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+        f = await asyncio.to_thread(open, self.local_path(key), "rb")
+        try:
+            if offset:
+                f.seek(offset)
+            remaining = length
+            while remaining is None or remaining > 0:
+                size = chunk_size if remaining is None else min(chunk_size, remaining)
+                chunk = await asyncio.to_thread(f.read, size)
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+        finally:
+            f.close()
+
+    def _stat(self, key: str) -> StoredObject:
+        path = self.local_path(key)
+        st = path.stat()
+        if not path.is_file():
+            raise FileNotFoundError(key)
+        return StoredObject(
+            key=key,
+            size=st.st_size,
+            modified=st.st_mtime,
+            etag=file_etag(st),
+            content_type=guess_content_type(key),
+        )
+
+    async def stat(self, key: str) -> StoredObject:
+        return await asyncio.to_thread(self._stat, key)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self.local_path(key).unlink)
+
+    def url(self, key: str, expires: Optional[int] = None) -> str:
+        # Served by the /media mount of the web app
+        return f"/{normalize_key(key)}"
+
+
+# AWS Signature Version 4
+
+ALGORITHM = "AWS4-HMAC-SHA256"
+EMPTY_SHA256 = hashlib.sha256(b"").hexdigest()
+UNSIGNED_PAYLOAD = "UNSIGNED-PAYLOAD"
+
+
+def _uri_encode(value: str, safe: str = "-_.~") -> str:
+    return quote(value, safe=safe)
+
+
+def canonical_query(query: str) -> str:
+    pairs = parse_qsl(query, keep_blank_values=True)
+    return "&".join(f"{_uri_encode(k)}={_uri_encode(v)}" for k, v in sorted(pairs))
+
+
+def _hmac(key: bytes, message: str) -> bytes:
+    return hmac.new(key, message.encode(), hashlib.sha256).digest()
+
+
+def signature(
+    secret_key: str,
+    region: str,
+    amz_date: str,
+    method: str,
+    path: str,
+    query: str,
+    headers: Dict[str, str],
+    payload_hash: str,
+    service: str = "s3",
+) -> str:
+    """
+    SigV4 signature of a request; ``path`` is already URI-encoded and
+    ``headers`` are exactly the signed headers (lower-case names)
+    """
+    names = sorted(headers)
+    canonical = "\n".join([
+        method,
+        path or "/",
+        canonical_query(query),
+        "".join(f"{name}:{' '.join(headers[name].split())}\n" for name in names),
+        ";".join(names),
+        payload_hash,
+    ])
+    date = amz_date[:8]
+    scope = f"{date}/{region}/{service}/aws4_request"
+    string_to_sign = "\n".join([ALGORITHM, amz_date, scope, hashlib.sha256(canonical.encode()).hexdigest()])
+    key = _hmac(_hmac(_hmac(_hmac(f"AWS4{secret_key}".encode(), date), region), service), "aws4_request")
+    return hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+
+
+def _amz_date(now: Optional[datetime]) -> str:
+    return (now or datetime.now(timezone.utc)).strftime("%Y%m%dT%H%M%SZ")
+
+
+def sign_headers(
+    method: str,
+    url: str,
+    headers: Dict[str, str],
+    payload_hash: str,
+    access_key: str,
+    secret_key: str,
+    region: str,
+    now: Optional[datetime] = None,
+) -> Dict[str, str]:
+    """Headers for the request, including Host, X-Amz-* and Authorization"""
+    parts = urlsplit(url)
+    amz_date = _amz_date(now)
+    signed = {name.lower(): value for name, value in headers.items()}
+    signed.update({"host": parts.netloc, "x-amz-date": amz_date, "x-amz-content-sha256": payload_hash})
+    sig = signature(secret_key, region, amz_date, method, parts.path, parts.query, signed, payload_hash)
+    credential = f"{access_key}/{amz_date[:8]}/{region}/s3/aws4_request"
+    signed["authorization"] = (
+        f"{ALGORITHM} Credential={credential}, SignedHeaders={';'.join(sorted(signed))}, Signature={sig}"
+    )
+    return signed
+
+
+def presign_url(
+    url: str,
+    access_key: str,
+    secret_key: str,
+    region: str,
+    expires: int,
+    method: str = "GET",
+    now: Optional[datetime] = None,
+) -> str:
+    """Query-string authenticated URL, valid for ``expires`` seconds"""
+    parts = urlsplit(url)
+    amz_date = _amz_date(now)
+    query = "&".join(f"{k}={_uri_encode(v)}" for k, v in (
+        ("X-Amz-Algorithm", ALGORITHM),
+        ("X-Amz-Credential", f"{access_key}/{amz_date[:8]}/{region}/s3/aws4_request"),
+        ("X-Amz-Date", amz_date),
+        ("X-Amz-Expires", str(expires)),
+        ("X-Amz-SignedHeaders", "host"),
+    ))
+    sig = signature(secret_key, region, amz_date, method, parts.path, query, {"host": parts.netloc}, UNSIGNED_PAYLOAD)
+    return f"{parts.scheme}://{parts.netloc}{parts.path}?{canonical_query(query)}&X-Amz-Signature={sig}"
+
+
+class S3Storage(Storage):
+    """
+    Objects in an S3-compatible bucket, addressed path-style
+    ({endpoint}/{bucket}/{prefix}{key})
+
+    url() returns a presigned GET URL, or ``public_url``/{key} when the
+    bucket is served publicly (e.g. through a CDN).
+    """
+
+    def __init__(
+        self,
+        endpoint_url: str,
+        bucket: str,
+        access_key: str,
+        secret_key: str,
+        region: str = "us-east-1",
+        prefix: str = "",
+        public_url: Optional[str] = None,
+        url_expires: int = 3600,
+    ):
+        self.endpoint_url = endpoint_url.rstrip("/")
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.prefix = prefix
+        self.public_url = public_url.rstrip("/") if public_url else None
+        self.url_expires = url_expires
+        self._session = None
+        self._session_loop = None
+
+    def _client(self):
+        import aiohttp
+
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(sock_connect=10, sock_read=60))
+            self._session_loop = loop
+        return self._session
+
+    def _object_url(self, key: str) -> str:
+        return f"{self.endpoint_url}/{self.bucket}/{_uri_encode(self.prefix + normalize_key(key), safe='/-_.~')}"
+
+    def _request(self, method: str, key: str, data: bytes = b"", headers: Optional[Dict[str, str]] = None):
+        url = self._object_url(key)
+        payload_hash = hashlib.sha256(data).hexdigest() if data else EMPTY_SHA256
+        signed = sign_headers(method, url, headers or {}, payload_hash, self.access_key, self.secret_key, self.region)
+        return self._client().request(method, url, data=data or None, headers=signed)
+
+    @staticmethod
+    async def _raise_for_status(response, key: str) -> None:
+        if response.status == 404:
+            raise FileNotFoundError(key)
+        if response.status in (409, 412):
+            raise FileExistsError(key)
+        if response.status >= 300:
+            body = await response.text()
+            raise StorageError(f"{response.method} {key}: HTTP {response.status} {body[:200]}")
+
+    async def put(self, key: str, data: bytes, content_type: Optional[str] = None, exclusive: bool = False) -> None:
+        headers = {"content-type": content_type or guess_content_type(key)}
+        if exclusive:
+            # Conditional write: the bucket answers 412 if the key exists
+            headers["if-none-match"] = "*"
+        async with self._request("PUT", key, data, headers) as response:
+            await self._raise_for_status(response, key)
+
+    async def get(self, key: str) -> bytes:
+        async with self._request("GET", key) as response:
+            await self._raise_for_status(response, key)
+            return await response.read()
+
+    async def stream(self, key: str, offset: int = 0, length: Optional[int] = None,
+                     chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+        if length == 0:
+            return
+        headers = {}
+        if offset or length is not None:
+            end = "" if length is None else str(offset + length - 1)
+            headers["range"] = f"bytes={offset}-{end}"
+        async with self._request("GET", key, headers=headers) as response:
+            if response.status == 416:
+                return
+            await self._raise_for_status(response, key)
+            async for chunk in response.content.iter_chunked(chunk_size):
+                yield chunk
+
+    async def stat(self, key: str) -> StoredObject:
+        async with self._request("HEAD", key) as response:
+            await self._raise_for_status(response, key)
+            last_modified = response.headers.get("Last-Modified")
+            return StoredObject(
+                key=key,
+                size=int(response.headers.get("Content-Length", 0)),
+                modified=parsedate_to_datetime(last_modified).timestamp() if last_modified else 0.0,
+                etag=response.headers.get("ETag", ""),
+                content_type=response.headers.get("Content-Type", guess_content_type(key)),
+            )
+
+    async def delete(self, key: str) -> None:
+        # DELETE succeeds for missing keys too; HEAD first to report them
+        await self.stat(key)
+        async with self._request("DELETE", key) as response:
+            await self._raise_for_status(response, key)
+
+    def url(self, key: str, expires: Optional[int] = None) -> str:
+        if self.public_url:
+            return f"{self.public_url}/{_uri_encode(self.prefix + normalize_key(key), safe='/-_.~')}"
+        return presign_url(
+            self._object_url(key), self.access_key, self.secret_key, self.region, expires or self.url_expires
+        )
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+def storage_from_env() -> Storage:
+    backend = os.getenv("MEDIA_STORAGE", "local")
+    if backend == "local":
+        return LocalStorage(Path(os.getenv("MEDIA_ROOT", ROOT_DIR)))
+    if backend == "s3":
+        return S3Storage(
+            endpoint_url=os.getenv("S3_ENDPOINT_URL", "https://s3.amazonaws.com"),
+            bucket=os.environ["S3_BUCKET"],
+            access_key=os.environ["S3_ACCESS_KEY_ID"],
+            secret_key=os.environ["S3_SECRET_ACCESS_KEY"],
+            region=os.getenv("S3_REGION", "us-east-1"),
+            prefix=os.getenv("S3_PREFIX", ""),
+            public_url=os.getenv("S3_PUBLIC_URL") or None,
+            url_expires=int(os.getenv("MEDIA_URL_EXPIRES", 3600)),
+        )
+    raise ValueError(f"Unknown MEDIA_STORAGE backend: {backend}")
+
+
+_storage: Optional[Storage] = None
+
+
+def get_storage() -> Storage:
+    """The configured backend (created on first use)"""
+    global _storage
+    if _storage is None:
+        _storage = storage_from_env()
+        logger.info(f"Media storage: {type(_storage).__name__}")
+    return _storage
+
+
+def configure_storage(storage: Storage) -> None:
+    """Replace the backend, e.g. in tests and benchmarks"""
+    global _storage
+    _storage = storage
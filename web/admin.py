@@ -10,19 +10,107 @@ from wtforms import (
 )
 from wtforms.widgets import TextArea
 from wtforms.fields import SelectField
-from sqlalchemy.orm import selectinload
-from db.models import City, Excursion, Point
+import anyio
+from sqlalchemy import func, select
+from sqlalchemy.orm import defer, undefer
+from db.cascade import (
+    delete_city_statements,
+    delete_excursion_statements,
+    delete_point_statements,
+    delete_tree_sync,
+)
+from db.models import City, Excursion, Point, RowCount
+from db.search import build_match_query, matching_ids
+from web.media import enqueue_media_cleanup
 from web.media_admin import MediaField, MediaWidget, MEDIA_CSS, MEDIA_JS
 from markupsafe import Markup
 from starlette.requests import Request
+from typing import Optional
 from utils.logger import setup_logger
 from markupsafe import Markup
 
 logger = setup_logger("web_admin")
 
-class CityAdmin(ModelView, model=City):
-    column_list = [City.id, City.name, City.image, City.excursions]
+
+async def delete_with_children(session_maker, statements):
+    """Run a set-based cascading delete on the sync engine and queue freed media"""
+    def run():
+        with session_maker() as session:
+            return delete_tree_sync(session, statements)
+
+    freed_media = await anyio.to_thread.run_sync(run)
+    if freed_media:
+        await enqueue_media_cleanup(freed_media)
+
+class CappedCount(int):
+    """A row count that was cut off; renders as "1000+" in the list template"""
+
+    def __str__(self):
+        return f"{int(self) - 1}+"
+
+    def __html__(self):
+        return str(self)
+
+
+class FastCountMixin:
+    """
+    Cheap pagination counts for large tables
+
+    Unfiltered list pages read the trigger-maintained row_counts table.
+    Searched or filtered pages count at most ``count_cap`` matching rows
+    (or enough to reach the pages around the current one) and show "1000+";
+    set ``count_cap = None`` on a view for exact filtered counts.
+    """
+
+    count_cap: Optional[int] = 1000
+
+    def _is_filtered(self, request: Request) -> bool:
+        if request.query_params.get("search"):
+            return True
+        return any(request.query_params.get(f.parameter_name) for f in self.get_filters())
+
+    async def count(self, request: Request, stmt=None) -> int:
+        if stmt is None or not self._is_filtered(request):
+            rows = await self._run_query(
+                select(RowCount.row_count).where(RowCount.table_name == self.model.__tablename__)
+            )
+            if rows:
+                return rows[0]
+            return await super().count(request, stmt)
+
+        froms = stmt.get_final_froms()
+        inner = getattr(froms[0], "element", None) if len(froms) == 1 else None
+        if inner is None:
+            return await super().count(request, stmt)
+        # Ordering does not change a count; dropping it avoids sorting every match
+        inner = inner.order_by(None)
+        if self.count_cap is None:
+            return await super().count(request, select(func.count()).select_from(inner.subquery()))
+
+        page = self.validate_page_number(request.query_params.get("page"), 1)
+        page_size = self.validate_page_number(request.query_params.get("pageSize"), 0) or self.page_size
+        cap = max(self.count_cap, (page + 8) * page_size)
+        capped = select(func.count()).select_from(inner.limit(cap + 1).subquery())
+        count = await super().count(request, capped)
+        return CappedCount(count) if count > cap else count
+
+
+class FullTextSearchMixin:
+    """Back the admin search box with the FTS5 search_index instead of LIKE scans"""
+
+    search_entity: str = ""
+
+    def search_query(self, stmt, term):
+        match_query = build_match_query(term)
+        if match_query is None:
+            return super().search_query(stmt, term)
+        return stmt.where(self.model.id.in_(matching_ids(self.search_entity, match_query)))
+
+
+class CityAdmin(FastCountMixin, FullTextSearchMixin, ModelView, model=City):
+    column_list = [City.id, City.name, City.image, City.excursion_count, City.point_count]
     column_searchable_list = [City.name]
+    search_entity = "city"
     column_sortable_list = [City.id, City.name]
     form_columns = [City.name, City.image]
 
@@ -55,7 +143,8 @@ class CityAdmin(ModelView, model=City):
         City.id: "ID",
         City.name: "City Name",
         City.image: "Image",
-        City.excursions: "Excursions",
+        City.excursion_count: "Excursions",
+        City.point_count: "Points",
     }
 
     form_args = {
@@ -93,6 +182,10 @@ class CityAdmin(ModelView, model=City):
         form_class.image.kwargs["entity_type"] = "city"
         return form_class
 
+    def list_query(self, request: Request):
+        # Counts come from correlated subqueries in the same SELECT
+        return select(City).options(undefer(City.excursion_count), undefer(City.point_count))
+
     async def insert_model(self, request: Request, data: dict):
         logger.info(f"[CityAdmin] Inserting city: {data}")
         return await super().insert_model(request, data)
@@ -101,16 +194,22 @@ class CityAdmin(ModelView, model=City):
         logger.info(f"[CityAdmin] Updating city {pk}: {data}")
         return await super().update_model(request, pk=pk, data=data)
 
-class ExcursionAdmin(ModelView, model=Excursion):
+    async def delete_model(self, request: Request, pk):
+        logger.info(f"[CityAdmin] Deleting city {pk} with its excursions and points")
+        await delete_with_children(self.session_maker, delete_city_statements(int(pk)))
+
+class ExcursionAdmin(FastCountMixin, FullTextSearchMixin, ModelView, model=Excursion):
     column_list = [
         Excursion.id,
         Excursion.title,
         Excursion.city_id,
         Excursion.city,
+        Excursion.point_count,
         Excursion.image,
         Excursion.video,
     ]
     column_searchable_list = [Excursion.title, Excursion.description]
+    search_entity = "excursion"
     column_sortable_list = [Excursion.id, Excursion.title, Excursion.city_id]
 
     column_formatters = {
@@ -157,6 +256,7 @@ class ExcursionAdmin(ModelView, model=Excursion):
         Excursion.title: "Title",
         Excursion.city_id: "City ID",
         Excursion.city: "City",
+        Excursion.point_count: "Points",
         Excursion.description: "Description",
         Excursion.image: "Image",
         Excursion.video: "Video",
@@ -220,6 +320,13 @@ class ExcursionAdmin(ModelView, model=Excursion):
         form_class.video.kwargs["entity_type"] = "excursion"
         return form_class
 
+    def list_query(self, request: Request):
+        # sqladmin selectin-loads the city for the whole page; the long description is not loaded
+        return select(Excursion).options(
+            undefer(Excursion.point_count),
+            defer(Excursion.description),
+        )
+
     async def insert_model(self, request: Request, data: dict):
         logger.info(f"[ExcursionAdmin] Inserting excursion: {data}")
         return await super().insert_model(request, data)
@@ -228,7 +335,11 @@ class ExcursionAdmin(ModelView, model=Excursion):
         logger.info(f"[ExcursionAdmin] Updating excursion {pk}: {data}")
         return await super().update_model(request, pk=pk, data=data)
 
-class PointAdmin(ModelView, model=Point):
+    async def delete_model(self, request: Request, pk):
+        logger.info(f"[ExcursionAdmin] Deleting excursion {pk} with its points")
+        await delete_with_children(self.session_maker, delete_excursion_statements(int(pk)))
+
+class PointAdmin(FastCountMixin, FullTextSearchMixin, ModelView, model=Point):
     column_list = [
         Point.id,
         Point.order,
@@ -242,6 +353,7 @@ class PointAdmin(ModelView, model=Point):
     ]
 
     column_searchable_list = [Point.title, Point.text]
+    search_entity = "point"
     column_sortable_list = [Point.id, Point.order, Point.title, Point.excursion_id]
     column_default_sort = [(Point.excursion_id, False), (Point.order, False)]
 
@@ -396,10 +508,18 @@ class PointAdmin(ModelView, model=Point):
         form_class.video.kwargs["entity_type"] = "point"
         return form_class
 
+    def list_query(self, request: Request):
+        # The list page never shows the (up to 2000 characters) point text
+        return select(Point).options(defer(Point.text))
+
     async def insert_model(self, request: Request, data: dict):
         logger.info(f"[PointAdmin] Inserting point: {data}")
         return await super().insert_model(request, data)
 
     async def update_model(self, request: Request, pk, data: dict):
         logger.info(f"[PointAdmin] Updating point {pk}: {data}")
-        return await super().update_model(request, pk=pk, data=data)
\ No newline at end of file
+        return await super().update_model(request, pk=pk, data=data)
+
+    async def delete_model(self, request: Request, pk):
+        logger.info(f"[PointAdmin] Deleting point {pk}")
+        await delete_with_children(self.session_maker, delete_point_statements(int(pk)))
\ No newline at end of file
@@ -0,0 +1,120 @@
+"""
+Conditional requests and an in-process response cache for the CRUD API.
+
+Every response is keyed by the content versions it depends on (see
+ContentVersion in db/models.py), so a cached body can never be stale:
+a write bumps the version, which changes both the ETag and the cache key.
+"""
+import os
+from collections import OrderedDict
+from email.utils import formatdate
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models import ContentVersion
+from utils.logger import setup_logger
+
+logger = setup_logger('web_cache')
+
+CACHE_MAX_BYTES = int(os.getenv("API_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+CACHE_CONTROL = "public, max-age=0, must-revalidate"
+
+
+class ResponseCache:
+    """LRU cache of response bodies bounded by their total size in bytes"""
+
+    def __init__(self, max_bytes: int = CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[tuple, bytes]" = OrderedDict()
+
+    def get(self, key: tuple) -> Optional[bytes]:
+        body = self._entries.get(key)
+        if body is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return body
+
+    def set(self, key: tuple, body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.size -= len(old)
+        self._entries[key] = body
+        self.size += len(body)
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+response_cache = ResponseCache()
+
+
+async def read_versions(session: AsyncSession, scopes: Iterable[str]) -> Dict[str, Tuple[int, float]]:
+    """Return {scope: (version, updated_at)} for the scopes that have been written"""
+    result = await session.execute(
+        select(ContentVersion.scope, ContentVersion.version, ContentVersion.updated_at)
+        .where(ContentVersion.scope.in_(list(scopes)))
+    )
+    return {scope: (version, updated_at) for scope, version, updated_at in result}
+
+
+def make_etag(scopes: Iterable[str], versions: Dict[str, Tuple[int, float]]) -> str:
+    return '"' + "-".join(str(versions.get(scope, (0, 0.0))[0]) for scope in scopes) + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return etag in candidates or f"W/{etag}" in candidates
+
+
+async def cached_json_response(
+    request: Request,
+    session: AsyncSession,
+    scopes: Iterable[str],
+    render: Callable[[], Awaitable[bytes]],
+) -> Response:
+    """
+    Serve a JSON body that depends on the given content version scopes
+
+    Answers If-None-Match with 304, otherwise serves the body from the
+    response cache, calling ``render`` only on a miss.
+    """
+    scopes = list(scopes)
+    versions = await read_versions(session, scopes)
+    etag = make_etag(scopes, versions)
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    last_modified = max((updated_at for _, updated_at in versions.values()), default=None)
+    if last_modified:
+        headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
+
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    key = (request.url.path, tuple(sorted(request.query_params.multi_items())), etag)
+    body = response_cache.get(key)
+    if body is None:
+        body = await render()
+        response_cache.set(key, body)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Streaming export and import of the whole catalog as JSON Lines.
+
+Each line is one record with a "type" field:
+
+    {"type": "city", "name": ..., "image": ...}
+    {"type": "excursion", "city": <city name>, "title": ..., "description": ..., "image": ..., "video": ...}
+    {"type": "point", "city": ..., "excursion": <excursion title>, "order": ..., "title": ..., ...}
+    {"type": "media", "path": ..., "size": <bytes or null if missing>}
+
+Records reference their parents by natural key (city name, excursion title
+within a city, point order within an excursion) instead of database ids, so
+a dump can be loaded into another database. Import is idempotent: existing
+rows with the same natural key are updated, new ones inserted, all in one
+transaction. Parents must appear before their children, as in an export.
+
+Usage:
+    python web/catalog.py export [-o catalog.jsonl]
+    python web/catalog.py import catalog.jsonl
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import BaseModel, Field, ValidationError
+from sqlalchemy import insert, select, tuple_, union, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models import City, Excursion, Point
+from db.session import AsyncSessionLocal
+from utils.logger import setup_logger
+from utils.storage import get_storage
+from web.crud import CityCreate, ExcursionCreate, PointCreate
+from web.media import MEDIA_COLUMNS
+
+logger = setup_logger('web_catalog')
+
+BATCH_SIZE = 1000
+CURSOR_BATCH = {"yield_per": BATCH_SIZE}
+
+CITY_FIELDS = ("image",)
+EXCURSION_FIELDS = ("description", "image", "video")
+POINT_FIELDS = ("title", "text", "lat", "lng", "audio", "image", "video")
+
+
+# Records are checked with the CRUD API's models; parents are named instead of referenced by id
+class CityRecord(CityCreate):
+    image: Optional[str] = Field(None, max_length=255)
+
+
+class ExcursionRecord(ExcursionCreate):
+    city_id: Optional[int] = None
+    city: str
+    image: Optional[str] = Field(None, max_length=255)
+    video: Optional[str] = Field(None, max_length=255)
+
+
+class PointRecord(PointCreate):
+    excursion_id: Optional[int] = None
+    city: str
+    excursion: str
+    video: Optional[str] = Field(None, max_length=255)
+
+
+class MediaRecord(BaseModel):
+    path: str
+
+
+RECORD_MODELS = {"city": CityRecord, "excursion": ExcursionRecord, "point": PointRecord, "media": MediaRecord}
+
+
+def _line(record: dict) -> bytes:
+    return (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+async def export_catalog(session: AsyncSession) -> AsyncIterator[bytes]:
+    """Yield the catalog as JSON Lines, reading every table through a server-side cursor"""
+    result = await session.stream(select(City.name, City.image).order_by(City.id).execution_options(**CURSOR_BATCH))
+    async for name, image in result:
+        yield _line({"type": "city", "name": name, "image": image})
+
+    result = await session.stream(
+        select(City.name, Excursion.title, Excursion.description, Excursion.image, Excursion.video)
+        .join(City, Excursion.city_id == City.id)
+        .order_by(Excursion.id)
+        .execution_options(**CURSOR_BATCH)
+    )
+    async for city, title, description, image, video in result:
+        yield _line({
+            "type": "excursion", "city": city, "title": title,
+            "description": description, "image": image, "video": video,
+        })
+
+    result = await session.stream(
+        select(City.name, Excursion.title, Point.order, *[getattr(Point, f) for f in POINT_FIELDS])
+        .join(Excursion, Point.excursion_id == Excursion.id)
+        .join(City, Excursion.city_id == City.id)
+        .order_by(Point.excursion_id, Point.order, Point.id)
+        .execution_options(**CURSOR_BATCH)
+    )
+    async for city, excursion, order, *values in result:
+        record = {"type": "point", "city": city, "excursion": excursion, "order": order}
+        record.update(zip(POINT_FIELDS, values))
+        yield _line(record)
+
+    paths = union(*[select(column.label("path")).where(column.isnot(None)) for column in MEDIA_COLUMNS])
+    result = await session.stream(select(paths.subquery().c.path).order_by("path").execution_options(**CURSOR_BATCH))
+    async for (path,) in result:
+        yield _line({"type": "media", "path": path, "size": await media_size(path)})
+
+
+async def media_size(path: str) -> Optional[int]:
+    """Size of a stored media file, None if it is missing"""
+    try:
+        return (await get_storage().stat(path)).size
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+class CatalogError(ValueError):
+    """An invalid record, with the number of the line it came from"""
+
+    def __init__(self, line: Optional[int], message: str):
+        super().__init__(message)
+        self.line = line
+
+
+class CatalogImporter:
+    """Batched, idempotent upsert of catalog records by natural key"""
+
+    def __init__(self, session: AsyncSession, batch_size: int = BATCH_SIZE):
+        self.session = session
+        self.batch_size = batch_size
+        self.stats = {
+            kind: {"inserted": 0, "updated": 0}
+            for kind in ("city", "excursion", "point")
+        }
+        self.stats["media"] = {"listed": 0, "missing": 0}
+        self._batch: List[dict] = []
+        self._lines: List[Optional[int]] = []
+        self._batch_type: Optional[str] = None
+
+    async def add(self, record: dict, line: Optional[int] = None) -> None:
+        """Queue a record, checked now so that errors name its own line rather than the one that flushes it"""
+        if not isinstance(record, dict):
+            raise CatalogError(line, f"Record must be an object, got {type(record).__name__}")
+        kind = record.get("type")
+        if kind not in RECORD_MODELS:
+            raise CatalogError(line, f"Unknown record type: {kind!r}")
+        try:
+            record = RECORD_MODELS[kind].model_validate(record).model_dump()
+        except ValidationError as e:
+            problems = "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors())
+            raise CatalogError(line, f"Invalid {kind} record: {problems}")
+        if kind != self._batch_type or len(self._batch) >= self.batch_size:
+            await self.flush()
+            self._batch_type = kind
+        self._batch.append(record)
+        self._lines.append(line)
+
+    async def flush(self) -> None:
+        batch, lines, kind = self._batch, self._lines, self._batch_type
+        self._batch, self._lines = [], []
+        if not batch:
+            return
+        if kind == "city":
+            await self._upsert_cities(batch)
+        elif kind == "excursion":
+            await self._upsert_excursions(batch, lines)
+        elif kind == "point":
+            await self._upsert_points(batch, lines)
+        else:
+            await self._check_media(batch)
+
+    async def _apply(self, kind: str, model, rows: Iterable[dict], existing: Dict[tuple, int], key) -> None:
+        inserts, updates = {}, {}
+        for row in rows:
+            row_key = key(row)
+            if row_key in existing:
+                updates[row_key] = {"id": existing[row_key], **row}
+            else:
+                # Later duplicates of a natural key win, as they would in sequential upserts
+                inserts[row_key] = row
+        if inserts:
+            await self.session.execute(insert(model), list(inserts.values()))
+        if updates:
+            await self.session.execute(update(model), list(updates.values()))
+        self.stats[kind]["inserted"] += len(inserts)
+        self.stats[kind]["updated"] += len(updates)
+
+    async def _city_ids(self, names: Iterable[str]) -> Dict[str, int]:
+        result = await self.session.execute(select(City.name, City.id).where(City.name.in_(set(names))))
+        return dict(result.all())
+
+    async def _excursion_ids(self, keys: Iterable[tuple]) -> Dict[tuple, int]:
+        result = await self.session.execute(
+            select(City.name, Excursion.title, Excursion.id)
+            .join(City, Excursion.city_id == City.id)
+            .where(tuple_(City.name, Excursion.title).in_(set(keys)))
+        )
+        return {(city, title): excursion_id for city, title, excursion_id in result}
+
+    async def _upsert_cities(self, batch: List[dict]) -> None:
+        existing = {(name,): city_id for name, city_id in (await self._city_ids(r["name"] for r in batch)).items()}
+        rows = [{"name": r["name"], **{f: r.get(f) for f in CITY_FIELDS}} for r in batch]
+        await self._apply("city", City, rows, existing, key=lambda row: (row["name"],))
+
+    async def _upsert_excursions(self, batch: List[dict], lines: List[Optional[int]]) -> None:
+        city_ids = await self._city_ids(r["city"] for r in batch)
+        rows = []
+        for r, line in zip(batch, lines):
+            if r["city"] not in city_ids:
+                raise CatalogError(line, f"Excursion {r['title']!r} references unknown city {r['city']!r}")
+            rows.append({"city_id": city_ids[r["city"]], "title": r["title"], **{f: r.get(f) for f in EXCURSION_FIELDS}})
+        existing = await self._excursion_ids((r["city"], r["title"]) for r in batch)
+        existing = {(city_ids[city], title): excursion_id for (city, title), excursion_id in existing.items()}
+        await self._apply("excursion", Excursion, rows, existing, key=lambda row: (row["city_id"], row["title"]))
+
+    async def _upsert_points(self, batch: List[dict], lines: List[Optional[int]]) -> None:
+        excursion_ids = await self._excursion_ids((r["city"], r["excursion"]) for r in batch)
+        rows = []
+        for r, line in zip(batch, lines):
+            excursion_id = excursion_ids.get((r["city"], r["excursion"]))
+            if excursion_id is None:
+                raise CatalogError(line, f"Point {r.get('title')!r} references unknown excursion {r['excursion']!r} in {r['city']!r}")
+            rows.append({"excursion_id": excursion_id, "order": r["order"], **{f: r.get(f) for f in POINT_FIELDS}})
+        result = await self.session.execute(
+            select(Point.excursion_id, Point.order, Point.id)
+            .where(tuple_(Point.excursion_id, Point.order).in_({(row["excursion_id"], row["order"]) for row in rows}))
+        )
+        existing = {(excursion_id, order): point_id for excursion_id, order, point_id in result}
+        await self._apply("point", Point, rows, existing, key=lambda row: (row["excursion_id"], row["order"]))
+
+    async def _check_media(self, batch: List[dict]) -> None:
+        sizes = await asyncio.gather(*(media_size(record["path"]) for record in batch))
+        self.stats["media"]["listed"] += len(batch)
+        self.stats["media"]["missing"] += sum(size is None for size in sizes)
+
+
+async def import_catalog(session: AsyncSession, lines: AsyncIterator[bytes], batch_size: int = BATCH_SIZE) -> dict:
+    """
+    Import JSON Lines records in a single transaction
+
+    Raises ValueError (after rolling back) on malformed or dangling records.
+    """
+    importer = CatalogImporter(session, batch_size)
+    line_number = 0
+    try:
+        async for line in lines:
+            line_number += 1
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise CatalogError(line_number, f"Malformed record: {e}")
+            try:
+                await importer.add(record, line_number)
+            except KeyError as e:
+                raise ValueError(f"Malformed record: {e}")
+        try:
+            await importer.flush()
+        except KeyError as e:
+            raise ValueError(f"Malformed record: {e}")
+        await session.commit()
+    except CatalogError as e:
+        await session.rollback()
+        raise ValueError(f"Line {e.line}: {e}")
+    except ValueError as e:
+        await session.rollback()
+        raise ValueError(f"Line {line_number}: {e}")
+    except Exception:
+        await session.rollback()
+        raise
+    logger.info(f"Catalog imported: {importer.stats}")
+    return importer.stats
+
+
+async def read_lines(read: Callable[[int], Awaitable[bytes]], chunk_size: int = 64 * 1024) -> AsyncIterator[bytes]:
+    """Split a stream exposed as ``await read(n)`` into lines without buffering all of it"""
+    buffer = b""
+    while chunk := await read(chunk_size):
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+
+async def _file_lines(path: str) -> AsyncIterator[bytes]:
+    with open(path, "rb") as f:
+        for line in f:
+            yield line
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Export or import the catalog as JSON Lines")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export", help="Write the catalog to a file or stdout")
+    export_parser.add_argument("-o", "--output", help="Output file (default: stdout)")
+    import_parser = subparsers.add_parser("import", help="Load a catalog dump")
+    import_parser.add_argument("input", help="JSON Lines file to import")
+    import_parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    async with AsyncSessionLocal() as session:
+        if args.command == "export":
+            out = open(args.output, "wb") if args.output else sys.stdout.buffer
+            try:
+                async for chunk in export_catalog(session):
+                    out.write(chunk)
+            finally:
+                if args.output:
+                    out.close()
+        else:
+            try:
+                stats = await import_catalog(session, _file_lines(args.input), args.batch_size)
+            except ValueError as e:
+                print(f"❌ Import failed, nothing was changed: {e}", file=sys.stderr)
+                sys.exit(1)
+            print(f"✅ Catalog imported: {json.dumps(stats)}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
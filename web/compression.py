@@ -0,0 +1,307 @@
+"""
+Response compression: gzip/brotli negotiation for dynamic responses and
+precompressed variants of static assets.
+
+CompressionMiddleware compresses text-like responses (JSON, HTML, CSS, JS...)
+of at least COMPRESS_MIN_SIZE bytes, streaming bodies chunk by chunk.
+Images, audio, video and archives are already compressed and pass through
+untouched, as do range and already-encoded responses.
+
+Static text assets are compressed once, at startup or at build time:
+
+    python -m web.compression
+
+writes .gz (and .br when the brotli package is installed) variants of each
+asset under STATIC_CACHE_DIR; PrecompressedStaticFiles serves them directly.
+"""
+import gzip
+import mimetypes
+import os
+import tempfile
+import zlib
+from importlib.util import find_spec
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+from utils.logger import setup_logger
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+logger = setup_logger('web_compression')
+
+ROOT_DIR = Path(__file__).parent.parent
+MINIMUM_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", 1024))
+GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", 6))
+BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", 4))
+STATIC_CACHE_DIR = Path(os.getenv("STATIC_CACHE_DIR", ROOT_DIR / ".static_cache"))
+
+# Preferred first
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+EXTENSIONS = {"br": ".br", "gzip": ".gz"}
+
+COMPRESSIBLE_TYPES = {
+    "application/json", "application/x-ndjson", "application/javascript", "application/xml",
+    "application/manifest+json", "application/problem+json", "image/svg+xml",
+    "font/ttf", "font/otf", "application/vnd.ms-fontobject",
+}
+STATIC_EXTENSIONS = {".css", ".js", ".map", ".json", ".svg", ".html", ".txt", ".xml", ".ttf", ".otf", ".eot"}
+
+# Precompressed assets use brotli's best quality: slow, but it runs once per file
+STATIC_BROTLI_QUALITY = 11
+
+
+def is_compressible(content_type: str) -> bool:
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    return media_type.startswith("text/") or media_type in COMPRESSIBLE_TYPES
+
+
+def negotiate(accept_encoding: str, available: Iterable[str] = ENCODINGS) -> Optional[str]:
+    """The best of ``available`` that Accept-Encoding allows, or None for identity"""
+    qualities: Dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        qualities[name.strip()] = q
+    wildcard = qualities.get("*", 0.0)
+    best, best_q = None, 0.0
+    for encoding in available:
+        q = qualities.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class _Compressor:
+    """Incremental gzip or brotli compressor with the same interface for both"""
+
+    def __init__(self, encoding: str, gzip_level: int = GZIP_LEVEL, brotli_quality: int = BROTLI_QUALITY):
+        self.encoding = encoding
+        if encoding == "br":
+            self._br = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._gz = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress a chunk and flush it, so a streamed chunk reaches the client now"""
+        if self.encoding == "br":
+            return self._br.process(data) + self._br.flush()
+        return self._gz.compress(data) + self._gz.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self.encoding == "br":
+            return self._br.process(data) + self._br.finish()
+        return self._gz.compress(data) + self._gz.flush()
+
+
+def add_vary(headers: MutableHeaders) -> None:
+    vary = headers.get("vary")
+    if not vary:
+        headers["Vary"] = "Accept-Encoding"
+    elif "accept-encoding" not in vary.lower() and vary.strip() != "*":
+        headers["Vary"] = f"{vary}, Accept-Encoding"
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware compressing eligible responses with gzip or brotli"""
+
+    def __init__(self, app, minimum_size: int = MINIMUM_SIZE, gzip_level: int = GZIP_LEVEL,
+                 brotli_quality: int = BROTLI_QUALITY):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            return await self.app(scope, receive, send)
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start = None
+        compressor = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, compressor, passthrough
+            if passthrough:
+                return await send(message)
+
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                length = headers.get("content-length")
+                if (
+                    message["status"] in (204, 206, 304)
+                    or "content-encoding" in headers
+                    or "content-range" in headers
+                    or "no-transform" in headers.get("cache-control", "")
+                    or not is_compressible(headers.get("content-type", ""))
+                ):
+                    passthrough = True
+                    return await send(message)
+                if length is not None and int(length) < self.minimum_size:
+                    passthrough = True
+                    add_vary(MutableHeaders(scope=message))
+                    return await send(message)
+                # Wait for the first body chunk to know whether the body streams
+                start = message
+                return
+
+            if message["type"] != "http.response.body":
+                return await send(message)
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                headers = MutableHeaders(scope=start)
+                add_vary(headers)
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start)
+                    return await send(message)
+                compressor = _Compressor(encoding, self.gzip_level, self.brotli_quality)
+                headers["Content-Encoding"] = encoding
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    # Same content, different bytes: the validator stays usable but becomes weak
+                    headers["ETag"] = f"W/{etag}"
+                if more_body:
+                    del headers["content-length"]
+                    await send(start)
+                    return await send({"type": "http.response.body", "body": compressor.compress(body), "more_body": True})
+                compressed = compressor.finish(body)
+                headers["Content-Length"] = str(len(compressed))
+                await send(start)
+                return await send({"type": "http.response.body", "body": compressed})
+
+            if more_body:
+                chunk = compressor.compress(body) if body else b""
+                if chunk:
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                return
+            await send({"type": "http.response.body", "body": compressor.finish(body)})
+
+        await self.app(scope, receive, send_wrapper)
+
+
+# Precompressed static assets
+
+def _write_atomic(path: Path, data: bytes, mtime_ns: int) -> None:
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".tmp_")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        # The variant carries the source's mtime: Last-Modified matches, and it marks the variant fresh
+        os.utime(tmp_name, ns=(mtime_ns, mtime_ns))
+        os.replace(tmp_name, path)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+
+def precompress_directory(source: Path, target: Path, minimum_size: int = MINIMUM_SIZE) -> int:
+    """
+    Write .gz/.br variants of the text assets in ``source`` under ``target``
+
+    Variants whose mtime matches their source are up to date and skipped.
+    Returns the number of files written.
+    """
+    written = 0
+    for path in sorted(source.rglob("*")):
+        if not path.is_file() or path.suffix.lower() not in STATIC_EXTENSIONS:
+            continue
+        stat_result = path.stat()
+        if stat_result.st_size < minimum_size:
+            continue
+        data = None
+        for encoding in ENCODINGS:
+            variant = target / (str(path.relative_to(source)) + EXTENSIONS[encoding])
+            try:
+                if variant.stat().st_mtime_ns == stat_result.st_mtime_ns:
+                    continue
+            except FileNotFoundError:
+                pass
+            data = data if data is not None else path.read_bytes()
+            if encoding == "br":
+                compressed = brotli.compress(data, quality=STATIC_BROTLI_QUALITY)
+            else:
+                compressed = gzip.compress(data, compresslevel=9, mtime=0)
+            if len(compressed) >= len(data):
+                continue
+            variant.parent.mkdir(parents=True, exist_ok=True)
+            _write_atomic(variant, compressed, stat_result.st_mtime_ns)
+            written += 1
+    return written
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles that serves a precompressed variant when the client accepts it"""
+
+    def __init__(self, *, directory: Path, variants_directory: Path, **kwargs):
+        super().__init__(directory=directory, **kwargs)
+        self.variants_directory = Path(variants_directory)
+
+    def precompress(self) -> int:
+        return precompress_directory(Path(self.directory), self.variants_directory)
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        relative = os.path.relpath(full_path, self.directory)
+        encoding = negotiate(request_headers.get("accept-encoding", ""))
+        variant_stat = None
+        if encoding is not None and status_code == 200:
+            variant = self.variants_directory / (relative + EXTENSIONS[encoding])
+            try:
+                variant_stat = variant.stat()
+            except FileNotFoundError:
+                pass
+        if variant_stat is None or variant_stat.st_mtime_ns != stat_result.st_mtime_ns:
+            response = super().file_response(full_path, stat_result, scope, status_code)
+            if Path(full_path).suffix.lower() in STATIC_EXTENSIONS:
+                add_vary(response.headers)
+            return response
+        response = FileResponse(
+            variant,
+            status_code=status_code,
+            stat_result=variant_stat,
+            media_type=mimetypes.guess_type(str(full_path))[0] or "application/octet-stream",
+            headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"},
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+def admin_statics_directory() -> Path:
+    """sqladmin's statics, located without importing sqladmin (the admin panel loads lazily)"""
+    return Path(find_spec("sqladmin").submodule_search_locations[0]) / "statics"
+
+
+def admin_statics() -> PrecompressedStaticFiles:
+    return PrecompressedStaticFiles(
+        directory=admin_statics_directory(),
+        variants_directory=STATIC_CACHE_DIR / "admin",
+    )
+
+
+if __name__ == "__main__":
+    count = admin_statics().precompress()
+    print(f"Precompressed {count} files into {STATIC_CACHE_DIR} ({', '.join(ENCODINGS)})")
@@ -1,19 +1,39 @@
 """
 CRUD API routes for managing cities, excursions, and points
 """
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File
+import mimetypes
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Request, Query
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from pydantic import BaseModel, Field
+from sqlalchemy import select, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
+from pydantic import BaseModel, Field, TypeAdapter, computed_field
 from typing import List, Optional
 
-from db.session import get_async_session
+try:
+    import orjson
+except ImportError:  # optional: the standard json module
+    orjson = None
+
+from db.changelog import ResyncRequired, purged_through, read_changes
+from db.search import ENTITY_TYPES, search
+from db.session import AsyncSessionLocal, get_async_session
 from db.models import City, Excursion, Point
-from web.media import save_upload_file, delete_media_file
+from db.cascade import (
+    delete_city_statements,
+    delete_excursion_statements,
+    delete_point_statements,
+    delete_tree,
+)
+from web.cache import cached_json_response
+from web.fields import FieldSelection
+from web.media import save_upload_file, delete_media_file, get_media_url, enqueue_media_cleanup
 from utils.logger import setup_logger
 
 logger = setup_logger('web_crud')
-router = APIRouter()
+# Responses not rendered by cached_json_response (writes, messages) are encoded with orjson when installed
+router = APIRouter(default_response_class=ORJSONResponse if orjson is not None else JSONResponse)
 
 # Pydantic models for request/response
 class CityCreate(BaseModel):
@@ -78,230 +98,454 @@ class PointResponse(BaseModel):
     lng: float
     audio: Optional[str] = None
     image: Optional[str] = None
+    video: Optional[str] = None
     
     class Config:
         from_attributes = True
 
+# Aggregate ("full") response models
+class MediaInfo(BaseModel):
+    field: str
+    path: str
+    url: str
+    content_type: Optional[str] = None
+
+
+def build_media_info(**paths: Optional[str]) -> List[MediaInfo]:
+    """Describe the non-empty media paths of an entity"""
+    return [
+        MediaInfo(
+            field=field,
+            path=path,
+            url=get_media_url(path),
+            content_type=mimetypes.guess_type(path)[0],
+        )
+        for field, path in paths.items()
+        if path
+    ]
+
+class PointFullResponse(PointResponse):
+    @computed_field
+    @property
+    def media(self) -> List[MediaInfo]:
+        return build_media_info(image=self.image, audio=self.audio, video=self.video)
+
+class ExcursionFullResponse(ExcursionResponse):
+    image: Optional[str] = None
+    video: Optional[str] = None
+    points: List[PointFullResponse] = []
+
+    @computed_field
+    @property
+    def media(self) -> List[MediaInfo]:
+        return build_media_info(image=self.image, video=self.video)
+
+class CityFullResponse(CityResponse):
+    image: Optional[str] = None
+    excursions: List[ExcursionFullResponse] = []
+
+    @computed_field
+    @property
+    def media(self) -> List[MediaInfo]:
+        return build_media_info(image=self.image)
+
+
+async def execute_write(
+    session: AsyncSession,
+    statement,
+    not_found: Optional[str] = None,
+    bad_reference: Optional[str] = None,
+):
+    """
+    Run a single INSERT/UPDATE/DELETE ... RETURNING statement and commit it
+
+    A statement that matched no row raises 404 ``not_found``; a foreign key
+    violation (the referenced parent does not exist) raises 404 ``bad_reference``.
+    """
+    try:
+        result = await session.execute(statement)
+        row = result.scalar_one_or_none()
+        await session.commit()
+    except IntegrityError as e:
+        await session.rollback()
+        if bad_reference is None:
+            raise
+        logger.info(f"Rejected write with missing reference: {e.orig}")
+        raise HTTPException(status_code=404, detail=bad_reference)
+    if row is None:
+        raise HTTPException(status_code=404, detail=not_found)
+    return row
+
+async def get_entity(session: AsyncSession, model, entity_id: int, not_found: str):
+    """Load a single row by primary key or raise 404"""
+    entity = await session.get(model, entity_id)
+    if entity is None:
+        raise HTTPException(status_code=404, detail=not_found)
+    return entity
+
+class SearchResult(BaseModel):
+    entity: str
+    id: int
+    title: str
+    snippet: str
+    rank: float
+
+    class Config:
+        from_attributes = True
+
+class ChangeEntry(BaseModel):
+    version: int
+    entity: str
+    id: int = Field(validation_alias="entity_id")
+    op: str
+    changed_at: float
+
+    class Config:
+        from_attributes = True
+
+class ChangesPage(BaseModel):
+    changes: List[ChangeEntry]
+    next_since: int
+    has_more: bool
+
+CityListAdapter = TypeAdapter(List[CityResponse])
+ExcursionListAdapter = TypeAdapter(List[ExcursionResponse])
+PointListAdapter = TypeAdapter(List[PointResponse])
+SearchResultListAdapter = TypeAdapter(List[SearchResult])
+
+# ?fields= on the list and detail endpoints
+CityFields = FieldSelection(City, CityResponse)
+ExcursionFields = FieldSelection(Excursion, ExcursionResponse)
+PointFields = FieldSelection(Point, PointResponse)
+
 # City CRUD endpoints
 @router.get("/cities", response_model=List[CityResponse])
-async def get_cities(session: AsyncSession = Depends(get_async_session)):
+async def get_cities(
+    request: Request,
+    fields: Optional[tuple] = Depends(CityFields),
+    session: AsyncSession = Depends(get_async_session),
+):
     """Get all cities"""
-    result = await session.execute(select(City))
-    cities = result.scalars().all()
-    return cities
+    async def render():
+        if fields:
+            return CityFields.dump_list(fields, await session.execute(CityFields.select(fields)))
+        result = await session.execute(select(City))
+        cities = [CityResponse.model_validate(c) for c in result.scalars()]
+        return CityListAdapter.dump_json(cities)
+    return await cached_json_response(request, session, ["cities"], render)
 
 @router.post("/cities", response_model=CityResponse)
 async def create_city(city: CityCreate, session: AsyncSession = Depends(get_async_session)):
     """Create a new city"""
     logger.info(f"Creating city: {city.name}")
-    db_city = City(name=city.name)
-    session.add(db_city)
-    await session.commit()
-    await session.refresh(db_city)
+    db_city = await execute_write(
+        session,
+        insert(City).values(name=city.name).returning(City),
+    )
     logger.info(f"City created with id: {db_city.id}")
     return db_city
 
 @router.get("/cities/{city_id}", response_model=CityResponse)
-async def get_city(city_id: int, session: AsyncSession = Depends(get_async_session)):
+async def get_city(
+    city_id: int,
+    request: Request,
+    fields: Optional[tuple] = Depends(CityFields),
+    session: AsyncSession = Depends(get_async_session),
+):
     """Get a specific city by ID"""
-    result = await session.execute(select(City).where(City.id == city_id))
-    city = result.scalar_one_or_none()
-    if not city:
-        raise HTTPException(status_code=404, detail="City not found")
-    return city
+    async def render():
+        if fields:
+            row = (await session.execute(CityFields.select(fields).where(City.id == city_id))).first()
+            if row is None:
+                raise HTTPException(status_code=404, detail="City not found")
+            return CityFields.dump_one(fields, row)
+        result = await session.execute(select(City).where(City.id == city_id))
+        city = result.scalar_one_or_none()
+        if not city:
+            raise HTTPException(status_code=404, detail="City not found")
+        return CityResponse.model_validate(city).model_dump_json().encode()
+    return await cached_json_response(request, session, [f"cities:{city_id}"], render)
+
+@router.get("/cities/{city_id}/full", response_model=CityFullResponse)
+async def get_city_full(city_id: int, request: Request, session: AsyncSession = Depends(get_async_session)):
+    """Get a city with all its excursions, points and media in three queries"""
+    async def render():
+        result = await session.execute(
+            select(City)
+            .where(City.id == city_id)
+            .options(selectinload(City.excursions).selectinload(Excursion.points))
+        )
+        city = result.scalar_one_or_none()
+        if not city:
+            raise HTTPException(status_code=404, detail="City not found")
+        return CityFullResponse.model_validate(city).model_dump_json().encode()
+    scopes = [f"cities:{city_id}", "excursions", "points"]
+    return await cached_json_response(request, session, scopes, render)
 
 @router.put("/cities/{city_id}", response_model=CityResponse)
 async def update_city(city_id: int, city: CityUpdate, session: AsyncSession = Depends(get_async_session)):
     """Update a city"""
-    result = await session.execute(select(City).where(City.id == city_id))
-    db_city = result.scalar_one_or_none()
-    if not db_city:
-        raise HTTPException(status_code=404, detail="City not found")
-    
-    if city.name is not None:
-        db_city.name = city.name
-    
-    await session.commit()
-    await session.refresh(db_city)
-    return db_city
+    changes = city.model_dump(exclude_none=True)
+    if not changes:
+        return await get_entity(session, City, city_id, "City not found")
+    return await execute_write(
+        session,
+        update(City).where(City.id == city_id).values(**changes).returning(City),
+        not_found="City not found",
+    )
 
 @router.delete("/cities/{city_id}")
 async def delete_city(city_id: int, session: AsyncSession = Depends(get_async_session)):
-    """Delete a city"""
+    """Delete a city with all its excursions and points"""
     logger.info(f"Deleting city: {city_id}")
-    result = await session.execute(select(City).where(City.id == city_id))
-    db_city = result.scalar_one_or_none()
-    if not db_city:
+    freed_media = await delete_tree(session, delete_city_statements(city_id))
+    if freed_media is None:
         raise HTTPException(status_code=404, detail="City not found")
-    
-    await session.delete(db_city)
-    await session.commit()
+    await enqueue_media_cleanup(freed_media)
     logger.info(f"City {city_id} deleted")
     return {"message": "City deleted successfully"}
 
 # Excursion CRUD endpoints
 @router.get("/excursions", response_model=List[ExcursionResponse])
-async def get_excursions(city_id: Optional[int] = None, session: AsyncSession = Depends(get_async_session)):
+async def get_excursions(
+    request: Request,
+    city_id: Optional[int] = None,
+    fields: Optional[tuple] = Depends(ExcursionFields),
+    session: AsyncSession = Depends(get_async_session),
+):
     """Get all excursions, optionally filtered by city"""
-    query = select(Excursion)
-    if city_id:
-        query = query.where(Excursion.city_id == city_id)
-    result = await session.execute(query)
-    excursions = result.scalars().all()
-    return excursions
+    async def render():
+        query = ExcursionFields.select(fields) if fields else select(Excursion)
+        if city_id:
+            query = query.where(Excursion.city_id == city_id)
+        result = await session.execute(query)
+        if fields:
+            return ExcursionFields.dump_list(fields, result)
+        excursions = [ExcursionResponse.model_validate(e) for e in result.scalars()]
+        return ExcursionListAdapter.dump_json(excursions)
+    return await cached_json_response(request, session, ["excursions"], render)
 
 @router.post("/excursions", response_model=ExcursionResponse)
 async def create_excursion(excursion: ExcursionCreate, session: AsyncSession = Depends(get_async_session)):
     """Create a new excursion"""
-    # Verify city exists
-    city_result = await session.execute(select(City).where(City.id == excursion.city_id))
-    if not city_result.scalar_one_or_none():
-        raise HTTPException(status_code=404, detail="City not found")
-    
-    db_excursion = Excursion(
-        city_id=excursion.city_id,
-        title=excursion.title,
-        description=excursion.description
+    return await execute_write(
+        session,
+        insert(Excursion).values(**excursion.model_dump()).returning(Excursion),
+        bad_reference="City not found",
     )
-    session.add(db_excursion)
-    await session.commit()
-    await session.refresh(db_excursion)
-    return db_excursion
 
 @router.get("/excursions/{excursion_id}", response_model=ExcursionResponse)
-async def get_excursion(excursion_id: int, session: AsyncSession = Depends(get_async_session)):
+async def get_excursion(
+    excursion_id: int,
+    request: Request,
+    fields: Optional[tuple] = Depends(ExcursionFields),
+    session: AsyncSession = Depends(get_async_session),
+):
     """Get a specific excursion by ID"""
-    result = await session.execute(select(Excursion).where(Excursion.id == excursion_id))
-    excursion = result.scalar_one_or_none()
-    if not excursion:
-        raise HTTPException(status_code=404, detail="Excursion not found")
-    return excursion
+    async def render():
+        if fields:
+            query = ExcursionFields.select(fields).where(Excursion.id == excursion_id)
+            row = (await session.execute(query)).first()
+            if row is None:
+                raise HTTPException(status_code=404, detail="Excursion not found")
+            return ExcursionFields.dump_one(fields, row)
+        result = await session.execute(select(Excursion).where(Excursion.id == excursion_id))
+        excursion = result.scalar_one_or_none()
+        if not excursion:
+            raise HTTPException(status_code=404, detail="Excursion not found")
+        return ExcursionResponse.model_validate(excursion).model_dump_json().encode()
+    return await cached_json_response(request, session, [f"excursions:{excursion_id}"], render)
+
+@router.get("/excursions/{excursion_id}/full", response_model=ExcursionFullResponse)
+async def get_excursion_full(excursion_id: int, request: Request, session: AsyncSession = Depends(get_async_session)):
+    """Get an excursion with its ordered points and media in two queries"""
+    async def render():
+        result = await session.execute(
+            select(Excursion)
+            .where(Excursion.id == excursion_id)
+            .options(selectinload(Excursion.points))
+        )
+        excursion = result.scalar_one_or_none()
+        if not excursion:
+            raise HTTPException(status_code=404, detail="Excursion not found")
+        return ExcursionFullResponse.model_validate(excursion).model_dump_json().encode()
+    scopes = [f"excursions:{excursion_id}", "points"]
+    return await cached_json_response(request, session, scopes, render)
 
 @router.put("/excursions/{excursion_id}", response_model=ExcursionResponse)
 async def update_excursion(excursion_id: int, excursion: ExcursionUpdate, session: AsyncSession = Depends(get_async_session)):
     """Update an excursion"""
-    result = await session.execute(select(Excursion).where(Excursion.id == excursion_id))
-    db_excursion = result.scalar_one_or_none()
-    if not db_excursion:
-        raise HTTPException(status_code=404, detail="Excursion not found")
-    
-    if excursion.city_id is not None:
-        # Verify city exists
-        city_result = await session.execute(select(City).where(City.id == excursion.city_id))
-        if not city_result.scalar_one_or_none():
-            raise HTTPException(status_code=404, detail="City not found")
-        db_excursion.city_id = excursion.city_id
-    
-    if excursion.title is not None:
-        db_excursion.title = excursion.title
-    if excursion.description is not None:
-        db_excursion.description = excursion.description
-    
-    await session.commit()
-    await session.refresh(db_excursion)
-    return db_excursion
+    changes = excursion.model_dump(exclude_none=True)
+    if not changes:
+        return await get_entity(session, Excursion, excursion_id, "Excursion not found")
+    return await execute_write(
+        session,
+        update(Excursion).where(Excursion.id == excursion_id).values(**changes).returning(Excursion),
+        not_found="Excursion not found",
+        bad_reference="City not found",
+    )
 
 @router.delete("/excursions/{excursion_id}")
 async def delete_excursion(excursion_id: int, session: AsyncSession = Depends(get_async_session)):
-    """Delete an excursion"""
-    result = await session.execute(select(Excursion).where(Excursion.id == excursion_id))
-    db_excursion = result.scalar_one_or_none()
-    if not db_excursion:
+    """Delete an excursion with all its points"""
+    freed_media = await delete_tree(session, delete_excursion_statements(excursion_id))
+    if freed_media is None:
         raise HTTPException(status_code=404, detail="Excursion not found")
-    
-    await session.delete(db_excursion)
-    await session.commit()
+    await enqueue_media_cleanup(freed_media)
     return {"message": "Excursion deleted successfully"}
 
 # Point CRUD endpoints
 @router.get("/points", response_model=List[PointResponse])
-async def get_points(excursion_id: Optional[int] = None, session: AsyncSession = Depends(get_async_session)):
+async def get_points(
+    request: Request,
+    excursion_id: Optional[int] = None,
+    fields: Optional[tuple] = Depends(PointFields),
+    session: AsyncSession = Depends(get_async_session),
+):
     """Get all points, optionally filtered by excursion"""
-    query = select(Point).order_by(Point.order)
-    if excursion_id:
-        query = query.where(Point.excursion_id == excursion_id)
-    result = await session.execute(query)
-    points = result.scalars().all()
-    return points
+    async def render():
+        query = (PointFields.select(fields) if fields else select(Point)).order_by(Point.order)
+        if excursion_id:
+            query = query.where(Point.excursion_id == excursion_id)
+        result = await session.execute(query)
+        if fields:
+            return PointFields.dump_list(fields, result)
+        points = [PointResponse.model_validate(p) for p in result.scalars()]
+        return PointListAdapter.dump_json(points)
+    return await cached_json_response(request, session, ["points"], render)
 
 @router.post("/points", response_model=PointResponse)
 async def create_point(point: PointCreate, session: AsyncSession = Depends(get_async_session)):
     """Create a new excursion point"""
-    # Verify excursion exists
-    exc_result = await session.execute(select(Excursion).where(Excursion.id == point.excursion_id))
-    if not exc_result.scalar_one_or_none():
-        raise HTTPException(status_code=404, detail="Excursion not found")
-    
-    db_point = Point(
-        excursion_id=point.excursion_id,
-        order=point.order,
-        title=point.title,
-        text=point.text,
-        lat=point.lat,
-        lng=point.lng,
-        audio=point.audio,
-        image=point.image
+    return await execute_write(
+        session,
+        insert(Point).values(**point.model_dump()).returning(Point),
+        bad_reference="Excursion not found",
     )
-    session.add(db_point)
-    await session.commit()
-    await session.refresh(db_point)
-    return db_point
 
 @router.get("/points/{point_id}", response_model=PointResponse)
-async def get_point(point_id: int, session: AsyncSession = Depends(get_async_session)):
+async def get_point(
+    point_id: int,
+    request: Request,
+    fields: Optional[tuple] = Depends(PointFields),
+    session: AsyncSession = Depends(get_async_session),
+):
     """Get a specific point by ID"""
-    result = await session.execute(select(Point).where(Point.id == point_id))
-    point = result.scalar_one_or_none()
-    if not point:
-        raise HTTPException(status_code=404, detail="Point not found")
-    return point
+    async def render():
+        if fields:
+            row = (await session.execute(PointFields.select(fields).where(Point.id == point_id))).first()
+            if row is None:
+                raise HTTPException(status_code=404, detail="Point not found")
+            return PointFields.dump_one(fields, row)
+        result = await session.execute(select(Point).where(Point.id == point_id))
+        point = result.scalar_one_or_none()
+        if not point:
+            raise HTTPException(status_code=404, detail="Point not found")
+        return PointResponse.model_validate(point).model_dump_json().encode()
+    return await cached_json_response(request, session, [f"points:{point_id}"], render)
 
 @router.put("/points/{point_id}", response_model=PointResponse)
 async def update_point(point_id: int, point: PointUpdate, session: AsyncSession = Depends(get_async_session)):
     """Update a point"""
-    result = await session.execute(select(Point).where(Point.id == point_id))
-    db_point = result.scalar_one_or_none()
-    if not db_point:
-        raise HTTPException(status_code=404, detail="Point not found")
-    
-    if point.excursion_id is not None:
-        # Verify excursion exists
-        exc_result = await session.execute(select(Excursion).where(Excursion.id == point.excursion_id))
-        if not exc_result.scalar_one_or_none():
-            raise HTTPException(status_code=404, detail="Excursion not found")
-        db_point.excursion_id = point.excursion_id
-    
-    if point.order is not None:
-        db_point.order = point.order
-    if point.title is not None:
-        db_point.title = point.title
-    if point.text is not None:
-        db_point.text = point.text
-    if point.lat is not None:
-        db_point.lat = point.lat
-    if point.lng is not None:
-        db_point.lng = point.lng
-    if point.audio is not None:
-        db_point.audio = point.audio
-    if point.image is not None:
-        db_point.image = point.image
-    
-    await session.commit()
-    await session.refresh(db_point)
-    return db_point
+    changes = point.model_dump(exclude_none=True)
+    if not changes:
+        return await get_entity(session, Point, point_id, "Point not found")
+    return await execute_write(
+        session,
+        update(Point).where(Point.id == point_id).values(**changes).returning(Point),
+        not_found="Point not found",
+        bad_reference="Excursion not found",
+    )
 
 @router.delete("/points/{point_id}")
 async def delete_point(point_id: int, session: AsyncSession = Depends(get_async_session)):
     """Delete a point"""
-    result = await session.execute(select(Point).where(Point.id == point_id))
-    db_point = result.scalar_one_or_none()
-    if not db_point:
+    freed_media = await delete_tree(session, delete_point_statements(point_id))
+    if freed_media is None:
         raise HTTPException(status_code=404, detail="Point not found")
-    
-    await session.delete(db_point)
-    await session.commit()
+    await enqueue_media_cleanup(freed_media)
     return {"message": "Point deleted successfully"}
 
+# Search endpoint
+@router.get("/search", response_model=List[SearchResult])
+async def search_catalog(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    type: Optional[str] = Query(None, description="city, excursion or point"),
+    limit: int = Query(20, ge=1, le=100),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """Ranked full-text search over city names, excursions and point texts (prefix matching)"""
+    if type is not None and type not in ENTITY_TYPES:
+        raise HTTPException(status_code=400, detail=f"Invalid type. Allowed: {', '.join(ENTITY_TYPES)}")
+    async def render():
+        hits = await search(session, q, entity=type, limit=limit)
+        return SearchResultListAdapter.dump_json([SearchResult.model_validate(hit) for hit in hits])
+    return await cached_json_response(request, session, ["cities", "excursions", "points"], render)
+
+# Change feed endpoint
+@router.get("/changes", response_model=ChangesPage)
+async def get_changes(
+    request: Request,
+    since: int = Query(0, ge=0, description="Last version seen; 0 for a full sync"),
+    limit: int = Query(500, ge=1, le=5000),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """
+    Catalog changes after version ``since``, oldest first
+
+    Pass ``next_since`` back while ``has_more`` is true. Answers 410 when the
+    entries after ``since`` were compacted away; sync again from 0.
+    """
+    # Checked before the cache: compaction does not bump content versions, so cached pages outlive it
+    if since > 0:
+        horizon = await purged_through(session)
+        if since < horizon:
+            raise HTTPException(status_code=410, detail=str(ResyncRequired(horizon)))
+    async def render():
+        # Read after cached_json_response has read the versions: a page may hold changes newer than
+        # its ETag, whose writes have bumped the versions since, but never miss changes the ETag covers
+        try:
+            entries, has_more = await read_changes(session, since, limit)
+        except ResyncRequired as e:
+            raise HTTPException(status_code=410, detail=str(e))
+        return ChangesPage(
+            changes=[ChangeEntry.model_validate(entry) for entry in entries],
+            next_since=entries[-1].version if entries else since,
+            has_more=has_more,
+        ).model_dump_json().encode()
+    return await cached_json_response(request, session, ["cities", "excursions", "points"], render)
+
+# Catalog export/import endpoints
+@router.get("/catalog/export")
+async def export_catalog_jsonl():
+    """Stream the whole catalog (cities, excursions, points, media manifest) as JSON Lines"""
+    # web.catalog validates records with the models above, so it is imported here
+    from web.catalog import export_catalog
+
+    async def stream():
+        async with AsyncSessionLocal() as session:
+            async for chunk in export_catalog(session):
+                yield chunk
+    return StreamingResponse(
+        stream(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="catalog.jsonl"'},
+    )
+
+@router.post("/catalog/import")
+async def import_catalog_jsonl(file: UploadFile = File(...), session: AsyncSession = Depends(get_async_session)):
+    """Import a JSON Lines catalog dump; idempotent by natural key, all-or-nothing"""
+    from web.catalog import import_catalog, read_lines
+
+    logger.info(f"Importing catalog from {file.filename}")
+    try:
+        stats = await import_catalog(session, read_lines(file.read))
+    except ValueError as e:
+        logger.error(f"Catalog import failed: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+    return stats
+
 # Media Upload endpoints
 class MediaResponse(BaseModel):
     path: str
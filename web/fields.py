@@ -0,0 +1,74 @@
+"""
+Sparse fieldsets for the CRUD API (?fields=id,title,lat,lng)
+
+The requested fields become the column list of the SELECT, so the columns a
+client does not want are neither read from SQLite nor serialized. Each
+distinct field selection gets its own response model (a subset of the full
+one), created once and cached.
+"""
+from functools import lru_cache
+from typing import List, Optional, Tuple, Type
+
+from fastapi import HTTPException, Query
+from pydantic import BaseModel, ConfigDict, TypeAdapter, create_model
+from sqlalchemy import Select, select
+
+
+@lru_cache(maxsize=256)
+def sparse_model(response_model: Type[BaseModel], fields: Tuple[str, ...]) -> Type[BaseModel]:
+    """``response_model`` reduced to ``fields``, in the order of the full model"""
+    definitions = {
+        name: (info.annotation, info)
+        for name, info in response_model.model_fields.items()
+        if name in fields
+    }
+    return create_model(
+        f"{response_model.__name__}Fields",
+        __config__=ConfigDict(from_attributes=True),
+        **definitions,
+    )
+
+
+@lru_cache(maxsize=256)
+def sparse_list_adapter(response_model: Type[BaseModel], fields: Tuple[str, ...]) -> TypeAdapter:
+    return TypeAdapter(List[sparse_model(response_model, fields)])
+
+
+class FieldSelection:
+    """
+    FastAPI dependency parsing ``?fields=`` for one entity
+
+    Resolves to None when the parameter is absent (all fields), otherwise to
+    the requested field names; unknown names answer 400.
+    """
+
+    def __init__(self, model, response_model: Type[BaseModel]):
+        self.model = model
+        self.response_model = response_model
+        self.allowed = tuple(response_model.model_fields)
+
+    def __call__(
+        self,
+        fields: Optional[str] = Query(
+            None, description="Comma-separated fields to return, e.g. id,title,lat,lng (default: all)"
+        ),
+    ) -> Optional[Tuple[str, ...]]:
+        if fields is None:
+            return None
+        names = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = [name for name in names if name not in self.allowed]
+        if unknown or not names:
+            problem = f"Unknown fields: {', '.join(unknown)}" if unknown else "No fields given"
+            raise HTTPException(status_code=400, detail=f"{problem}. Allowed: {', '.join(self.allowed)}")
+        # Canonical order, so equivalent selections share a model
+        return tuple(name for name in self.allowed if name in names)
+
+    def select(self, fields: Tuple[str, ...]) -> Select:
+        return select(*(getattr(self.model, name) for name in fields))
+
+    def dump_list(self, fields: Tuple[str, ...], rows) -> bytes:
+        adapter = sparse_list_adapter(self.response_model, fields)
+        return adapter.dump_json(adapter.validate_python(list(rows), from_attributes=True))
+
+    def dump_one(self, fields: Tuple[str, ...], row) -> bytes:
+        return sparse_model(self.response_model, fields).model_validate(row).model_dump_json().encode()
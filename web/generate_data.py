@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Synthetic large-catalog generator for benchmarks.
+
+Creates a deterministic (seeded) catalog of configurable size: cities with
+excursions clustered around them, points clustered around their excursion,
+texts of realistic length (up to the 2000 character limit, Latin and
+Cyrillic words) and small placeholder media files that the rows reference.
+
+Rows are written with executemany in large batches. By default the content
+triggers are dropped during the load and the derived data (search index,
+row counts, versions) is rebuilt once at the end, which is much faster than
+maintaining it row by row. Do not run it against a database that is being
+written to at the same time.
+
+Usage:
+    python web/generate_data.py --cities 1000 --excursions 100000 --points 5000000
+    python web/generate_data.py --cities 10 --excursions 100 --points 2000 --seed 7
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db.schema import create_schema, drop_content_triggers, rebuild_derived_data
+from db.session import sync_engine
+
+ROOT_DIR = Path(__file__).parent.parent
+SYNTHETIC_MEDIA_DIR = "synthetic"
+# Route order runs 1-100 (PointCreate in web/crud.py) and is unique within an excursion
+MAX_POINTS_PER_EXCURSION = 100
+
+WORDS = (
+    "old town mosque bazaar museum park fountain monument palace garden river bridge "
+    "tower gate square street market tea house statue library theatre mountain lake "
+    "rudaki somoni dushanbe khujand hissar pamir fann iskanderkul penjikent istaravshan "
+    "история город парк музей памятник площадь базар мечеть дворец фонтан сад мост "
+    "река гора озеро улица чайхана театр библиотека крепость ворота рудаки сомони "
+    "душанбе худжанд гиссар памир навруз ремесло ковер керамика шелк плов"
+).split()
+
+# Placeholder payloads: enough of a header for tools to recognise the type
+PLACEHOLDERS = {
+    "images": ("jpg", b"\xff\xd8\xff\xe0\x00\x10JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00" + b"\x00" * 64 + b"\xff\xd9"),
+    "audio": ("mp3", b"ID3\x03\x00\x00\x00\x00\x00\x00" + b"\xff\xfb\x90\x00" + b"\x00" * 413),
+    "videos": ("mp4", b"\x00\x00\x00\x18ftypmp42\x00\x00\x00\x00mp42isom" + b"\x00" * 64),
+}
+
+
+def make_text(rng: random.Random, min_len: int, max_len: int) -> str:
+    # Log-normal lengths: mostly short paragraphs, a long tail up to max_len
+    target = int(min(max_len, max(min_len, rng.lognormvariate(5.5, 0.8))))
+    words = []
+    length = 0
+    while length < target:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)[:max_len].strip().capitalize()
+
+
+def create_placeholder_media(count: int) -> dict:
+    """Write ``count`` placeholder files per media type; return their relative paths"""
+    paths = {}
+    for media_type, (ext, payload) in PLACEHOLDERS.items():
+        directory = ROOT_DIR / "media" / media_type / SYNTHETIC_MEDIA_DIR
+        directory.mkdir(parents=True, exist_ok=True)
+        paths[media_type] = []
+        for i in range(count):
+            relative = f"media/{media_type}/{SYNTHETIC_MEDIA_DIR}/synthetic_{i:04d}.{ext}"
+            target = ROOT_DIR / relative
+            if not target.exists():
+                target.write_bytes(payload)
+            paths[media_type].append(relative)
+    return paths
+
+
+def pick_media(rng: random.Random, media: dict, media_type: str, probability: float):
+    if not media.get(media_type) or rng.random() >= probability:
+        return None
+    return rng.choice(media[media_type])
+
+
+def excursions_for(points: int) -> int:
+    """The fewest excursions that hold ``points`` points"""
+    return -(-points // MAX_POINTS_PER_EXCURSION)
+
+
+def next_id(connection, table: str) -> int:
+    return connection.exec_driver_sql(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {table}").scalar()
+
+
+def generate(args) -> None:
+    if args.points > args.excursions * MAX_POINTS_PER_EXCURSION:
+        raise ValueError(f"{args.points} points need at least {excursions_for(args.points)} excursions")
+    rng = random.Random(args.seed)
+    media = create_placeholder_media(args.media_files) if args.media_files else {}
+    started = time.perf_counter()
+
+    with sync_engine.connect() as connection:
+        # Durability is pointless for a generated dataset; must be set outside a transaction
+        connection.exec_driver_sql("PRAGMA synchronous = OFF")
+        connection.commit()
+        with connection.begin():
+            load(connection, args, rng, media)
+        connection.exec_driver_sql("PRAGMA synchronous = FULL")
+
+    print(f"✅ Generated in {time.perf_counter() - started:.1f}s")
+
+
+def load(connection, args, rng: random.Random, media: dict) -> None:
+    create_schema(connection)
+    if not args.keep_triggers:
+        drop_content_triggers(connection)
+
+    # Cities: cluster centres spread over inhabited latitudes
+    first_city = next_id(connection, "cities")
+    city_ids = list(range(first_city, first_city + args.cities))
+    centres = {}
+    rows = []
+    for city_id in city_ids:
+        centres[city_id] = (rng.uniform(-45, 65), rng.uniform(-180, 180))
+        rows.append((city_id, f"{rng.choice(WORDS).capitalize()} {city_id}", pick_media(rng, media, "images", 0.8)))
+    connection.exec_driver_sql("INSERT INTO cities (id, name, image) VALUES (?, ?, ?)", rows)
+    print(f"🏙️  {len(rows)} cities")
+
+    # Excursions: random city, centre within a few km of the city centre
+    first_excursion = next_id(connection, "excursions")
+    excursion_centres = []
+    for start in range(0, args.excursions, args.batch_size):
+        rows = []
+        for excursion_id in range(first_excursion + start, first_excursion + min(start + args.batch_size, args.excursions)):
+            city_id = rng.choice(city_ids)
+            lat, lng = centres[city_id]
+            excursion_centres.append((excursion_id, lat + rng.gauss(0, 0.05), lng + rng.gauss(0, 0.05)))
+            rows.append((
+                excursion_id, city_id,
+                make_text(rng, 5, 200),
+                make_text(rng, 10, 2000),
+                pick_media(rng, media, "images", 0.7),
+                pick_media(rng, media, "videos", 0.1),
+            ))
+        connection.exec_driver_sql(
+            "INSERT INTO excursions (id, city_id, title, description, image, video) VALUES (?, ?, ?, ?, ?, ?)", rows
+        )
+    print(f"🗺️  {args.excursions} excursions")
+
+    # Points: spread evenly over excursions, a few hundred metres around the excursion centre
+    per_excursion, remainder = divmod(args.points, max(1, args.excursions))
+    rows = []
+    written = 0
+    for index, (excursion_id, lat, lng) in enumerate(excursion_centres):
+        for order in range(1, per_excursion + (1 if index < remainder else 0) + 1):
+            rows.append((
+                excursion_id, order,
+                make_text(rng, 3, 200),
+                make_text(rng, 10, 2000),
+                round(lat + rng.gauss(0, 0.005), 6),
+                round(lng + rng.gauss(0, 0.005), 6),
+                pick_media(rng, media, "audio", 0.6),
+                pick_media(rng, media, "images", 0.8),
+                pick_media(rng, media, "videos", 0.05),
+            ))
+            if len(rows) >= args.batch_size:
+                connection.exec_driver_sql(
+                    'INSERT INTO points (excursion_id, "order", title, text, lat, lng, audio, image, video) '
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+                )
+                written += len(rows)
+                rows = []
+                print(f"\r📍 {written} points", end="", flush=True)
+    if rows:
+        connection.exec_driver_sql(
+            'INSERT INTO points (excursion_id, "order", title, text, lat, lng, audio, image, video) '
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+        )
+        written += len(rows)
+    print(f"\r📍 {written} points")
+
+    if not args.keep_triggers:
+        print("🔎 Rebuilding search index, row counts and versions...")
+        rebuild_derived_data(connection)
+        create_schema(connection)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cities", type=int, default=100)
+    parser.add_argument("--excursions", type=int, default=1000)
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=42, help="Random seed (same seed, same data)")
+    parser.add_argument("--media-files", type=int, default=20,
+                        help="Placeholder files per media type (0 to leave media columns empty)")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--keep-triggers", action="store_true",
+                        help="Maintain derived data row by row instead of rebuilding it at the end")
+    args = parser.parse_args()
+    if args.cities < 1 or (args.points and args.excursions < 1):
+        parser.error("need at least one city, and one excursion when generating points")
+    if args.points > args.excursions * MAX_POINTS_PER_EXCURSION:
+        parser.error(f"at most {MAX_POINTS_PER_EXCURSION} points per excursion: "
+                     f"use --excursions {excursions_for(args.points)} or more for {args.points} points")
+
+    print(f"🌱 Generating {args.cities} cities, {args.excursions} excursions, {args.points} points (seed {args.seed})...")
+    generate(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Admin-only status endpoints for the background job queue (db/jobs.py)
+"""
+import json
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.jobs import STATUSES, job_queue, job_stats, list_jobs, retry_job
+from db.models import Job
+from db.session import get_async_session
+from web.lazy_admin import require_admin
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+STATUS_PATTERN = f"^({'|'.join(STATUSES)})$"
+
+
+class JobResponse(BaseModel):
+    id: int
+    type: str
+    status: str
+    priority: int
+    attempts: int
+    max_attempts: int
+    payload: Dict[str, Any]
+    result: Optional[Any] = None
+    last_error: Optional[str] = None
+    created_at: float
+    run_after: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    locked_by: Optional[str] = None
+
+    @classmethod
+    def from_job(cls, job: Job) -> "JobResponse":
+        return cls(
+            id=job.id,
+            type=job.type,
+            status=job.status,
+            priority=job.priority,
+            attempts=job.attempts,
+            max_attempts=job.max_attempts,
+            payload=json.loads(job.payload),
+            result=json.loads(job.result) if job.result else None,
+            last_error=job.last_error,
+            created_at=job.created_at,
+            run_after=job.run_after,
+            started_at=job.started_at,
+            finished_at=job.finished_at,
+            locked_by=job.locked_by,
+        )
+
+
+@router.get("/stats")
+async def get_job_stats(session: AsyncSession = Depends(get_async_session)):
+    """Job counts per type and status, plus what this process is running"""
+    stats = await job_stats(session)
+    stats["worker"] = {
+        "id": job_queue.worker_id,
+        "running": job_queue.running(),
+        "limits": {name: job_type.concurrency for name, job_type in job_queue.types.items()},
+    }
+    return stats
+
+
+@router.get("", response_model=List[JobResponse])
+async def get_jobs(
+    status: Optional[str] = Query(None, pattern=STATUS_PATTERN),
+    type: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """Most recent jobs first, optionally filtered by status and type"""
+    return [JobResponse.from_job(job) for job in await list_jobs(session, status, type, limit)]
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(job_id: int, session: AsyncSession = Depends(get_async_session)):
+    job = await session.get(Job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JobResponse.from_job(job)
+
+
+@router.post("/{job_id}/retry", response_model=JobResponse)
+async def retry_failed_job(job_id: int, session: AsyncSession = Depends(get_async_session)):
+    """Queue a failed job again with a fresh set of attempts"""
+    if not await retry_job(session, job_id):
+        if await session.get(Job, job_id) is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        raise HTTPException(status_code=409, detail="Only failed jobs can be retried")
+    job_queue.wake()
+    return JobResponse.from_job(await session.get(Job, job_id, populate_existing=True))
@@ -0,0 +1,60 @@
+"""
+Deferred construction of the admin panel
+
+sqladmin, wtforms, jinja2 and the admin views are the most expensive part
+of importing web.main. LazyAdmin is mounted at /admin in their place and
+builds the real sqladmin application on the first admin request (in a
+worker thread, so the event loop keeps serving the API meanwhile).
+"""
+import asyncio
+import threading
+from typing import Callable, Optional
+
+from fastapi import HTTPException, Request
+
+
+class LazyAdmin:
+    """ASGI app that builds a sqladmin Admin on first use and forwards to it"""
+
+    def __init__(self, build: Callable):
+        self._build = build
+        self._admin = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """The sqladmin Admin instance, built on the first call"""
+        if self._admin is None:
+            with self._lock:
+                if self._admin is None:
+                    self._admin = self._build()
+        return self._admin
+
+    async def load_async(self):
+        if self._admin is not None:
+            return self._admin
+        return await asyncio.to_thread(self.load)
+
+    @property
+    def loaded(self) -> bool:
+        return self._admin is not None
+
+    @property
+    def routes(self):
+        # Lets url_for("admin:...") resolve through the Mount named "admin". Until an
+        # admin request has loaded the panel there is nothing to resolve; building it
+        # here would block the event loop
+        if self._admin is None:
+            return []
+        return self._admin.admin.routes
+
+    async def __call__(self, scope, receive, send):
+        admin = await self.load_async()
+        await admin.admin(scope, receive, send)
+
+
+async def require_admin(request: Request) -> None:
+    """FastAPI dependency: only requests with an admin panel session pass (AdminAuth)"""
+    lazy_admin: Optional[LazyAdmin] = request.app.state.admin
+    admin = await lazy_admin.load_async()
+    if not await admin.authentication_backend.authenticate(request):
+        raise HTTPException(status_code=401, detail="Admin login required")
@@ -1,21 +1,26 @@
-import importlib.resources
+import asyncio
 import os
+import secrets
 from fastapi import FastAPI, HTTPException
 from fastapi.responses import RedirectResponse
-from fastapi.staticfiles import StaticFiles
-from sqladmin import Admin
 from starlette.middleware.sessions import SessionMiddleware
 from pathlib import Path
-from markupsafe import Markup
-import sqladmin
 
-from db.base import Base
-from db.session import async_engine, sync_engine, SyncSessionLocal
-from web.admin import CityAdmin, ExcursionAdmin, PointAdmin
-from web.auth import AdminAuth
+from db import profiler
+from db.changelog import change_log_compactor
+from db.jobs import job_queue
+from db.schema import init_db
+from db.session import sync_engine, SyncSessionLocal
+from web.compression import CompressionMiddleware, admin_statics
 from web.crud import router as crud_router
-from web.media_admin import MEDIA_CSS, MEDIA_JS
+from web.lazy_admin import LazyAdmin
+from web.jobs import router as jobs_router
+from web.media import media_app
+from web.metrics import MetricsMiddleware, route_label, router as metrics_router
+from web.profiling import router as profiling_router
+from web.settings import PLACEHOLDER_SESSION_SECRET
 from utils.logger import setup_logger
+from utils.storage import get_storage
 
 logger = setup_logger('web_main')
 
@@ -38,24 +43,22 @@ app = FastAPI(
 )
 
 # Serve media files statically
-app.mount("/media", StaticFiles(directory=str(MEDIA_DIR)), name="media")
+app.mount("/media", media_app(), name="media")
+
+SESSION_SECRET_KEY = os.getenv("SESSION_SECRET_KEY", "")
+if not SESSION_SECRET_KEY or SESSION_SECRET_KEY == PLACEHOLDER_SESSION_SECRET:
+    # Sessions signed with a per-process key end on restart and do not work
+    # across workers; run_admin.py shares one key with all of its workers
+    SESSION_SECRET_KEY = secrets.token_urlsafe(32)
+    logger.warning("SESSION_SECRET_KEY is not set, using a random key for this process")
 
 # Add session middleware FIRST - this is critical for authentication
 app.add_middleware(
     SessionMiddleware,
-    secret_key=os.getenv(
-        "SESSION_SECRET_KEY", "your-secret-key-here-change-in-production"
-    ),
+    secret_key=SESSION_SECRET_KEY,
     max_age=3600,
 )
 
-# Create authentication backend
-authentication_backend = AdminAuth(
-    secret_key=os.getenv(
-        "SESSION_SECRET_KEY", "your-secret-key-here-change-in-production"
-    ),
-)
-
 from starlette.middleware import Middleware
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import Response
@@ -64,6 +67,7 @@ class InjectMediaAssetsMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request, call_next):
         response = await call_next(request)
         if request.url.path.startswith('/admin/') and response.headers.get('content-type', '').startswith('text/html'):
+            from web.media_admin import MEDIA_CSS, MEDIA_JS
             body = b''
             async for chunk in response.body_iterator:
                 body += chunk
@@ -79,28 +83,67 @@ class InjectMediaAssetsMiddleware(BaseHTTPMiddleware):
 
 app.add_middleware(InjectMediaAssetsMiddleware)
 
-# Create Admin with authentication using sync engine and sync sessionmaker
-admin = Admin(
-    app,
-    engine=sync_engine,
-    session_maker=SyncSessionLocal,
-    authentication_backend=authentication_backend,
-    title="Tourism Guide Admin",
-    base_url="/admin",
-)
-
-# Mount sqladmin static files AFTER Admin is created
-with importlib.resources.path("sqladmin", "statics") as p:
-    SQLADMIN_STATICS = p
-    if SQLADMIN_STATICS.exists():
-        app.mount("/admin/statics", StaticFiles(directory=str(SQLADMIN_STATICS)), name="admin_statics")
 
-admin.add_view(CityAdmin)
-admin.add_view(ExcursionAdmin)
-admin.add_view(PointAdmin)
+class SQLProfilerMiddleware:
+    """Attribute SQL statements to the HTTP request that issued them"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        token = profiler.start_unit(f"{scope['method']} {scope['path']}")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            # Routing has resolved the route by now; label by its template
+            profiler.end_unit(token, f"{scope['method']} {route_label(scope)}")
+
+
+if profiler.enabled():
+    app.add_middleware(SQLProfilerMiddleware)
+
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(MetricsMiddleware)
+
+
+def build_admin():
+    """Create Admin with authentication using sync engine and sync sessionmaker"""
+    from sqladmin import Admin
+    from starlette.applications import Starlette
+    from web.admin import CityAdmin, ExcursionAdmin, PointAdmin
+    from web.auth import AdminAuth
+
+    logger.info("Loading admin panel...")
+    # Admin mounts itself on the app it is given; LazyAdmin serves admin.admin directly
+    admin = Admin(
+        Starlette(),
+        engine=sync_engine,
+        session_maker=SyncSessionLocal,
+        authentication_backend=AdminAuth(secret_key=SESSION_SECRET_KEY),
+        title="Tourism Guide Admin",
+        base_url="/admin",
+    )
+    admin.add_view(CityAdmin)
+    admin.add_view(ExcursionAdmin)
+    admin.add_view(PointAdmin)
+    return admin
+
+
+# sqladmin and its views are imported on the first /admin request; it serves its own statics
+admin = LazyAdmin(build_admin)
+app.state.admin = admin
+# Same files as sqladmin's own statics route, plus precompressed variants; matched before /admin
+admin_statics_app = admin_statics()
+app.mount("/admin/statics", admin_statics_app, name="admin_statics")
+app.mount("/admin", admin, name="admin")
 
 # Include CRUD API routes
 app.include_router(crud_router, prefix="/api", tags=["CRUD Operations"])
+app.include_router(metrics_router)
+app.include_router(profiling_router, prefix="/debug", tags=["Profiling"])
+app.include_router(jobs_router, prefix="/api/jobs", tags=["Jobs"])
 
 
 @app.get("/")
@@ -111,7 +154,18 @@ async def root():
 @app.on_event("startup")
 async def startup():
     logger.info("Starting web application...")
-    # Create all tables in the database using async engine
-    async with async_engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    # Create all tables and triggers in the database using async engine
+    await init_db()
     logger.info("Database tables created")
+    written = await asyncio.to_thread(admin_statics_app.precompress)
+    if written:
+        logger.info(f"Precompressed {written} admin static files")
+    await job_queue.start()
+    change_log_compactor.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await job_queue.stop()
+    await change_log_compactor.stop()
+    await get_storage().close()
@@ -1,13 +1,22 @@
 """
 Media file upload and management utilities
 """
+import asyncio
+import hashlib
 import os
-import shutil
+from email.utils import formatdate, mktime_tz, parsedate_tz
 from pathlib import Path
-from werkzeug.utils import secure_filename
+from urllib.parse import quote
 from fastapi import UploadFile, HTTPException
-from typing import Optional, Tuple
+from fastapi.responses import PlainTextResponse, RedirectResponse, Response
+from starlette.datastructures import Headers
+from sqlalchemy import select, union_all
+from typing import Iterable, List, Optional, Set, Tuple
+from db.jobs import job_queue
+from db.models import City, Excursion, Point
+from db.session import AsyncSessionLocal
 from utils.logger import setup_logger
+from utils.storage import Storage, StoredObject, get_storage, normalize_key
 
 logger = setup_logger('web_media')
 
@@ -35,6 +44,12 @@ ALLOWED_EXTENSIONS = {
 
 MAX_FILE_SIZE = 500 * 1024 * 1024  # 500 MB
 
+# Serving /media
+MEDIA_CACHE_CONTROL = f"public, max-age={int(os.getenv('MEDIA_CACHE_MAX_AGE', 0))}, must-revalidate"
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+MEDIA_ACCEL_REDIRECT = os.getenv("MEDIA_ACCEL_REDIRECT", "")  # e.g. /protected-media/
+MEDIA_CHUNK_SIZE = 256 * 1024
+
 
 def get_file_extension(filename: str) -> str:
     """Get file extension without the dot"""
@@ -86,6 +101,7 @@ async def save_upload_file(
         return None, f"File too large. Maximum size: {MAX_FILE_SIZE / 1024 / 1024:.0f} MB"
     
     # Secure filename and add prefix
+    from werkzeug.utils import secure_filename
     original_name = secure_filename(upload_file.filename)
     name_without_ext = Path(original_name).stem
     ext = get_file_extension(original_name)
@@ -93,30 +109,35 @@ async def save_upload_file(
     # Create unique filename with prefix
     final_filename = f"{prefix}{name_without_ext}.{ext}" if prefix else original_name
     
-    # Ensure uniqueness
-    target_dir = MEDIA_DIR / file_type
-    target_path = target_dir / final_filename
+    # Ensure uniqueness: exclusive puts claim names atomically, so concurrent
+    # uploads (also from other worker processes) never overwrite each other
+    name_part = f"{prefix}{name_without_ext}" if prefix else name_without_ext
+    storage = get_storage()
     counter = 1
-    while target_path.exists():
-        name_part = f"{prefix}{name_without_ext}" if prefix else name_without_ext
-        final_filename = f"{name_part}_{counter}.{ext}"
-        target_path = target_dir / final_filename
-        counter += 1
-    
     try:
-        # Save file
-        with open(target_path, "wb") as f:
-            f.write(file_content)
+        while True:
+            relative_path = f"media/{file_type}/{final_filename}"
+            try:
+                await storage.put(relative_path, file_content, upload_file.content_type, exclusive=True)
+                break
+            except FileExistsError:
+                final_filename = f"{name_part}_{counter}.{ext}"
+                counter += 1
         
-        # Return relative path for storage in database
-        relative_path = f"media/{file_type}/{final_filename}"
-        logger.info(f"File saved successfully: {relative_path}")
-        return relative_path, None
-    
     except Exception as e:
         logger.error(f"Error saving file: {str(e)}")
         return None, f"Error saving file: {str(e)}"
 
+    # The bytes are durable; slower steps run as a background job
+    try:
+        await job_queue.enqueue("media.probe", {"path": relative_path}, priority=10)
+    except Exception as e:
+        logger.error(f"Could not queue probe of {relative_path}: {e}")
+
+    # Return relative path for storage in database
+    logger.info(f"File saved successfully: {relative_path}")
+    return relative_path, None
+
 
 async def delete_media_file(file_path: str) -> Optional[str]:
     """
@@ -129,10 +150,9 @@ async def delete_media_file(file_path: str) -> Optional[str]:
         Error message if failed, None if successful
     """
     try:
-        full_path = ROOT_DIR / file_path
-        if full_path.exists() and full_path.is_file():
-            os.remove(full_path)
-            return None
+        await get_storage().delete(file_path)
+        return None
+    except FileNotFoundError:
         return f"File not found: {file_path}"
     except Exception as e:
         return f"Error deleting file: {str(e)}"
@@ -151,3 +171,369 @@ def get_media_url(file_path: Optional[str]) -> Optional[str]:
     if not file_path:
         return None
     return f"/{file_path}"
+
+
+# Columns that may reference a media file
+MEDIA_COLUMNS = [City.image, Excursion.image, Excursion.video, Point.image, Point.audio, Point.video]
+
+
+async def get_referenced_paths(paths: List[str]) -> Set[str]:
+    """Return the subset of paths still referenced by any row"""
+    query = union_all(*[select(column).where(column.in_(paths)) for column in MEDIA_COLUMNS])
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(query)
+        return {row[0] for row in result}
+
+
+def is_managed_media_path(file_path: str) -> bool:
+    """Only files inside the media directory may be removed automatically"""
+    try:
+        normalize_key(file_path)
+    except ValueError:
+        return False
+    return True
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    First and last byte of a single ``bytes=`` range, or None to send the
+    whole file (no range, multiple ranges or a malformed header)
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, dash, last = spec.strip().partition("-")
+    if not dash:
+        return None
+    try:
+        if not first:
+            # Suffix range: the last N bytes
+            length = int(last)
+            if length <= 0:
+                raise RangeNotSatisfiable()
+            return max(0, size - length), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    if start > end:
+        return None
+    return start, min(end, size - 1)
+
+
+def parse_http_date(value: str) -> Optional[int]:
+    parsed = parsedate_tz(value)
+    return mktime_tz(parsed) if parsed else None
+
+
+def media_version(etag: str) -> str:
+    """URL token (``?v=``) naming one version of a file"""
+    return etag.strip('"')
+
+
+class MediaFiles:
+    """
+    ASGI app for /media
+
+    Files with a local path are served here: single-range requests (206),
+    strong ETags and conditional requests (304). A URL carrying the file's
+    current version (``?v=``, see media_version) names immutable content and
+    is cached for a year. With MEDIA_ACCEL_REDIRECT a front proxy sends the
+    bytes instead (nginx X-Accel-Redirect), and servers offering the ASGI
+    zero-copy or path-send extensions send them with sendfile.
+
+    Storage without local files (S3) is answered with a redirect to a
+    download URL from the backend, so API responses keep stable /media links.
+    The backend is looked up per request.
+    """
+
+    def __init__(self, storage: Optional[Storage] = None, accel_redirect: str = MEDIA_ACCEL_REDIRECT):
+        self._storage = storage
+        self.accel_redirect = accel_redirect
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+        response = await self.respond(scope)
+        if response is not None:
+            await response(scope, receive, send)
+
+    async def respond(self, scope) -> Optional[Response]:
+        if scope["method"] not in ("GET", "HEAD"):
+            return PlainTextResponse("Method Not Allowed", status_code=405, headers={"Allow": "GET, HEAD"})
+        storage = self._storage or get_storage()
+        # The path below the mount, as StaticFiles resolves it
+        path, root_path = scope["path"], scope.get("root_path", "")
+        route_path = path[len(root_path):] if path.startswith(root_path) else path
+        try:
+            key = normalize_key(f"media{route_path}")
+            local_path = storage.local_path(key)
+        except ValueError:
+            return PlainTextResponse("Not Found", status_code=404)
+        if local_path is None:
+            return RedirectResponse(storage.url(key), status_code=307)
+        try:
+            stored = await storage.stat(key)
+        except (FileNotFoundError, NotADirectoryError):
+            return PlainTextResponse("Not Found", status_code=404)
+        return MediaFileResponse(local_path, stored, self.accel_redirect)
+
+
+def read_at(f, offset: int, size: int) -> bytes:
+    f.seek(offset)
+    return f.read(size)
+
+
+class MediaFileResponse(Response):
+    """One local media file, answering conditional and range requests"""
+
+    def __init__(self, path: Path, stored: StoredObject, accel_redirect: str = ""):
+        self.path = path
+        self.stored = stored
+        self.accel_redirect = accel_redirect
+        self.background = None
+
+    def headers_for(self, request: Headers, query: str) -> dict:
+        stored = self.stored
+        immutable = f"v={media_version(stored.etag)}" in query.split("&")
+        return {
+            "content-type": stored.content_type or "application/octet-stream",
+            "etag": stored.etag,
+            "last-modified": formatdate(stored.modified, usegmt=True),
+            "accept-ranges": "bytes",
+            "cache-control": IMMUTABLE_CACHE_CONTROL if immutable else MEDIA_CACHE_CONTROL,
+        }
+
+    def not_modified(self, request: Headers) -> bool:
+        if_none_match = request.get("if-none-match")
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            return "*" in tags or any(tag.removeprefix("W/") == self.stored.etag for tag in tags)
+        if_modified_since = request.get("if-modified-since")
+        if if_modified_since:
+            since = parse_http_date(if_modified_since)
+            return since is not None and int(self.stored.modified) <= since
+        return False
+
+    def range_applies(self, request: Headers) -> bool:
+        if_range = request.get("if-range")
+        if if_range is None:
+            return True
+        # Resume only if the file is still the one the client has part of
+        return if_range.strip() in (self.stored.etag, formatdate(self.stored.modified, usegmt=True))
+
+    async def __call__(self, scope, receive, send):
+        request = Headers(scope=scope)
+        headers = self.headers_for(request, scope.get("query_string", b"").decode("latin-1"))
+        size = self.stored.size
+
+        if self.not_modified(request):
+            del headers["content-type"]
+            return await self.send_head(send, 304, headers, finished=True)
+
+        if self.accel_redirect:
+            # The proxy serves the bytes (and ranges) from its internal location
+            headers["x-accel-redirect"] = self.accel_redirect + quote(self.stored.key[len("media/"):])
+            headers["content-length"] = "0"
+            return await self.send_head(send, 200, headers, finished=True)
+
+        status, start, end = 200, 0, size - 1
+        if "range" in request and self.range_applies(request):
+            try:
+                byte_range = parse_range(request["range"], size)
+            except RangeNotSatisfiable:
+                headers = {"content-range": f"bytes */{size}", "content-length": "0"}
+                return await self.send_head(send, 416, headers, finished=True)
+            if byte_range is not None:
+                status, (start, end) = 206, byte_range
+                headers["content-range"] = f"bytes {start}-{end}/{size}"
+        length = end - start + 1 if size else 0
+        headers["content-length"] = str(length)
+
+        if scope["method"] == "HEAD" or not length:
+            return await self.send_head(send, status, headers, finished=True)
+        await self.send_head(send, status, headers)
+        await self.send_file(scope, receive, send, start, length)
+
+    @staticmethod
+    async def send_head(send, status: int, headers: dict, finished: bool = False) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(name.encode("latin-1"), value.encode("latin-1")) for name, value in headers.items()],
+        })
+        if finished:
+            await send({"type": "http.response.body", "body": b""})
+
+    async def send_file(self, scope, receive, send, start: int, length: int) -> None:
+        extensions = scope.get("extensions") or {}
+        if "http.response.pathsend" in extensions and start == 0 and length == self.stored.size:
+            await send({"type": "http.response.pathsend", "path": str(self.path)})
+            return
+        f = await asyncio.to_thread(open, self.path, "rb")
+        try:
+            if "http.response.zerocopysend" in extensions:
+                # The server sends the bytes with sendfile(2)
+                await send({"type": "http.response.zerocopysend", "file": f, "offset": start, "count": length})
+                return
+            await self.send_chunks(f, receive, send, start, length)
+        finally:
+            f.close()
+
+    @staticmethod
+    async def send_chunks(f, receive, send, start: int, length: int) -> None:
+        disconnected = asyncio.Event()
+
+        async def watch_disconnect():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+            disconnected.set()
+
+        # A client that went away stops the reads, not only the sends
+        watcher = asyncio.create_task(watch_disconnect())
+        try:
+            offset, remaining = start, length
+            while remaining and not disconnected.is_set():
+                chunk = await asyncio.to_thread(read_at, f, offset, min(MEDIA_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                offset += len(chunk)
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": bool(remaining)})
+            if remaining and not disconnected.is_set():
+                # The file shrank under us; end the body rather than hang the client
+                await send({"type": "http.response.body", "body": b""})
+        finally:
+            watcher.cancel()
+
+
+def media_app():
+    """The app mounted at /media"""
+    return MediaFiles()
+
+
+# Background jobs (db/jobs.py)
+
+CLEANUP_BATCH_SIZE = 500
+
+# Leading bytes of each format, for checking uploads against their extension
+SIGNATURES = [
+    ("jpeg", lambda head: head.startswith(b"\xff\xd8\xff")),
+    ("png", lambda head: head.startswith(b"\x89PNG\r\n\x1a\n")),
+    ("gif", lambda head: head[:6] in (b"GIF87a", b"GIF89a")),
+    ("webp", lambda head: head[:4] == b"RIFF" and head[8:12] == b"WEBP"),
+    ("wav", lambda head: head[:4] == b"RIFF" and head[8:12] == b"WAVE"),
+    ("avi", lambda head: head[:4] == b"RIFF" and head[8:12] == b"AVI "),
+    ("bmp", lambda head: head.startswith(b"BM")),
+    ("mp4", lambda head: head[4:8] == b"ftyp"),
+    ("matroska", lambda head: head.startswith(b"\x1a\x45\xdf\xa3")),
+    ("ogg", lambda head: head.startswith(b"OggS")),
+    ("flac", lambda head: head.startswith(b"fLaC")),
+    ("flv", lambda head: head.startswith(b"FLV")),
+    ("asf", lambda head: head.startswith(b"\x30\x26\xb2\x75")),
+    ("mp3", lambda head: head.startswith(b"ID3") or head[:2] in (b"\xff\xfb", b"\xff\xf3", b"\xff\xf2")),
+    ("aac", lambda head: head[:2] in (b"\xff\xf1", b"\xff\xf9")),
+    ("pdf", lambda head: head.startswith(b"%PDF")),
+    ("zip", lambda head: head.startswith(b"PK\x03\x04")),
+    ("ole", lambda head: head.startswith(b"\xd0\xcf\x11\xe0")),
+]
+
+# Expected format per extension; extensions not listed are not checked
+EXTENSION_FORMATS = {
+    "jpg": "jpeg", "jpeg": "jpeg", "png": "png", "gif": "gif", "webp": "webp", "bmp": "bmp",
+    "mp3": "mp3", "wav": "wav", "ogg": "ogg", "m4a": "mp4", "aac": "aac", "flac": "flac",
+    "mp4": "mp4", "mov": "mp4", "mkv": "matroska", "webm": "matroska", "avi": "avi", "flv": "flv", "wmv": "asf",
+    "pdf": "pdf", "docx": "zip", "xlsx": "zip", "doc": "ole", "xls": "ole",
+}
+
+
+def sniff_format(head: bytes) -> Optional[str]:
+    for name, matches in SIGNATURES:
+        if matches(head):
+            return name
+    return None
+
+
+def hash_file(path: str) -> Tuple[str, int, bytes]:
+    """sha256, size and first bytes of a file (runs in the job process pool)"""
+    digest = hashlib.sha256()
+    size = 0
+    head = b""
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            if not head:
+                head = chunk[:64]
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size, head
+
+
+async def probe_upload(payload: dict) -> dict:
+    """Hash an uploaded file and check that its contents match its extension"""
+    path = payload["path"]
+    storage = get_storage()
+    try:
+        local_path = storage.local_path(path)
+        if local_path is not None:
+            sha256, size, head = await job_queue.run_in_pool(hash_file, str(local_path))
+        else:
+            digest, size, head = hashlib.sha256(), 0, b""
+            async for chunk in storage.stream(path):
+                head = head or chunk[:64]
+                digest.update(chunk)
+                size += len(chunk)
+            sha256 = digest.hexdigest()
+    except FileNotFoundError:
+        # Replaced or deleted since the upload; nothing to probe
+        return {"path": path, "missing": True}
+    detected = sniff_format(head)
+    expected = EXTENSION_FORMATS.get(get_file_extension(path))
+    matches = expected is None or detected == expected
+    if not matches:
+        logger.warning(f"Upload {path} looks like {detected or 'unknown data'}, not {expected}")
+    return {"path": path, "sha256": sha256, "size": size, "format": detected, "matches_extension": matches}
+
+
+async def cleanup_media(payload: dict) -> dict:
+    """
+    Delete media files freed by deleted rows
+
+    A file is only removed when no city, excursion or point references it
+    anymore. Storage errors fail the attempt, so the job is retried.
+    """
+    paths = sorted(set(payload["paths"]))
+    deleted = []
+    for start in range(0, len(paths), CLEANUP_BATCH_SIZE):
+        batch = paths[start:start + CLEANUP_BATCH_SIZE]
+        referenced = await get_referenced_paths(batch)
+        for path in batch:
+            if path in referenced:
+                continue
+            if not is_managed_media_path(path):
+                logger.warning(f"Skipping cleanup of path outside media directory: {path}")
+                continue
+            try:
+                await get_storage().delete(path)
+            except FileNotFoundError:
+                logger.info(f"Media cleanup: {path} already gone")
+                continue
+            logger.info(f"Media cleanup: deleted {path}")
+            deleted.append(path)
+    return {"deleted": len(deleted), "kept": len(paths) - len(deleted)}
+
+
+async def enqueue_media_cleanup(paths: Iterable[str]) -> None:
+    """Queue freed media paths for deletion"""
+    paths = sorted(set(paths))
+    if paths:
+        await job_queue.enqueue("media.cleanup", {"paths": paths})
+
+
+job_queue.register("media.probe", probe_upload, concurrency=2, max_attempts=3, timeout=900)
+job_queue.register("media.cleanup", cleanup_media, concurrency=1, max_attempts=10, backoff=10)
@@ -6,6 +6,9 @@ from wtforms.widgets import TextInput
 from markupsafe import Markup
 from pathlib import Path
 
+from utils.storage import file_etag, get_storage
+from web.media import media_version
+
 class MediaWidget(TextInput):
     def __call__(self, field, **kwargs):
         kwargs.setdefault('id', field.id)
@@ -48,20 +51,28 @@ def get_media_preview(file_path, media_type):
     if not file_path:
         return ''
     
-    root_dir = Path(__file__).parent.parent
-    full_path = root_dir / file_path
-    
-    if not full_path.exists():
-        return f'<div class="media-preview-error">File not found: {file_path}</div>'
+    # Only local files can be checked without blocking the page render
+    try:
+        full_path = get_storage().local_path(file_path)
+    except ValueError:
+        full_path = None
+    url = f"/{file_path}"
+    if full_path is not None:
+        try:
+            st = full_path.stat()
+        except FileNotFoundError:
+            return f'<div class="media-preview-error">File not found: {file_path}</div>'
+        # Versioned URL: /media serves it as immutable, so previews are cached for good
+        url += f"?v={media_version(file_etag(st))}"
     
     if media_type == 'images':
-        return f'<img src="/{file_path}" alt="Preview" class="media-preview-image">'
+        return f'<img src="{url}" alt="Preview" class="media-preview-image">'
     elif media_type == 'audio':
-        return f'<audio controls class="media-preview-audio"><source src="/{file_path}"></audio>'
+        return f'<audio controls class="media-preview-audio"><source src="{url}"></audio>'
     elif media_type == 'videos':
-        return f'<video controls class="media-preview-video"><source src="/{file_path}"></video>'
+        return f'<video controls class="media-preview-video"><source src="{url}"></video>'
     else:
-        return f'<a href="/{file_path}" target="_blank" class="media-preview-link">📄 {Path(file_path).name}</a>'
+        return f'<a href="{url}" target="_blank" class="media-preview-link">📄 {Path(file_path).name}</a>'
 
 
 class MediaField(StringField):
@@ -0,0 +1,134 @@
+"""
+Request metrics, Prometheus endpoint and health checks
+"""
+import asyncio
+import time
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlalchemy import text
+from starlette.staticfiles import StaticFiles
+
+from db.session import AsyncSessionLocal
+from utils import metrics
+from utils.metrics import SIZE_BUCKETS, Counter, Gauge, Histogram
+from utils.storage import get_storage
+from web.media import MediaFiles
+
+router = APIRouter()
+
+REQUESTS = Counter("http_requests_total", "HTTP requests by route and status", ["method", "route", "status"])
+LATENCY = Histogram("http_request_duration_seconds", "HTTP request latency", ["method", "route"])
+IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being served")
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes", "HTTP response body size", ["method", "route"], buckets=SIZE_BUCKETS
+)
+UPLOAD_BYTES = Counter("http_upload_bytes_total", "Request body bytes received", ["route"])
+UPLOAD_SECONDS = Counter(
+    "http_upload_seconds_total", "Time from request start to the last body chunk; bytes/s = rate(bytes) / rate(seconds)", ["route"]
+)
+STATIC_BYTES = Counter("static_bytes_served_total", "Bytes served from static mounts", ["mount"])
+
+BODY_METHODS = {"POST", "PUT", "PATCH"}
+READY_TIMEOUT = 2.0
+
+
+def route_label(scope) -> str:
+    """
+    Bounded-cardinality label for a routed request: the route template for
+    API routes, root_path:endpoint for Starlette routes (sqladmin), the
+    mount path for mounted apps such as StaticFiles
+    """
+    root_path = scope.get("root_path", "")
+    route = scope.get("route")
+    if route is not None:
+        return root_path + route.path
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return "unmatched"
+    name = getattr(endpoint, "__name__", None)
+    if name:
+        return f"{root_path}:{name}"
+    return f"{root_path}/{{path}}"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency, sizes, in-flight and upload metrics"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        status = 500
+        sent = 0
+        received = 0
+        last_chunk = 0.0
+
+        async def send_wrapper(message):
+            nonlocal status, sent
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        async def receive_wrapper():
+            nonlocal received, last_chunk
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                last_chunk = time.perf_counter()
+            return message
+
+        method = scope["method"]
+        IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive_wrapper if method in BODY_METHODS else receive, send_wrapper)
+        finally:
+            IN_FLIGHT.dec()
+            route = route_label(scope)
+            LATENCY.observe(time.perf_counter() - started, (method, route))
+            REQUESTS.inc((method, route, status))
+            RESPONSE_SIZE.observe(sent, (method, route))
+            if received:
+                UPLOAD_BYTES.inc((route,), received)
+                UPLOAD_SECONDS.inc((route,), last_chunk - started)
+            if isinstance(scope.get("endpoint"), (StaticFiles, MediaFiles)):
+                STATIC_BYTES.inc((scope.get("root_path", ""),), sent)
+
+
+@router.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@router.get("/healthz", include_in_schema=False)
+async def healthz():
+    """Liveness: the process is serving requests"""
+    return {"status": "ok"}
+
+
+async def check_database() -> None:
+    async with AsyncSessionLocal() as session:
+        await session.execute(text("SELECT 1"))
+
+
+@router.get("/readyz", include_in_schema=False)
+async def readyz():
+    """Readiness: the database answers and media storage is writable"""
+    checks = {}
+    for name, check in (
+        ("database", check_database()),
+        ("media_dir", get_storage().check()),
+    ):
+        try:
+            await asyncio.wait_for(check, READY_TIMEOUT)
+            checks[name] = "ok"
+        except Exception as e:
+            checks[name] = f"error: {e.__class__.__name__}: {e}"
+    ready = all(result == "ok" for result in checks.values())
+    return JSONResponse({"status": "ok" if ready else "unavailable", "checks": checks}, status_code=200 if ready else 503)
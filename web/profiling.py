@@ -0,0 +1,53 @@
+"""
+Admin-only profiling endpoints for the running web process
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import Response
+
+from utils.profiling import ProfilerBusy, MAX_SECONDS, cpu_profile, dump_tasks, memory_profile
+from web.lazy_admin import require_admin
+from utils.logger import setup_logger
+
+logger = setup_logger('web_profiling')
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+def download(filename: str, body: bytes) -> Response:
+    return Response(
+        content=body,
+        media_type="text/plain" if filename.endswith((".txt", ".collapsed")) else "application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+async def capture(profile):
+    try:
+        filename, body = await profile
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    logger.info(f"Profile captured: {filename} ({len(body)} bytes)")
+    return download(filename, body)
+
+
+@router.get("/profile/cpu")
+async def profile_cpu(
+    seconds: float = Query(10, gt=0, le=MAX_SECONDS),
+    format: str = Query("collapsed", pattern="^(collapsed|pstats)$"),
+):
+    """CPU profile over the next N seconds: sampled collapsed stacks or cProfile pstats"""
+    return await capture(cpu_profile(seconds, format))
+
+
+@router.get("/profile/memory")
+async def profile_memory(
+    seconds: float = Query(10, gt=0, le=MAX_SECONDS),
+    limit: int = Query(50, ge=1, le=1000),
+):
+    """tracemalloc top allocations and growth over the next N seconds"""
+    return await capture(memory_profile(seconds, limit))
+
+
+@router.get("/tasks")
+async def tasks():
+    """Stacks of all asyncio tasks and threads"""
+    return download(*dump_tasks())
@@ -1,31 +1,73 @@
 #!/usr/bin/env python3
 """
 Startup script for the Tourism Bot Admin Panel
+
+    python web/run_admin.py
+    python web/run_admin.py --workers 4
+    python web/run_admin.py --profile development
+
+The production profile (default) uses uvloop and httptools when installed
+and samples the access log; see web/server.py.
+
+Workers are separate processes sharing the database and media directory.
+Configuration comes from the environment (and .env), which every worker
+inherits; a session key is generated here when none is configured so that
+all workers accept the same admin sessions.
 """
 
+import argparse
 import uvicorn
 import os
+import secrets
 import sys
 
 # Add the parent directory to the path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+
+def share_session_secret(workers: int) -> None:
+    """Give all workers one SESSION_SECRET_KEY, generating it if unset"""
+    from dotenv import load_dotenv
+    load_dotenv()
+    from web.settings import PLACEHOLDER_SESSION_SECRET
+    if os.getenv("SESSION_SECRET_KEY", "") in ("", PLACEHOLDER_SESSION_SECRET):
+        os.environ["SESSION_SECRET_KEY"] = secrets.token_urlsafe(32)
+        if workers > 1:
+            print("⚠️  SESSION_SECRET_KEY is not set; generated one for this run (admin sessions end on restart)")
+
+
 def main():
     """Start the admin panel server"""
-    port = int(os.getenv("PORT", 8000))
+    from web.server import DEFAULT_PROFILE, PROFILES, describe, uvicorn_options
+
+    parser = argparse.ArgumentParser(description="Run the admin panel and API")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", 8000)))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", 1)),
+                        help="Worker processes (default: WEB_CONCURRENCY or 1)")
+    parser.add_argument("--profile", choices=PROFILES, default=DEFAULT_PROFILE,
+                        help=f"Launch profile (default: WEB_PROFILE or {DEFAULT_PROFILE})")
+    parser.add_argument("--keep-alive", type=float, help="Idle keep-alive timeout in seconds (WEB_KEEP_ALIVE)")
+    parser.add_argument("--backlog", type=int, help="Listen backlog (WEB_BACKLOG)")
+    parser.add_argument("--access-log-sample-rate", type=float,
+                        help="Fraction of requests to log, 0 to disable (ACCESS_LOG_SAMPLE_RATE)")
+    args = parser.parse_args()
+    port = args.port
+    share_session_secret(args.workers)
+    options = uvicorn_options(
+        args.profile, args.host, port, args.workers, args.keep_alive, args.backlog, args.access_log_sample_rate
+    )
+
     print("🚀 Starting Tourism Bot Admin Panel...")
     print(f"📍 Admin panel will be available at: http://0.0.0.0:{port}/admin")
+    if args.workers > 1:
+        print(f"👷 Workers: {args.workers}")
+    print(f"⚙️  Profile: {args.profile} ({describe(options)})")
     print("🔐 Default credentials: admin / admin123")
     print("💡 You can change credentials by setting ADMIN_USERNAME and ADMIN_PASSWORD environment variables")
     print("-" * 60)
-    
-    uvicorn.run(
-        "web.main:app",
-        host="0.0.0.0",
-        port=port,
-        reload=False,
-        log_level="info"
-    )
+
+    uvicorn.run("web.main:app", **options)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -11,6 +11,8 @@ import os
 # Add the parent directory to the path so we can import our modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from sqlalchemy import func, select
+
 from db.session import AsyncSessionLocal
 from db.models import City, Excursion, Point
 
@@ -18,7 +20,7 @@ async def seed_database():
     """Populate the database with sample data"""
     async with AsyncSessionLocal() as session:
         # Check if data already exists
-        existing_cities = await session.execute("SELECT COUNT(*) FROM cities")
+        existing_cities = await session.execute(select(func.count()).select_from(City))
         if existing_cities.scalar() > 0:
             print("Database already contains data. Skipping seed.")
             return
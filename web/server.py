@@ -0,0 +1,121 @@
+"""
+uvicorn launch profiles for web/run_admin.py
+
+    production   uvloop and httptools when installed, longer keep-alive,
+                 access log sampled (errors are always logged)
+    development  uvicorn's defaults, every request logged
+
+Settings come from the environment and can be overridden on the command
+line: WEB_PROFILE, WEB_CONCURRENCY (workers), WEB_KEEP_ALIVE (seconds),
+WEB_BACKLOG, ACCESS_LOG_SAMPLE_RATE (0 disables the access log).
+"""
+import copy
+import logging
+import os
+import random
+from importlib.util import find_spec
+from typing import Any, Dict, Optional
+
+import uvicorn.config
+
+PROFILES = ("production", "development")
+DEFAULT_PROFILE = os.getenv("WEB_PROFILE", "production")
+
+# Longer than the idle timeout of the proxy in front (nginx keeps upstream connections 60s)
+PRODUCTION_KEEP_ALIVE = 75
+PRODUCTION_ACCESS_LOG_SAMPLE_RATE = 0.1
+
+
+def installed(module: str) -> bool:
+    return find_spec(module) is not None
+
+
+def event_loop() -> str:
+    return "uvloop" if installed("uvloop") else "asyncio"
+
+
+def http_protocol() -> str:
+    return "httptools" if installed("httptools") else "h11"
+
+
+class AccessLogSampler(logging.Filter):
+    """Lets a fraction of uvicorn's access log lines through; 4xx/5xx always pass"""
+
+    def __init__(self, rate: float = 1.0):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        try:
+            status = int(record.args[4])
+        except (IndexError, TypeError, ValueError):
+            return True
+        return status >= 400 or random.random() < self.rate
+
+
+def log_config(sample_rate: float) -> Dict[str, Any]:
+    """uvicorn's logging config with the access log sampled at ``sample_rate``"""
+    config = copy.deepcopy(uvicorn.config.LOGGING_CONFIG)
+    if sample_rate < 1:
+        # Applied in each worker process, which configures logging itself
+        config["filters"] = {"access_sampler": {"()": f"{__name__}.AccessLogSampler", "rate": sample_rate}}
+        config["loggers"]["uvicorn.access"]["filters"] = ["access_sampler"]
+    return config
+
+
+def env_float(name: str, default: Optional[float]) -> Optional[float]:
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+
+def uvicorn_options(
+    profile: str = DEFAULT_PROFILE,
+    host: str = "0.0.0.0",
+    port: int = 8000,
+    workers: int = 1,
+    keep_alive: Optional[float] = None,
+    backlog: Optional[int] = None,
+    access_log_sample_rate: Optional[float] = None,
+) -> Dict[str, Any]:
+    """Keyword arguments for uvicorn.run(); None means the profile's value"""
+    if profile not in PROFILES:
+        raise ValueError(f"profile must be one of {', '.join(PROFILES)}")
+    production = profile == "production"
+    if keep_alive is None:
+        keep_alive = env_float("WEB_KEEP_ALIVE", PRODUCTION_KEEP_ALIVE if production else 5)
+    if backlog is None:
+        backlog = int(env_float("WEB_BACKLOG", 2048))
+    if access_log_sample_rate is None:
+        access_log_sample_rate = env_float(
+            "ACCESS_LOG_SAMPLE_RATE", PRODUCTION_ACCESS_LOG_SAMPLE_RATE if production else 1.0
+        )
+
+    options: Dict[str, Any] = {
+        "host": host,
+        "port": port,
+        "workers": workers,
+        "reload": False,
+        "log_level": "info",
+        "timeout_keep_alive": keep_alive,
+        "backlog": backlog,
+        "access_log": access_log_sample_rate > 0,
+        "log_config": log_config(access_log_sample_rate),
+    }
+    if production:
+        options.update(
+            loop=event_loop(),
+            http=http_protocol(),
+            # Finish in-flight requests on SIGTERM, but do not hang a deploy
+            timeout_graceful_shutdown=30,
+            server_header=False,
+        )
+    return options
+
+
+def describe(options: Dict[str, Any]) -> str:
+    sampled = options["log_config"].get("filters", {}).get("access_sampler", {}).get("rate")
+    access_log = "off" if not options["access_log"] else f"{sampled:.0%} sampled" if sampled is not None else "on"
+    return (
+        f"loop={options.get('loop', 'auto')} http={options.get('http', 'auto')} "
+        f"keep-alive={options['timeout_keep_alive']:g}s backlog={options['backlog']} access-log={access_log}"
+    )
@@ -0,0 +1,9 @@
+"""
+Settings shared by the web app and its launcher
+
+Kept free of heavy imports: web.main reads it at import time, before the
+admin panel is loaded, and run_admin.py before any worker starts.
+"""
+
+# SESSION_SECRET_KEY placeholder shipped in .env.example; never used as an actual key
+PLACEHOLDER_SESSION_SECRET = "your-secret-key-here-change-in-production"